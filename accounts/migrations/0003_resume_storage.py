@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 19:46
+
+import jobs.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_profile_github_username_profile_linkedin_username'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='resume',
+            field=models.FileField(blank=True, null=True, storage=jobs.storage.ContentAddressedStorage(), upload_to='resumes/'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from jobs.storage import resume_storage
+
 class Profile(models.Model):
     ROLE_CHOICES = (
         ('candidate', 'Candidate'),
@@ -11,7 +13,7 @@ class Profile(models.Model):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='candidate')
 
     # Candidate-specific
-    resume = models.FileField(upload_to='resumes/', blank=True, null=True)
+    resume = models.FileField(upload_to='resumes/', storage=resume_storage, blank=True, null=True)
     skills = models.JSONField(default=list, blank=True)  # simple list of skills
     github_username = models.CharField(max_length=100, blank=True, null=True)
     linkedin_username = models.CharField(max_length=100, blank=True, null=True)
@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
+from employer.ownership import sync_employer
+from jobs.storage import release_file, remember_file, update_file_references
 from .models import Profile
 
 @receiver(post_save, sender=User)
@@ -10,3 +12,30 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
     else:
         # create profile if missing (VERY IMPORTANT)
         Profile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Profile)
+def sync_profile_employer(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sync_employer(instance)
+
+
+@receiver(pre_save, sender=Profile)
+def remember_profile_resume(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'resume' not in update_fields):
+        instance._stored_file_name = None
+        return
+    remember_file(instance, 'resume')
+
+
+@receiver(post_save, sender=Profile)
+def track_profile_resume(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'resume' not in update_fields):
+        return
+    update_file_references(instance, 'resume')
+
+
+@receiver(post_delete, sender=Profile)
+def release_profile_resume(sender, instance, **kwargs):
+    release_file(instance, 'resume')
@@ -4,6 +4,8 @@ from django.contrib.auth.decorators import login_required
 from django.urls import reverse
 from django.contrib import messages
 
+from jobs.query_budget import query_budget
+
 from .forms import SignUpForm, LoginForm, CandidateProfileForm, EmployerProfileForm
 from .models import Profile
 from django.contrib.auth.models import User
@@ -67,12 +69,19 @@ def profile_view(request):
 
     return render(request, 'accounts/profile.html', {'form': form, 'profile': profile})
 
+@query_budget(8)
 @login_required
 def candidate_dashboard(request):
     from jobs.models import Application, SavedJob
+    from jobs.pagination import paginate
     from skillmap.models import CandidateSkillProfile
     
-    applied = Application.objects.filter(applicant=request.user).select_related('job')
+    applied = paginate(
+        request,
+        Application.objects.filter(applicant=request.user).select_related('job'),
+        ('-applied_at', '-id'),
+        per_page=25,
+    )
     saved_jobs = SavedJob.objects.filter(user=request.user).select_related('job')
     skill_profile = CandidateSkillProfile.objects.filter(
         github_username=request.user.profile.github_username,
@@ -81,20 +90,28 @@ def candidate_dashboard(request):
     
     return render(request, 'accounts/candidate_dashboard.html', {
         'applied': applied, 
+        'page': applied,
         'saved_jobs': saved_jobs,
         'skill_profile': skill_profile
     })
 
+@query_budget(8)
 @login_required
 def employer_dashboard(request):
-    from jobs.models import Job, Application
+    from jobs.models import Job
+    from jobs.pagination import paginate
+    from jobs.funnel import attach_funnels
+    from employer.ownership import employer_for
     
-    jobs = Job.objects.filter(company__icontains=request.user.profile.company_name or '')
-    applications = Application.objects.filter(job__in=jobs).select_related('job', 'applicant')
+    employer = employer_for(request.user)
+    jobs = Job.objects.filter(employer=employer) if employer is not None else Job.objects.none()
+    page = paginate(request, jobs, ('-id',), per_page=25)
+    # Applicant counts for the page come from the funnel counters in one query
+    page.object_list = attach_funnels(page)
     
     return render(request, 'accounts/employer_dashboard.html', {
-        'jobs': jobs,
-        'applications': applications
+        'jobs': page,
+        'page': page
     })
 
 @login_required
@@ -0,0 +1,111 @@
+"""
+Which employer owns a job.
+
+Job.employer is an indexed foreign key to Employer, so dashboards and
+permission checks select an employer's jobs with an index lookup instead
+of matching company names. An Employer row is kept for every employer
+profile with a company name (see sync_employer), and jobs are linked to
+it when they are posted, when their company name matches exactly one
+employer, and once by the backfill in jobs migration 0017.
+"""
+
+
+def company_key(name):
+    """Company name compared case- and whitespace-insensitively"""
+    return ' '.join((name or '').split()).casefold()
+
+
+def employer_for(user):
+    """The Employer of an employer user, or None"""
+    from .models import Employer
+
+    profile = getattr(user, 'profile', None)
+    if profile is None or profile.role != 'employer':
+        return None
+    if not hasattr(user, '_employer'):
+        user._employer = Employer.objects.filter(user_id=user.pk).first()
+    return user._employer
+
+
+def sync_employer(profile, employer_model=None, job_model=None):
+    """
+    Create or rename the Employer of an employer profile with a company
+    name, and let it claim the unowned jobs posted under that name
+    """
+    if employer_model is None or job_model is None:
+        from jobs.models import Job
+        from .models import Employer
+        employer_model, job_model = Employer, Job
+
+    company = ' '.join((profile.company_name or '').split())
+    if profile.role != 'employer' or not company:
+        return None
+    employer, created = employer_model.objects.get_or_create(
+        user_id=profile.user_id,
+        defaults={'company_name': company, 'contact_email': profile.user.email or ''},
+    )
+    if not created and employer.company_name == company:
+        return employer
+    if not created:
+        employer.company_name = company
+        employer.save(update_fields=['company_name'])
+    job_model.objects.filter(employer__isnull=True, company__iexact=company).update(employer=employer)
+    return employer
+
+
+def owner_for_company(company, employer_model=None):
+    """Id of the only employer with this company name, or None"""
+    if employer_model is None:
+        from .models import Employer
+        employer_model = Employer
+
+    company = ' '.join((company or '').split())
+    if not company:
+        return None
+    ids = list(employer_model.objects.filter(company_name__iexact=company).values_list('id', flat=True)[:2])
+    return ids[0] if len(ids) == 1 else None
+
+
+def owners_by_company(employer_model=None):
+    """{company key: employer id} for the names held by exactly one employer"""
+    if employer_model is None:
+        from .models import Employer
+        employer_model = Employer
+
+    owners = {}
+    for employer_id, name in employer_model.objects.values_list('id', 'company_name'):
+        key = company_key(name)
+        if key:
+            owners[key] = None if key in owners else employer_id
+    return {key: employer_id for key, employer_id in owners.items() if employer_id is not None}
+
+
+def backfill_job_employers(job_model, employer_model, profile_model):
+    """
+    Link unowned jobs to employers from their company names: an exact
+    (case-insensitive) match first, then the substring matching the
+    dashboards used before, when it points at a single employer. Returns
+    the number of jobs linked.
+    """
+    unowned = job_model.objects.filter(employer__isnull=True)
+    before = unowned.count()
+    profiles = profile_model.objects.filter(role='employer').exclude(company_name=None).select_related('user')
+    for profile in profiles:
+        sync_employer(profile, employer_model, job_model)
+
+    owners = owners_by_company(employer_model)
+    linked = {}
+    rows = unowned.values_list('id', 'company')
+    for job_id, company in rows.iterator(chunk_size=2000):
+        key = company_key(company)
+        owner = owners.get(key)
+        if owner is None and key:
+            matches = {employer_id for name, employer_id in owners.items() if name in key or key in name}
+            owner = matches.pop() if len(matches) == 1 else None
+        if owner is not None:
+            linked.setdefault(owner, []).append(job_id)
+
+    for employer_id, job_ids in linked.items():
+        for start in range(0, len(job_ids), 500):
+            job_model.objects.filter(id__in=job_ids[start:start + 500]).update(employer_id=employer_id)
+    return before - unowned.count()
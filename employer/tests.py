@@ -1,3 +1,74 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import Profile
+from jobs.models import Job
+
+from .models import Employer
+from .ownership import backfill_job_employers, employer_for, owner_for_company
+
+
+def make_job(company, title='Python Developer'):
+    return Job.objects.create(
+        title=title, company=company, description='Build Django apps', salary=500000,
+        location='Pune', job_type='full-time',
+    )
+
+
+def make_employer(username, company):
+    user = User.objects.create_user(username, password='pass')
+    user.profile.role = 'employer'
+    user.profile.company_name = company
+    user.profile.save()
+    return user
+
+
+class OwnershipTests(TestCase):
+    def test_employer_profile_claims_unowned_jobs_by_exact_name(self):
+        exact = make_job('ACME Corp')
+        similar = make_job('Acme Corporation')
+        user = make_employer('acme', 'Acme Corp')
+
+        employer = employer_for(user)
+        self.assertEqual(employer.company_name, 'Acme Corp')
+        exact.refresh_from_db()
+        similar.refresh_from_db()
+        self.assertEqual((exact.employer, similar.employer), (employer, None))
+
+        # Jobs posted later are assigned on save
+        self.assertEqual(make_job('acme corp').employer, employer)
+
+    def test_shared_company_names_have_no_single_owner(self):
+        make_employer('first', 'Globex')
+        make_employer('second', 'globex')
+        self.assertIsNone(owner_for_company('Globex'))
+        self.assertIsNone(make_job('Globex').employer)
+
+    def test_candidates_have_no_employer(self):
+        user = User.objects.create_user('candidate', password='pass')
+        self.assertIsNone(employer_for(user))
+        self.assertFalse(Employer.objects.exists())
+
+    def test_backfill_falls_back_to_a_single_substring_match(self):
+        make_employer('initech', 'Initech')
+        make_employer('hooli', 'Hooli')
+        make_employer('hooli-xyz', 'Hooli XYZ')
+        substring = make_job('Initech Software Pvt Ltd')
+        ambiguous = make_job('Hooli XYZ Labs')
+        Job.objects.update(employer=None)
+
+        linked = backfill_job_employers(Job, Employer, Profile)
+        substring.refresh_from_db()
+        ambiguous.refresh_from_db()
+        self.assertEqual(linked, 1)
+        self.assertEqual(substring.employer.company_name, 'Initech')
+        self.assertIsNone(ambiguous.employer)
+
+    def test_dashboard_lists_only_owned_jobs(self):
+        user = make_employer('acme', 'Acme')
+        owned = make_job('Acme')
+        make_job('Acme Widgets')
+        self.client.force_login(user)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(list(response.context['jobs']), [owned])
@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'jobs.query_budget.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -87,6 +88,27 @@ DATABASES = {
 }
 
 
+# 'default' is per-process and holds the per-user saved-job id sets
+# (jobs.saved). 'versions' holds the counters that tell every process its
+# in-memory copies are stale (jobs.versions), so it must be shared by all of
+# them: the file cache is, on one host; use Redis or Memcached across hosts.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'jobportal',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'versions',
+    },
+}
+
+SAVED_JOBS_CACHE_TIMEOUT = 3600
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -119,6 +141,57 @@ USE_TZ = True
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Backend used to answer job_list searches:
+#   'index'     - tokenized inverted index (jobs.JobSearchTerm)
+#   'fts5'      - SQLite FTS5 table ranked by BM25, with description snippets
+#   'icontains' - plain LIKE scans over title/company/description
+JOB_SEARCH_BACKEND = 'index'
+
+# Maximum number of job_list result pages kept in each process's LRU cache;
+# a job change drops the pages of the listings it could appear in (see
+# jobs.result_cache)
+JOB_LIST_CACHE_SIZE = 512
+
+# Seconds job export cursors stay behind the present. A job change is
+# stamped when saved but only visible once committed, so this must exceed
+# the longest transaction that writes jobs, or syncs can skip changes
+JOB_EXPORT_CURSOR_LAG = 300
+
+# Seconds before the in-memory autocomplete index is rebuilt from the database
+AUTOCOMPLETE_MAX_AGE = 300
+
+# Seed for InterviewEngine's question picks; set it to replay sessions in tests
+INTERVIEW_RANDOM_SEED = None
+
+# Fitted TF-IDF model and matrix written by `manage.py build_similar_jobs`
+SIMILAR_JOBS_INDEX_PATH = BASE_DIR / 'similar_jobs.joblib'
+
+# Interview answer scorer fitted on the question bank by the fit_answer_scorer
+# task or `manage.py build_answer_scorer`; web workers only load it
+ANSWER_SCORER_PATH = BASE_DIR / 'answer_scorer.joblib'
+
+# Background task queue (jobs.queue, `manage.py run_tasks`): seconds before a
+# running task whose worker stopped is reclaimed, how often a running task's
+# worker refreshes its lock (well below the timeout), and the base retry
+# delay (doubled after each failed attempt)
+TASK_LOCK_TIMEOUT = 600
+TASK_HEARTBEAT_INTERVAL = 150
+TASK_RETRY_DELAY = 30
+
+# Seconds an unreferenced resume file is kept after its last upload, so one
+# stored just before its row is saved is not deleted (jobs.storage); older
+# ones are deleted by `manage.py dedupe_resumes`
+STORED_BLOB_GRACE_PERIOD = 600
+
+# Per-view query budgets (jobs.query_budget): checked while DEBUG is on, or
+# whenever QUERY_BUDGET_ENABLED is set. Budgets by URL name add to those
+# declared with @query_budget; QUERY_BUDGET_RAISE turns violations, and SELECTs
+# repeated QUERY_BUDGET_REPEAT_THRESHOLD times in one request, into errors.
+QUERY_BUDGET_ENABLED = DEBUG
+QUERY_BUDGET_RAISE = False
+QUERY_BUDGET_REPEAT_THRESHOLD = 5
+QUERY_BUDGETS = {}
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
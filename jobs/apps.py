@@ -1,5 +1,41 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.models.signals import post_migrate
+
+
+def ensure_fts(sender, using='default', **kwargs):
+    from django.db import connections
+    from django.db.migrations.recorder import MigrationRecorder
+    from . import fts
+
+    connection = connections[using]
+    if not fts.is_supported(connection):
+        return
+    # Only once the migration that introduces the FTS table has been applied
+    applied = MigrationRecorder(connection).applied_migrations()
+    if ('jobs', '0007_job_fts') in applied:
+        fts.install(connection)
+
+
+def warm_autocomplete(sender, **kwargs):
+    # Once per process: only the request that disconnects the handler warms
+    if request_started.disconnect(warm_autocomplete):
+        from .autocomplete import job_autocomplete
+
+        job_autocomplete.warm()
 
 
 class JobsConfig(AppConfig):
     name = 'jobs'
+
+    def ready(self):
+        # Import signals so they are registered
+        import jobs.signals  # noqa: F401
+
+        # SQLite drops the FTS sync triggers whenever jobs_job is rebuilt
+        post_migrate.connect(ensure_fts, sender=self)
+
+        # Build the autocomplete index on the worker's first request rather
+        # than in the first autocomplete request. Not here: ready() also runs
+        # for management commands, before the tables may exist.
+        request_started.connect(warm_autocomplete)
@@ -0,0 +1,261 @@
+"""
+In-memory prefix index behind the job search autocomplete.
+
+Each field (title, company, location) keeps a sorted array of
+(word-suffix, value) keys, so a prefix lookup is two bisections. Every
+word start of a value is indexed, which lets "dev" complete "Python
+Developer". Values carry the number of jobs using them, and the top values
+for a prefix are memoized until a value under that prefix changes.
+
+The index is built from the database (collecting every key and sorting
+once) in a background thread on a worker's first request, see
+JobsConfig.ready, or else on first use. It is then kept current by the Job
+signal handlers in this process, as their transactions commit. It is
+rebuilt from scratch once it is older than
+AUTOCOMPLETE_MAX_AGE seconds, to pick up saves made by other processes, and
+when a bulk write such as import_jobs bumps the shared autocomplete version
+(see jobs.versions). Requests keep answering from the old index until the
+new one is swapped in. Changes this process makes while a rebuild runs show
+up after the next one.
+"""
+import heapq
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from . import versions
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_FIELDS = ('title', 'company', 'location')
+
+# Prefix ranges at most this wide are ranked directly instead of memoized
+SCAN_LIMIT = 64
+
+
+def normalize(value):
+    return re.sub(r'\s+', ' ', value or '').strip().lower()
+
+
+def autocomplete_values(job):
+    return {field: getattr(job, field) for field in AUTOCOMPLETE_FIELDS}
+
+
+def _word_suffixes(normalized):
+    """'python dev' -> ['python dev', 'dev']"""
+    starts = [0] + [m.end() for m in re.finditer(r'[\s,/(-]+', normalized)]
+    return list(dict.fromkeys(normalized[i:] for i in starts if normalized[i:]))
+
+
+class PrefixIndex:
+    """Sorted array of suffix keys with per-value counts"""
+
+    def __init__(self):
+        self._keys = []
+        self._counts = {}
+        self._display = {}
+        self._top = {}
+
+    def _invalidate(self, normalized):
+        for suffix in _word_suffixes(normalized):
+            for end in range(1, len(suffix) + 1):
+                self._top.pop(suffix[:end], None)
+
+    @classmethod
+    def build(cls, rows):
+        """Index of (value, count) rows, with the keys sorted once at the end"""
+        index = cls()
+        for value, count in rows:
+            normalized = normalize(value)
+            if not normalized:
+                continue
+            if normalized in index._counts:
+                index._counts[normalized] += count
+                continue
+            index._counts[normalized] = count
+            index._display[normalized] = value.strip()
+            index._keys.extend((suffix, normalized) for suffix in _word_suffixes(normalized))
+        index._keys.sort()
+        return index
+
+    def add(self, value, count=1):
+        normalized = normalize(value)
+        if not normalized:
+            return
+        if normalized in self._counts:
+            self._counts[normalized] += count
+        else:
+            self._counts[normalized] = count
+            self._display[normalized] = value.strip()
+            for suffix in _word_suffixes(normalized):
+                insort(self._keys, (suffix, normalized))
+        self._invalidate(normalized)
+
+    def remove(self, value):
+        normalized = normalize(value)
+        if normalized not in self._counts:
+            return
+        self._counts[normalized] -= 1
+        if self._counts[normalized] <= 0:
+            del self._counts[normalized]
+            del self._display[normalized]
+            for suffix in _word_suffixes(normalized):
+                i = bisect_left(self._keys, (suffix, normalized))
+                if i < len(self._keys) and self._keys[i] == (suffix, normalized):
+                    del self._keys[i]
+        self._invalidate(normalized)
+
+    def complete(self, prefix, limit=8):
+        """Most used values with a word starting with prefix, as (value, count)"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        top = self._top.get(prefix)
+        # A memoized ranking is reusable unless it was cut off below this limit
+        if top is None or (limit > top.limit and len(top) == top.limit):
+            lo = bisect_left(self._keys, (prefix,))
+            hi = bisect_left(self._keys, (prefix + '\uffff',))
+            values = {normalized for _, normalized in self._keys[lo:hi]}
+            top = _Ranked(
+                heapq.nsmallest(limit, values, key=lambda v: (-self._counts[v], v)),
+                limit,
+            )
+            if hi - lo > SCAN_LIMIT:
+                self._top[prefix] = top
+        return [(self._display[v], self._counts[v]) for v in top[:limit]]
+
+    def __len__(self):
+        return len(self._counts)
+
+
+class _Ranked(list):
+    """Ranked values remembered together with the limit they were ranked for"""
+
+    def __init__(self, values, limit):
+        super().__init__(values)
+        self.limit = limit
+
+
+class JobAutocomplete:
+    """One PrefixIndex per autocomplete field, built lazily from Job"""
+
+    def __init__(self):
+        self._indexes = None
+        self._built_at = 0
+        self._version = None
+        self._lock = threading.Lock()
+        # Held while the indexes are rebuilt, which happens outside _lock
+        self._build_lock = threading.Lock()
+
+    def _max_age(self):
+        return getattr(settings, 'AUTOCOMPLETE_MAX_AGE', 300)
+
+    def _is_fresh(self, version):
+        return (
+            self._indexes is not None and self._version == version and
+            time.monotonic() - self._built_at < self._max_age()
+        )
+
+    def _current(self):
+        """
+        The indexes to answer from. Stale indexes are rebuilt by the request
+        that notices it while the others keep answering from them; only the
+        first build, with nothing to answer from yet, is waited for.
+        """
+        version = versions.current(versions.AUTOCOMPLETE)
+        with self._lock:
+            if self._is_fresh(version):
+                return self._indexes
+            indexes = self._indexes
+        if not self._build_lock.acquire(blocking=indexes is None):
+            return indexes
+        try:
+            with self._lock:
+                if self._is_fresh(version):
+                    return self._indexes
+            indexes = self._build()
+            with self._lock:
+                self._indexes = indexes
+                self._version = version
+                self._built_at = time.monotonic()
+            return indexes
+        finally:
+            self._build_lock.release()
+
+    def warm(self):
+        """
+        Build the indexes in a background thread, so the first autocomplete
+        request does not wait for them. In-memory SQLite (the test database)
+        cannot be read from a second thread while the first one writes, so
+        there the indexes are left to be built on first use.
+        """
+        from django.db import connection
+
+        if self._indexes is not None:
+            return
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            return
+        threading.Thread(target=self._warm, name='autocomplete-warmup', daemon=True).start()
+
+    def _warm(self):
+        from django.db import DatabaseError, connections
+
+        try:
+            self._current()
+        except DatabaseError:
+            logger.exception('Could not build the autocomplete index; it is built on first use')
+        finally:
+            connections.close_all()
+
+    def _build(self):
+        from django.db.models import Count
+        from .models import Job
+
+        return {
+            field: PrefixIndex.build(
+                Job.objects.values_list(field).annotate(n=Count('id')).order_by().iterator(chunk_size=2000)
+            )
+            for field in AUTOCOMPLETE_FIELDS
+        }
+
+    def suggest(self, prefix, fields=AUTOCOMPLETE_FIELDS, limit=8):
+        """Top suggestions across fields as dicts ordered by job count"""
+        indexes = self._current()
+        with self._lock:
+            suggestions = [
+                {'field': field, 'value': value, 'count': count}
+                for field in fields
+                for value, count in indexes[field].complete(prefix, limit)
+            ]
+        suggestions.sort(key=lambda s: (-s['count'], s['value'].lower()))
+        return suggestions[:limit]
+
+    def job_changed(self, old, new):
+        """
+        Move a job's values from their previous state to the new one (dicts
+        as made by autocomplete_values; old is None for a new job)
+        """
+        with self._lock:
+            if self._indexes is None:
+                return
+            for field in AUTOCOMPLETE_FIELDS:
+                new_value = new[field]
+                if old is not None:
+                    if normalize(old[field]) == normalize(new_value):
+                        continue
+                    self._indexes[field].remove(old[field])
+                self._indexes[field].add(new_value)
+
+    def job_removed(self, values):
+        with self._lock:
+            if self._indexes is None:
+                return
+            for field in AUTOCOMPLETE_FIELDS:
+                self._indexes[field].remove(values[field])
+
+
+job_autocomplete = JobAutocomplete()
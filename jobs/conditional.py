@@ -0,0 +1,62 @@
+"""
+ETag / Last-Modified validators for the job pages.
+
+Views compute their validators cheaply (job versions and update
+timestamps, or the shared jobs version counter for job_list) before doing
+any other work, and return the 304 from conditional_response without
+rendering. Pages differ per user (navbar,
+saved badges), so the ETag covers the user too and responses are marked
+private. Requests with flash messages waiting are always rendered in full,
+since a 304 would leave the messages undisplayed.
+"""
+import hashlib
+
+from django.contrib import messages
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.sha1(repr(parts).encode()).hexdigest())
+
+
+def user_state(request):
+    """The per-user parts of a page: who is logged in and what they saved"""
+    from .saved import saved_job_ids
+
+    user = request.user
+    if not user.is_authenticated:
+        return (None,)
+    return (user.pk, user.get_username(), tuple(sorted(saved_job_ids(user))))
+
+
+def has_pending_messages(request):
+    # len() does not mark the messages as consumed
+    return len(messages.get_messages(request)) > 0
+
+
+def set_validators(response, etag=None, last_modified=None):
+    if etag is not None:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def conditional_response(request, etag=None, last_modified=None):
+    """
+    A 304 (or 412) response when the request's validators still match,
+    otherwise None and the view renders as usual
+    """
+    if request.method not in ('GET', 'HEAD') or has_pending_messages(request):
+        return None
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified is not None else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
@@ -0,0 +1,314 @@
+"""
+Streaming bulk exports: jobs as NDJSON or CSV, and employers' applications
+as CSV or Parquet.
+
+Rows are read with values_list(...).iterator() (joins are done by the
+database, so no model instances are built) and encoded in batches as the
+output is consumed, so memory use does not grow with the size of the table.
+
+Job exports are ordered by (updated_at, id) and report the position of the
+newest change they cover as a cursor. Passing it back as `since` returns
+the jobs created or edited after it, followed by a row with deleted=true
+for each job deleted after it (kept as DeletedJob tombstones; deletes are
+reported whatever the filters, since a deleted job no longer has fields to
+filter on).
+
+updated_at is stamped when a job is saved, not when its transaction
+commits, so a change can become visible with a timestamp older than a
+cursor already handed out, and would then be skipped by every later sync.
+The cursor therefore stops JOB_EXPORT_CURSOR_LAG seconds short of the
+present; it must be well above the longest transaction that writes jobs
+(an import_jobs batch included).
+"""
+import base64
+import csv
+import io
+import json
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+EXPORT_FIELDS = (
+    'id', 'title', 'company', 'description', 'salary', 'location', 'job_type',
+    'location_key', 'latitude', 'longitude',
+)
+EXPORT_COLUMNS = EXPORT_FIELDS + ('deleted',)
+EXPORT_CHUNK_SIZE = 2000
+
+# Rows encoded per chunk handed to the server
+ROWS_PER_WRITE = 500
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class Echo:
+    """File-like object whose write() hands the encoded line back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def encode_cursor(position):
+    changed_at, job_id = position
+    payload = json.dumps([changed_at.isoformat(), job_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def parse_since(value):
+    """(changed_at, id) position from the `since` parameter; raises ValueError if malformed"""
+    if value in (None, ''):
+        return None
+    try:
+        padded = value + '=' * (-len(value) % 4)
+        changed_at, job_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        changed_at = parse_datetime(changed_at)
+    except (TypeError, ValueError):
+        raise ValueError('since must be a cursor from X-Export-Cursor')
+    if changed_at is None or not isinstance(job_id, int) or job_id < 0:
+        raise ValueError('since must be a cursor from X-Export-Cursor')
+    return changed_at, job_id
+
+
+def _after(time_field, id_field, position):
+    """Rows whose (time_field, id_field) comes after position"""
+    changed_at, job_id = position
+    return Q(**{f'{time_field}__gt': changed_at}) | Q(**{time_field: changed_at, f'{id_field}__gt': job_id})
+
+
+def cursor_lag():
+    """How far behind the present export cursors stop (see the module docstring)"""
+    return timedelta(seconds=getattr(settings, 'JOB_EXPORT_CURSOR_LAG', 300))
+
+
+def export_cursor(now=None):
+    """Position of the newest job change (edit or delete) that has settled"""
+    from .models import DeletedJob, Job
+
+    settled = (now or timezone.now()) - cursor_lag()
+    positions = [
+        position for position in (
+            Job.objects.filter(updated_at__lte=settled)
+            .order_by('-updated_at', '-id').values_list('updated_at', 'id').first(),
+            DeletedJob.objects.filter(deleted_at__lte=settled)
+            .order_by('-deleted_at', '-job_id').values_list('deleted_at', 'job_id').first(),
+        )
+        if position is not None
+    ]
+    # With no changes yet, everything up to the settled time is covered
+    return max(positions) if positions else (settled, 0)
+
+
+def export_rows(jobs, since=None, until=None):
+    """
+    Export rows of the jobs changed after since and up to until (positions
+    from export_cursor), then the tombstones of the jobs deleted in that
+    window when since is given
+    """
+    from .models import DeletedJob
+
+    if since is not None:
+        jobs = jobs.filter(_after('updated_at', 'id', since))
+    if until is not None:
+        # Rows changed while streaming belong to the next sync
+        jobs = jobs.exclude(_after('updated_at', 'id', until))
+    rows = jobs.order_by('updated_at', 'id').values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield row + (False,)
+    if since is None:
+        return
+
+    deleted = DeletedJob.objects.filter(_after('deleted_at', 'job_id', since))
+    if until is not None:
+        deleted = deleted.exclude(_after('deleted_at', 'job_id', until))
+    deleted = deleted.order_by('deleted_at', 'job_id').values_list('job_id', flat=True)
+    blank = (None,) * (len(EXPORT_FIELDS) - 1)
+    for job_id in deleted.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield (job_id,) + blank + (True,)
+
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= ROWS_PER_WRITE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_COLUMNS, row))) + '\n'
+
+
+def csv_lines(rows, header=EXPORT_COLUMNS):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_export(rows, fmt):
+    lines = csv_lines(rows) if fmt == 'csv' else ndjson_lines(rows)
+    return _batched(lines)
+
+
+# Application export columns and the lookups they are read from
+APPLICATION_EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('applied_at', 'applied_at'),
+    ('updated_at', 'updated_at'),
+    ('status', 'status'),
+    ('name', 'name'),
+    ('email', 'email'),
+    ('job_id', 'job_id'),
+    ('job_title', 'job__title'),
+    ('company', 'job__company'),
+    ('job_location', 'job__location'),
+    ('username', 'applicant__username'),
+    ('skills', 'applicant__profile__skills'),
+    ('github_username', 'applicant__profile__github_username'),
+    ('linkedin_username', 'applicant__profile__linkedin_username'),
+    ('resume', 'resume'),
+    ('cover_letter', 'cover_letter'),
+)
+APPLICATION_EXPORT_HEADER = tuple(name for name, _ in APPLICATION_EXPORT_COLUMNS)
+APPLICATION_EXPORT_FORMATS = ('csv', 'parquet')
+
+# Leading characters that make spreadsheets evaluate a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+SKILLS_INDEX = APPLICATION_EXPORT_HEADER.index('skills')
+
+
+class ParquetUnavailable(Exception):
+    pass
+
+
+def application_rows(applications):
+    """Export rows (tuples in APPLICATION_EXPORT_HEADER order), skills joined into text"""
+    rows = applications.order_by('id').values_list(
+        *(lookup for _, lookup in APPLICATION_EXPORT_COLUMNS)
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for row in rows:
+        skills = row[SKILLS_INDEX]
+        if isinstance(skills, list):
+            row = row[:SKILLS_INDEX] + (', '.join(map(str, skills)),) + row[SKILLS_INDEX + 1:]
+        yield row
+
+
+def spreadsheet_safe(value):
+    """Text with a leading quote if a spreadsheet would read it as a formula"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_application_csv(applications):
+    # Names, cover letters and profile fields are typed by applicants, and
+    # the CSV is meant to be opened in a spreadsheet
+    rows = (tuple(map(spreadsheet_safe, row)) for row in application_rows(applications))
+    return _batched(csv_lines(rows, APPLICATION_EXPORT_HEADER))
+
+
+def parquet_schema():
+    import pyarrow as pa
+
+    types = {
+        'id': pa.int64(),
+        'job_id': pa.int64(),
+        'applied_at': pa.timestamp('us', tz='UTC'),
+        'updated_at': pa.timestamp('us', tz='UTC'),
+    }
+    return pa.schema([(name, types.get(name, pa.string())) for name in APPLICATION_EXPORT_HEADER])
+
+
+def _parquet_writer():
+    """
+    pyarrow.parquet's ParquetWriter. Parquet is written through pyarrow (the
+    pandas Parquet engine, listed in requirements.txt); ParquetUnavailable is
+    raised when an install lacks it.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ParquetUnavailable('Parquet export requires pyarrow (pip install pyarrow)')
+    return pq.ParquetWriter
+
+
+def _parquet_row_groups(applications, schema):
+    """A pyarrow Table per EXPORT_CHUNK_SIZE applications"""
+    import pandas as pd
+    import pyarrow as pa
+
+    rows = application_rows(applications)
+    while True:
+        chunk = list(islice(rows, EXPORT_CHUNK_SIZE))
+        if not chunk:
+            return
+        frame = pd.DataFrame.from_records(chunk, columns=APPLICATION_EXPORT_HEADER)
+        yield pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+
+
+def write_application_parquet(applications, out):
+    """Write applications to a binary file object as Parquet, one row group per chunk"""
+    writer_class = _parquet_writer()
+    schema = parquet_schema()
+    with writer_class(out, schema) as writer:
+        for table in _parquet_row_groups(applications, schema):
+            writer.write_table(table)
+
+
+class DrainedSink(io.RawIOBase):
+    """Write-only file object whose written bytes are taken back by drain()"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_application_parquet(applications):
+    """
+    Parquet bytes of the applications, handed out as each row group is
+    written, so only one chunk is held in memory. Parquet only needs its
+    footer (the row group offsets) at the end, which is written last.
+    ParquetUnavailable is raised here rather than once streaming starts.
+    """
+    writer_class = _parquet_writer()
+
+    def chunks():
+        schema = parquet_schema()
+        sink = DrainedSink()
+        with writer_class(sink, schema) as writer:
+            for table in _parquet_row_groups(applications, schema):
+                writer.write_table(table)
+                yield sink.drain()
+        yield sink.drain()
+
+    return chunks()
@@ -0,0 +1,263 @@
+"""
+Precomputed facet counts for the job list filters.
+
+Every job falls into exactly one (job_type, normalized location, salary
+bucket) cell, and JobFacetCell keeps a running count per cell. Facet
+counts for any combination of filters are then sums over the (small)
+cell table instead of aggregates over Job.
+"""
+import re
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .geo import location_q, resolve_location
+
+SALARY_BUCKET_SIZE = 100000
+LOCATION_FACET_LIMIT = 10
+
+# Query-string parameter each facet filters on
+FACET_PARAMS = {
+    'job_type': 'job_type',
+    'location': 'location',
+    'salary': 'min_salary',
+}
+
+
+def normalize_location(location):
+    """
+    Canonical form of a free-text location: the gazetteer key of the place
+    it names ("Bangalore, KA" -> "bengaluru"), otherwise the first
+    comma-separated part, lowercased with whitespace collapsed
+    """
+    if not location:
+        return ''
+    place = resolve_location(location)
+    if place is not None:
+        return place.key
+    city = location.split(',')[0]
+    return re.sub(r'\s+', ' ', city).strip().lower()
+
+
+def salary_bucket(salary):
+    return (salary // SALARY_BUCKET_SIZE) * SALARY_BUCKET_SIZE
+
+
+def cell_key(job_type, location, salary):
+    return (job_type, normalize_location(location), salary_bucket(salary))
+
+
+def job_cell_key(job):
+    return cell_key(job.job_type, job.location, job.salary)
+
+
+def adjust_cell(key, delta, cell_model=None):
+    """
+    Add delta to the count of a cell, creating it on first use and
+    removing it once it is empty
+    """
+    if cell_model is None:
+        from .models import JobFacetCell
+        cell_model = JobFacetCell
+
+    job_type, location, bucket = key
+    cells = cell_model.objects.filter(job_type=job_type, location=location, salary_bucket=bucket)
+    with transaction.atomic():
+        if not cells.update(count=F('count') + delta):
+            try:
+                with transaction.atomic():
+                    cell_model.objects.create(
+                        job_type=job_type, location=location, salary_bucket=bucket, count=delta,
+                    )
+            except IntegrityError:
+                # Created concurrently; apply the delta to that row instead
+                cells.update(count=F('count') + delta)
+        cells.filter(count__lte=0).delete()
+
+
+def rebuild_cells(job_model=None, cell_model=None):
+    """
+    Recompute every cell from the Job table
+    """
+    if job_model is None or cell_model is None:
+        from .models import Job, JobFacetCell
+        job_model, cell_model = Job, JobFacetCell
+
+    counts = Counter()
+    rows = job_model.objects.values('job_type', 'location', 'salary').annotate(n=Count('id'))
+    for row in rows.iterator(chunk_size=2000):
+        counts[cell_key(row['job_type'], row['location'], row['salary'])] += row['n']
+
+    with transaction.atomic():
+        cell_model.objects.all().delete()
+        cell_model.objects.bulk_create([
+            cell_model(job_type=job_type, location=location, salary_bucket=bucket, count=n)
+            for (job_type, location, bucket), n in counts.items()
+        ], batch_size=1000)
+
+
+def parse_salary(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def can_use_cells(query=None, min_salary=None, max_salary=None, location=None):
+    """
+    Whether counts for these filters can be read from the cells alone:
+    free-text search needs the matching jobs, a typed location is matched
+    against the jobs' full location text (see location_q) while cells only
+    keep its normalized form, and salary bounds must fall on bucket
+    boundaries to select whole cells
+    """
+    if query or location:
+        return False
+    min_salary = parse_salary(min_salary)
+    max_salary = parse_salary(max_salary)
+    return (
+        (min_salary is None or min_salary % SALARY_BUCKET_SIZE == 0) and
+        (max_salary is None or (max_salary + 1) % SALARY_BUCKET_SIZE == 0)
+    )
+
+
+class FacetSource:
+    """
+    Rows to count for a set of filters, grouped per facet so each facet can
+    be counted with every filter except its own
+    """
+
+    def __init__(self, query=None, location=None, job_type=None, min_salary=None,
+                 max_salary=None, near_keys=None):
+        from .models import Job, JobFacetCell
+        from .search import search_jobs
+
+        min_salary = parse_salary(min_salary)
+        max_salary = parse_salary(max_salary)
+        place = Q()
+
+        if can_use_cells(query, min_salary, max_salary, location):
+            self.rows = JobFacetCell.objects.all()
+            self.total = Sum('count')
+            self.salary_field = 'salary_bucket'
+            if near_keys is not None:
+                place &= Q(location__in=near_keys)
+        else:
+            self.rows = Job.objects.all()
+            if query:
+                matches = search_jobs(Job.objects.all(), query).order_by().values('id')
+                self.rows = self.rows.filter(id__in=matches)
+            self.total = Count('id')
+            self.salary_field = 'salary'
+            if location:
+                place &= location_q(location)
+            if near_keys is not None:
+                place &= Q(location_key__in=near_keys)
+
+        salary = Q()
+        if min_salary is not None:
+            salary &= Q(**{f'{self.salary_field}__gte': min_salary})
+        if max_salary is not None:
+            salary &= Q(**{f'{self.salary_field}__lte': max_salary})
+        self.filters = {
+            'location': place,
+            'job_type': Q(job_type=job_type) if job_type else Q(),
+            'salary': salary,
+        }
+
+    def excluding(self, facet):
+        rows = self.rows
+        for name, condition in self.filters.items():
+            if name != facet and condition:
+                rows = rows.filter(condition)
+        return rows.order_by()
+
+    def counts(self, facet, field):
+        return self.excluding(facet).values_list(field).annotate(n=self.total)
+
+    def salary_buckets(self):
+        buckets = Counter()
+        for value, n in self.counts('salary', self.salary_field):
+            buckets[salary_bucket(value)] += n
+        return buckets
+
+
+def facet_counts(query=None, location=None, job_type=None, min_salary=None, max_salary=None,
+                 near_keys=None):
+    """
+    Counts per job type, location and salary threshold for the active
+    filters. Each facet ignores its own filter so the sidebar shows what
+    selecting another value would return.
+
+    When the filters cannot be answered from the cells (see
+    can_use_cells), the counts are aggregated over the matching jobs.
+    """
+    from .models import Job
+
+    source = FacetSource(query, location, job_type, min_salary, max_salary, near_keys)
+
+    type_counts = dict(source.counts('job_type', 'job_type'))
+    job_types = [
+        {'value': value, 'label': label, 'count': type_counts.get(value, 0)}
+        for value, label in Job.JOB_TYPE_CHOICES
+    ]
+
+    location_counts = Counter()
+    for value, n in source.counts('location', 'location'):
+        location_counts[normalize_location(value)] += n
+    ranked = sorted(
+        (item for item in location_counts.items() if item[0]),
+        key=lambda item: (-item[1], item[0]),
+    )
+    locations = [
+        {'value': value, 'count': n}
+        for value, n in ranked[:LOCATION_FACET_LIMIT]
+    ]
+
+    bucket_counts = source.salary_buckets()
+    # Cumulative from the top: jobs paying at least each bucket's lower bound
+    salaries = []
+    running = 0
+    for bucket in sorted(bucket_counts, reverse=True):
+        running += bucket_counts[bucket]
+        if bucket > 0:
+            salaries.append({'value': bucket, 'count': running})
+    salaries.reverse()
+
+    return {
+        'job_type': job_types,
+        'location': locations,
+        'salary': salaries,
+    }
+
+
+def salary_histogram(query=None, location=None, job_type=None, near_keys=None):
+    """
+    Jobs per salary bucket for the non-salary filters, lowest bucket first
+    """
+    buckets = FacetSource(query, location, job_type, near_keys=near_keys).salary_buckets()
+    return [
+        {'min': bucket, 'max': bucket + SALARY_BUCKET_SIZE - 1, 'count': buckets[bucket]}
+        for bucket in sorted(buckets)
+        if buckets[bucket]
+    ]
+
+
+def add_facet_urls(facets, params, selected):
+    """
+    Attach a toggle URL and selected flag to every facet value, keeping the
+    other query parameters and dropping any pagination cursor
+    """
+    for facet, options in facets.items():
+        for option in options:
+            option_params = params.copy()
+            option_params.pop('cursor', None)
+            is_selected = str(option['value']) == str(selected.get(facet) or '')
+            if is_selected:
+                option_params.pop(FACET_PARAMS[facet], None)
+            else:
+                option_params[FACET_PARAMS[facet]] = option['value']
+            option['selected'] = is_selected
+            option['url'] = f'?{option_params.urlencode()}'
+    return facets
@@ -0,0 +1,116 @@
+"""
+SQLite FTS5 mirror of jobs_job used by the 'fts5' search backend.
+
+The virtual table is an external-content index over jobs_job, so only the
+token index is stored; triggers keep it in sync on insert/update/delete.
+"""
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'jobs_job_fts'
+
+# bm25() weights for the indexed columns, in declaration order
+COLUMN_WEIGHTS = (10.0, 5.0, 1.0)
+
+# Markers wrapped around matches by snippet(); replaced after HTML escaping
+HIGHLIGHT_OPEN = '\x02'
+HIGHLIGHT_CLOSE = '\x03'
+
+SNIPPET_TOKENS = 24
+
+CREATE_TABLE_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    title, company, description,
+    content='jobs_job', content_rowid='id'
+)
+"""
+
+TRIGGERS_SQL = {
+    f'{FTS_TABLE}_ai': f"""
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON jobs_job BEGIN
+    INSERT INTO {FTS_TABLE}(rowid, title, company, description)
+    VALUES (new.id, new.title, new.company, new.description);
+END
+""",
+    f'{FTS_TABLE}_ad': f"""
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON jobs_job BEGIN
+    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, company, description)
+    VALUES ('delete', old.id, old.title, old.company, old.description);
+END
+""",
+    f'{FTS_TABLE}_au': f"""
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON jobs_job BEGIN
+    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, company, description)
+    VALUES ('delete', old.id, old.title, old.company, old.description);
+    INSERT INTO {FTS_TABLE}(rowid, title, company, description)
+    VALUES (new.id, new.title, new.company, new.description);
+END
+""",
+}
+
+
+def is_supported(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def install(conn=None):
+    """
+    Create the FTS table and its sync triggers if they are missing.
+
+    SQLite rebuilds jobs_job for many schema changes, which drops the
+    triggers, so this also runs after every migrate. The index is rebuilt
+    from jobs_job whenever a trigger had to be (re)created.
+    """
+    conn = conn or connection
+    if not is_supported(conn):
+        return
+
+    with conn.cursor() as cursor:
+        cursor.execute(CREATE_TABLE_SQL)
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'jobs_job'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in TRIGGERS_SQL if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGERS_SQL[name])
+        if missing:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall(conn=None):
+    conn = conn or connection
+    if not is_supported(conn):
+        return
+
+    with conn.cursor() as cursor:
+        for name in TRIGGERS_SQL:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def match_expression(terms):
+    """
+    FTS5 MATCH string requiring every term (each quoted as a string token)
+    """
+    return ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+
+
+def search(jobs, terms):
+    """
+    Restrict a Job queryset to FTS matches, annotated with a BM25-based
+    relevance (higher is better) and a highlighted description snippet
+    """
+    match = match_expression(terms)
+    weights = ', '.join(str(w) for w in COLUMN_WEIGHTS)
+    correlated = f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = jobs_job.id'
+
+    return jobs.filter(
+        id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+    ).annotate(
+        relevance=RawSQL(f'SELECT -bm25({FTS_TABLE}, {weights}) {correlated}', [match]),
+        snippet=RawSQL(
+            f"SELECT snippet({FTS_TABLE}, 2, %s, %s, '…', {SNIPPET_TOKENS}) {correlated}",
+            [HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE, match],
+        ),
+    ).order_by('-relevance', '-id')
@@ -0,0 +1,154 @@
+"""
+Per-job application counts by funnel status.
+
+JobStatusCount keeps a running count of the applications to each job in
+each status, so dashboards read an employer's whole funnel from one
+indexed query instead of aggregating Application. The counts are adjusted
+in the same transaction as the change: the Application signal receivers
+handle single saves and deletes, and set_status handles bulk transitions.
+`manage.py reconcile_funnel_counts` repairs any drift, e.g. after raw
+fixture loads or queryset updates that bypass both.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+
+def _count_model():
+    from .models import JobStatusCount
+    return JobStatusCount
+
+
+def adjust_status_count(job_id, status, delta, count_model=None):
+    """
+    Add delta to the count of a job's status, creating the row on first
+    use and removing it once it is empty
+    """
+    count_model = count_model or _count_model()
+    counts = count_model.objects.filter(job_id=job_id, status=status)
+    with transaction.atomic():
+        if not counts.update(count=F('count') + delta):
+            if delta <= 0:
+                # Nothing counted yet (or the job is being deleted)
+                return
+            try:
+                with transaction.atomic():
+                    count_model.objects.create(job_id=job_id, status=status, count=delta)
+            except IntegrityError:
+                # Created concurrently; apply the delta to that row instead
+                counts.update(count=F('count') + delta)
+        counts.filter(count__lte=0).delete()
+
+
+def set_status(applications, status):
+    """
+    Move every application in the queryset to a status with one UPDATE,
+    adjusting the counts for the rows that changed. Returns that number.
+    """
+    from django.utils import timezone
+
+    with transaction.atomic():
+        rows = list(
+            applications.exclude(status=status).select_for_update()
+            .values_list('id', 'job_id', 'status')
+        )
+        if not rows:
+            return 0
+        updated = applications.model.objects.filter(id__in=[row[0] for row in rows]).update(
+            status=status, updated_at=timezone.now(),
+        )
+        deltas = Counter()
+        for _, job_id, old_status in rows:
+            deltas[job_id, old_status] -= 1
+            deltas[job_id, status] += 1
+        for (job_id, job_status), delta in sorted(deltas.items()):
+            adjust_status_count(job_id, job_status, delta)
+    return updated
+
+
+def actual_counts(application_model=None):
+    """Count applications per (job, status) from the Application table"""
+    if application_model is None:
+        from .models import Application
+        application_model = Application
+
+    rows = application_model.objects.order_by().values_list('job_id', 'status').annotate(n=Count('id'))
+    return {(job_id, status): n for job_id, status, n in rows.iterator(chunk_size=2000)}
+
+
+def rebuild_status_counts(application_model=None, count_model=None):
+    """
+    Recompute every count from the Application table
+    """
+    count_model = count_model or _count_model()
+    counts = actual_counts(application_model)
+    with transaction.atomic():
+        count_model.objects.all().delete()
+        count_model.objects.bulk_create([
+            count_model(job_id=job_id, status=status, count=n)
+            for (job_id, status), n in counts.items()
+        ], batch_size=1000)
+
+
+def reconcile(dry_run=False):
+    """
+    Compare the counts with the Application table and fix the rows that
+    differ. Returns the {(job_id, status): (stored, actual)} differences.
+    """
+    count_model = _count_model()
+    with transaction.atomic():
+        actual = actual_counts()
+        stored = {
+            (job_id, status): n
+            for job_id, status, n in count_model.objects.values_list('job_id', 'status', 'count')
+        }
+        diff = {
+            key: (stored.get(key, 0), actual.get(key, 0))
+            for key in stored.keys() | actual.keys()
+            if stored.get(key, 0) != actual.get(key, 0)
+        }
+        if dry_run or not diff:
+            return diff
+        for (job_id, status), (_, n) in diff.items():
+            if n:
+                count_model.objects.update_or_create(job_id=job_id, status=status, defaults={'count': n})
+            else:
+                count_model.objects.filter(job_id=job_id, status=status).delete()
+    return diff
+
+
+def funnel_counts(job_ids):
+    """Read {job_id: {status: count}} for a set of jobs in one query"""
+    funnels = {}
+    rows = _count_model().objects.filter(job_id__in=job_ids).values_list('job_id', 'status', 'count')
+    for job_id, status, n in rows:
+        funnels.setdefault(job_id, {})[status] = n
+    return funnels
+
+
+def status_totals(jobs):
+    """Read {status: count} summed over a queryset of jobs in one query"""
+    rows = (
+        _count_model().objects.filter(job__in=jobs).order_by()
+        .values_list('status').annotate(n=Sum('count'))
+    )
+    return dict(rows)
+
+
+def attach_funnels(jobs):
+    """
+    Set applicant_count and funnel, a list of (status label, count) in
+    funnel order, on each job. Returns the jobs as a list.
+    """
+    from .models import Application
+
+    jobs = list(jobs)
+    funnels = funnel_counts([job.id for job in jobs])
+    for job in jobs:
+        counts = funnels.get(job.id, {})
+        job.applicant_count = sum(counts.values())
+        job.funnel = [
+            (label, counts[status]) for status, label in Application.STATUS_CHOICES if counts.get(status)
+        ]
+    return jobs
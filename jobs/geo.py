@@ -0,0 +1,171 @@
+"""
+Offline location normalization and radius search for jobs.
+
+Free-text locations are resolved against the gazetteer bundled in
+jobs/data/gazetteer.csv (no geocoding service is involved). Resolved jobs
+store the place key and its coordinates. Because every stored coordinate
+is a gazetteer point, "within N km of X" reduces to finding the gazetteer
+places in range, which a uniform lat/lon grid over the gazetteer answers
+without scanning it, and then an indexed location_key__in lookup on Job.
+"""
+import csv
+import math
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from django.db.models import Q
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / 'data' / 'gazetteer.csv'
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.2
+
+# Size of a grid cell in degrees
+GRID_DEGREES = 1.0
+
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 1000
+
+# Longest alias in words; bounds the n-grams tried when resolving
+MAX_NAME_WORDS = 3
+
+
+def normalize_name(text):
+    return re.sub(r'[^a-z0-9]+', ' ', (text or '').lower()).strip()
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2 +
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class Place:
+    def __init__(self, name, state, latitude, longitude):
+        self.name = name
+        self.state = state
+        self.latitude = latitude
+        self.longitude = longitude
+        self.key = normalize_name(name)
+
+    def __repr__(self):
+        return f'<Place {self.name}, {self.state}>'
+
+
+class Gazetteer:
+    def __init__(self, places, aliases=None):
+        self.places = {place.key: place for place in places}
+        self.names = {place.key: place for place in places}
+        for alias, key in (aliases or {}).items():
+            self.names.setdefault(alias, self.places[key])
+        self.grid = {}
+        for place in places:
+            self.grid.setdefault(self._cell(place.latitude, place.longitude), []).append(place)
+
+    @classmethod
+    def load(cls, path=GAZETTEER_PATH):
+        places = []
+        aliases = {}
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                place = Place(
+                    row['name'], row['state'], float(row['latitude']), float(row['longitude']),
+                )
+                places.append(place)
+                for alias in filter(None, (row.get('aliases') or '').split('|')):
+                    aliases[normalize_name(alias)] = place.key
+        return cls(places, aliases)
+
+    @staticmethod
+    def _cell(latitude, longitude):
+        return (math.floor(latitude / GRID_DEGREES), math.floor(longitude / GRID_DEGREES))
+
+    def resolve(self, text):
+        """
+        Place named in a free-text location, trying each comma-separated
+        part in order and, within a part, the longest word n-grams first
+        ("Hinjewadi Phase 1, Pune, Maharashtra" -> Pune)
+        """
+        for part in re.split(r'[,;/|()]', text or ''):
+            words = normalize_name(part).split()
+            for size in range(min(len(words), MAX_NAME_WORDS), 0, -1):
+                for start in range(len(words) - size + 1):
+                    place = self.names.get(' '.join(words[start:start + size]))
+                    if place is not None:
+                        return place
+        return None
+
+    def within(self, latitude, longitude, radius_km):
+        """Places within radius_km of a point, nearest first, as (place, km)"""
+        lat_span = radius_km / KM_PER_DEGREE_LAT
+        cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+        lon_span = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+        lat_lo, lon_lo = self._cell(latitude - lat_span, longitude - lon_span)
+        lat_hi, lon_hi = self._cell(latitude + lat_span, longitude + lon_span)
+
+        found = []
+        for lat_cell in range(lat_lo, lat_hi + 1):
+            for lon_cell in range(lon_lo, lon_hi + 1):
+                for place in self.grid.get((lat_cell, lon_cell), ()):
+                    distance = haversine_km(latitude, longitude, place.latitude, place.longitude)
+                    if distance <= radius_km:
+                        found.append((place, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+
+@lru_cache(maxsize=1)
+def get_gazetteer():
+    return Gazetteer.load()
+
+
+def resolve_location(text):
+    return get_gazetteer().resolve(text)
+
+
+def locate_job(job):
+    """Set a job's location_key and coordinates from its free-text location"""
+    place = resolve_location(job.location)
+    if place is None:
+        job.location_key = ''
+        job.latitude = job.longitude = None
+    else:
+        job.location_key = place.key
+        job.latitude = place.latitude
+        job.longitude = place.longitude
+
+
+def parse_radius(value):
+    try:
+        radius = float(value) if value not in (None, '') else DEFAULT_RADIUS_KM
+    except (TypeError, ValueError):
+        radius = DEFAULT_RADIUS_KM
+    return min(max(radius, 0), MAX_RADIUS_KM)
+
+
+def nearby_keys(near, radius_km):
+    """
+    Keys of the gazetteer places within radius_km of the place named by
+    `near`, or None if it cannot be resolved
+    """
+    origin = resolve_location(near)
+    if origin is None:
+        return None
+    gazetteer = get_gazetteer()
+    return [place.key for place, _ in gazetteer.within(origin.latitude, origin.longitude, radius_km)]
+
+
+def location_q(location):
+    """
+    Job filter for a typed location: the free-text match, plus every job
+    resolved to the same place (so "Bangalore" finds "Bengaluru, KA")
+    """
+    condition = Q(location__icontains=location)
+    place = resolve_location(location)
+    if place is not None:
+        condition |= Q(location_key=place.key)
+    return condition
@@ -0,0 +1,203 @@
+"""
+Batched import of partner job feeds (CSV or JSON lines).
+
+Rows are streamed from the file, validated against Job's field rules and
+written in batches: one transaction per batch, with the jobs already stored
+under the batch's external ids fetched in a single query and the rest
+written through bulk_create / bulk_update. Memory use is bounded by the
+batch size, not by the feed.
+
+bulk_create and bulk_update do not send Job signals, so each batch also
+brings the derived data up to date itself: location resolution, version
+and updated_at, the owning employer, the search index, facet cells and
+the similar-jobs queue (the FTS5 table follows through its triggers). Each
+batch also bumps the shared jobs version and the counters of the job_list
+pages its rows could appear on, so every web process drops those pages,
+and the autocomplete version is bumped once the import finishes, so every
+process rebuilds its index (see jobs.versions).
+
+Invalid rows are counted; only the first MAX_KEPT_ERRORS are kept.
+"""
+import csv
+import json
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from employer.ownership import company_key, owners_by_company
+
+from .facets import adjust_cell, job_cell_key
+from .geo import locate_job
+from .result_cache import changed_counters, invalidate, listing_state
+from .search import index_jobs
+from .signals import SIMILARITY_FIELDS
+from . import versions
+
+IMPORT_FIELDS = ('title', 'company', 'description', 'salary', 'location', 'job_type')
+KEY_FIELD = 'external_id'
+
+# Fields written on update besides the imported ones
+DERIVED_FIELDS = ('employer', 'location_key', 'latitude', 'longitude', 'updated_at', 'version')
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Invalid rows kept for the report; the rest are only counted
+MAX_KEPT_ERRORS = 20
+
+
+class RowError(Exception):
+    def __init__(self, line, message):
+        super().__init__(f'line {line}: {message}')
+        self.line = line
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, row dict or RowError) from a CSV or JSONL stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as exc:
+            yield line, RowError(line, f'invalid JSON ({exc})')
+            continue
+        if not isinstance(row, dict):
+            yield line, RowError(line, 'expected a JSON object')
+            continue
+        yield line, row
+
+
+def build_job(row, line):
+    """Unsaved Job from a feed row, cleaned with the model's field rules"""
+    from .models import Job
+
+    values = {}
+    for field in IMPORT_FIELDS + (KEY_FIELD,):
+        value = row.get(field)
+        values[field] = value.strip() if isinstance(value, str) else value
+    if not values[KEY_FIELD]:
+        raise RowError(line, f'missing {KEY_FIELD}')
+    values[KEY_FIELD] = str(values[KEY_FIELD])
+
+    job = Job(**values)
+    try:
+        # Converts the values in place (e.g. salary strings to int)
+        job.clean_fields(exclude=DERIVED_FIELDS)
+    except ValidationError as exc:
+        errors = '; '.join(
+            f'{field}: {" ".join(messages)}' for field, messages in exc.message_dict.items()
+        )
+        raise RowError(line, errors)
+    return job
+
+
+class ImportStats:
+    def __init__(self, max_errors=MAX_KEPT_ERRORS):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.invalid = 0
+        # The first max_errors RowErrors, in feed order
+        self.errors = []
+        self.max_errors = max_errors
+
+    def add_error(self, error):
+        self.invalid += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(error)
+
+
+class JobImporter:
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, on_batch=None):
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self.stats = ImportStats()
+        self.owners = None
+
+    def run(self, rows):
+        batch = {}
+        for line, row in rows:
+            self.stats.rows += 1
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                job = build_job(row, line)
+            except RowError as exc:
+                self.stats.add_error(exc)
+                continue
+            # A later row for the same key replaces an earlier one
+            batch[job.external_id] = job
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = {}
+        if batch:
+            self.flush(batch)
+
+        versions.bump(versions.AUTOCOMPLETE)
+        return self.stats
+
+    def flush(self, batch):
+        from .models import Job, SimilarityRefresh
+
+        now = timezone.now()
+        created, updated, refresh = [], [], []
+        cell_deltas = Counter()
+        listings = set()
+        if self.owners is None:
+            self.owners = owners_by_company()
+
+        with transaction.atomic():
+            existing = Job.objects.in_bulk(list(batch), field_name=KEY_FIELD)
+            for key, job in batch.items():
+                locate_job(job)
+                stored = existing.get(key)
+                if stored is None:
+                    job.employer_id = self.owners.get(company_key(job.company))
+                    created.append(job)
+                    cell_deltas[job_cell_key(job)] += 1
+                    listings |= changed_counters(None, listing_state(job))
+                    continue
+                if all(getattr(stored, field) == getattr(job, field) for field in IMPORT_FIELDS):
+                    self.stats.unchanged += 1
+                    continue
+                cell_deltas[job_cell_key(stored)] -= 1
+                cell_deltas[job_cell_key(job)] += 1
+                listings |= changed_counters(listing_state(stored), listing_state(job))
+                if any(getattr(stored, field) != getattr(job, field) for field in SIMILARITY_FIELDS):
+                    refresh.append(stored)
+                for field in IMPORT_FIELDS + ('location_key', 'latitude', 'longitude'):
+                    setattr(stored, field, getattr(job, field))
+                if stored.employer_id is None:
+                    stored.employer_id = self.owners.get(company_key(stored.company))
+                stored.updated_at = now
+                stored.version += 1
+                updated.append(stored)
+
+            Job.objects.bulk_create(created, batch_size=self.batch_size)
+            Job.objects.bulk_update(updated, IMPORT_FIELDS + DERIVED_FIELDS, batch_size=self.batch_size)
+
+            index_jobs(created + updated)
+            for key, delta in cell_deltas.items():
+                if delta:
+                    adjust_cell(key, delta)
+            SimilarityRefresh.objects.bulk_create(
+                [SimilarityRefresh(job_id=job.pk) for job in created + refresh],
+                update_conflicts=True, unique_fields=['job'], update_fields=['queued_at'],
+            )
+            if created or updated:
+                versions.bump(versions.JOBS)
+            invalidate(listings)
+
+        self.stats.created += len(created)
+        self.stats.updated += len(updated)
+        if self.on_batch is not None:
+            self.on_batch(self.stats)
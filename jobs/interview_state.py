@@ -0,0 +1,158 @@
+"""
+Running state of an interview session, kept in InterviewSession.state.
+
+Rendering a question used to count the session's responses and average
+their scores on every request. The state holds what that needs instead:
+the ids of the questions answered, per-skill score sums and counts, the
+difficulty band the scores point to and the question currently shown.
+submit_answer updates it under a row lock together with the response, so
+reads are O(1) and need no query on the responses.
+
+An empty state ({}) marks a session whose state was never written; it is
+rebuilt from the session's responses when loaded.
+"""
+from django.db import transaction
+
+# Difficulties to try, in order, for each band
+BAND_DIFFICULTIES = {
+    'start': ('medium',),
+    'low': ('easy', 'medium'),
+    'mid': ('medium',),
+    'high': ('hard', 'medium'),
+}
+
+
+class SessionState:
+    def __init__(self, asked=(), skills=None, current=None):
+        self.asked = list(asked)
+        # skill -> [score sum, answers]
+        self.skills = {skill: list(totals) for skill, totals in (skills or {}).items()}
+        self.current = current
+        self._scores = {}
+
+    @classmethod
+    def from_json(cls, data):
+        state = cls(data.get('asked', ()), data.get('skills'), data.get('current'))
+        state._scores = {int(question_id): score for question_id, score in data.get('scores', {}).items()}
+        return state
+
+    def to_json(self):
+        return {
+            'asked': self.asked,
+            'scores': {str(question_id): score for question_id, score in self._scores.items()},
+            'skills': self.skills,
+            'band': self.band,
+            'current': self.current,
+        }
+
+    @classmethod
+    def from_responses(cls, rows):
+        """State from (question_id, skill, score) rows in answer order"""
+        state = cls()
+        for question_id, skill, score in rows:
+            state.record(question_id, skill, score)
+        return state
+
+    @property
+    def asked_ids(self):
+        return frozenset(self.asked)
+
+    @property
+    def answered(self):
+        return len(self.asked)
+
+    @property
+    def score_sum(self):
+        return sum(total for total, _ in self.skills.values())
+
+    @property
+    def average(self):
+        return self.score_sum / self.answered if self.asked else None
+
+    @property
+    def band(self):
+        """How the candidate is doing: picks the next question's difficulty"""
+        average = self.average
+        if average is None:
+            return 'start'
+        if average >= 4:
+            return 'high'
+        if average <= 2:
+            return 'low'
+        return 'mid'
+
+    @property
+    def difficulties(self):
+        return BAND_DIFFICULTIES[self.band]
+
+    def record(self, question_id, skill, score):
+        """Add an answer's score, replacing the earlier score of the same question"""
+        totals = self.skills.setdefault(skill, [0, 0])
+        if question_id in self._scores:
+            totals[0] += score - self._scores[question_id]
+        else:
+            self.asked.append(question_id)
+            totals[0] += score
+            totals[1] += 1
+        self._scores[question_id] = score
+        if self.current == question_id:
+            self.current = None
+
+    def skill_averages(self):
+        return {skill: total / count for skill, (total, count) in self.skills.items() if count}
+
+
+def load_state(session):
+    """A session's state, rebuilt from its responses if it was never written"""
+    if session.state:
+        return SessionState.from_json(session.state)
+    from .models import InterviewResponse
+
+    rows = (
+        InterviewResponse.objects.filter(interview_session=session)
+        .order_by('answered_at', 'id').values_list('question_id', 'question__skill', 'score')
+    )
+    return SessionState.from_responses(rows)
+
+
+def update_state(session_id, change):
+    """
+    Apply change(session, state) to a session's state under a row lock and
+    save it. Returns the locked session with the new state.
+    """
+    from .models import InterviewSession
+
+    with transaction.atomic():
+        session = InterviewSession.objects.select_for_update().get(id=session_id)
+        state = load_state(session)
+        change(session, state)
+        session.state = state.to_json()
+        session.save(update_fields=['state', 'status', 'completed_at'])
+    return session
+
+
+def refresh_states(session_ids):
+    """
+    Rebuild the state of these sessions from their responses, e.g. after
+    the responses were re-scored, keeping the question each one shows.
+    Call inside a transaction; the sessions are locked until it ends.
+    """
+    from .models import InterviewResponse, InterviewSession
+
+    sessions = list(InterviewSession.objects.select_for_update().filter(id__in=session_ids).only('id', 'state'))
+    rows = {}
+    responses = (
+        InterviewResponse.objects.filter(interview_session_id__in=[session.id for session in sessions])
+        .order_by('answered_at', 'id')
+        .values_list('interview_session_id', 'question_id', 'question__skill', 'score')
+    )
+    for session_id, question_id, skill, score in responses:
+        rows.setdefault(session_id, []).append((question_id, skill, score))
+    for session in sessions:
+        state = SessionState.from_responses(rows.get(session.id, ()))
+        current = session.state.get('current')
+        if current not in state.asked_ids:
+            state.current = current
+        session.state = state.to_json()
+    InterviewSession.objects.bulk_update(sessions, ['state'], batch_size=500)
+    return len(sessions)
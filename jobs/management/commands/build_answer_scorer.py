@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.scoring import answer_scorer, fit, fit_if_stale, scorer_path
+
+
+class Command(BaseCommand):
+    help = 'Fit the interview answer scorer on the question bank and save it for the web workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Refit even if the saved scorer was fitted on the current question bank',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        previous = answer_scorer.get()
+        scorer = fit() if options['force'] else fit_if_stale()
+        if scorer is previous:
+            self.stdout.write(f'{scorer_path()} is up to date')
+            return
+        answers, terms = scorer.matrix.shape if scorer.matrix is not None else (0, 0)
+        self.stdout.write(self.style.SUCCESS(
+            f'Fitted on {answers} expected answers ({terms} terms) '
+            f'in {time.monotonic() - started:.1f}s; saved to {scorer_path()}'
+        ))
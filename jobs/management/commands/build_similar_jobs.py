@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.similarity import CHUNK_SIZE, DEFAULT_TOP_K, build_full, index_path, refresh_incremental
+
+
+class Command(BaseCommand):
+    help = 'Compute the "similar jobs" lists from a TF-IDF index of job titles and descriptions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Only apply the queued job changes to the saved index',
+        )
+        parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K)
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['incremental'] and index_path().exists():
+            updated = refresh_incremental(chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Updated similar jobs for {updated} jobs in {time.monotonic() - started:.1f}s'
+            ))
+            return
+
+        if options['incremental']:
+            self.stdout.write(f'No index at {index_path()}, running a full build')
+        index, total = build_full(top_k=options['top_k'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {total} jobs ({index.matrix.shape[1]} terms) in {time.monotonic() - started:.1f}s'
+        ))
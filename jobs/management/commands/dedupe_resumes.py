@@ -0,0 +1,72 @@
+import os
+import shutil
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from accounts.models import Profile
+from jobs.models import Application, StoredBlob
+from jobs.storage import collect_unreferenced, hash_file, resume_storage
+
+
+class Command(BaseCommand):
+    help = (
+        'Move resumes uploaded before content-addressed storage under their hash, merging duplicates, '
+        'and delete stored resumes no longer referenced'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+
+    def handle(self, *args, **options):
+        tracked = set(StoredBlob.objects.values_list('name', flat=True))
+        names = set(Application.objects.values_list('resume', flat=True).distinct())
+        names |= set(Profile.objects.exclude(resume='').exclude(resume=None)
+                     .values_list('resume', flat=True).distinct())
+        legacy = sorted(name for name in names if name and name not in tracked)
+
+        moved = merged = missing = freed = 0
+        planned = set()
+        for name in legacy:
+            path = resume_storage.path(name)
+            if not os.path.exists(path):
+                missing += 1
+                self.stderr.write(f'Missing file: {name}')
+                continue
+            digest = hash_file(path)
+            size = os.path.getsize(path)
+            target = '/'.join(filter(None, (os.path.dirname(name), digest + os.path.splitext(name)[1].lower())))
+            target_path = resume_storage.path(target)
+            exists = os.path.exists(target_path)
+            if options['dry_run']:
+                duplicate = exists or target in planned
+                planned.add(target)
+                self.stdout.write(f'{name} -> {target}{" (duplicate)" if duplicate else ""}')
+                continue
+
+            if not exists:
+                # Copy first; the original goes only once no row points at it
+                shutil.copy2(path, target_path)
+            with transaction.atomic():
+                references = (
+                    Application.objects.filter(resume=name).update(resume=target) +
+                    Profile.objects.filter(resume=name).update(resume=target)
+                )
+                blob, _ = StoredBlob.objects.get_or_create(
+                    name=target, defaults={'sha256': digest, 'size': size},
+                )
+                StoredBlob.objects.filter(id=blob.id).update(refcount=F('refcount') + references)
+            os.remove(path)
+            freed += size if exists else 0
+            merged += exists
+            moved += not exists
+
+        if options['dry_run']:
+            return
+        # Blobs whose last reference went within the grace period, or whose
+        # upload never got a row saved
+        freed += collect_unreferenced()
+        self.stdout.write(self.style.SUCCESS(
+            f'{moved} resumes moved, {merged} duplicates merged, {missing} missing; {freed} bytes freed'
+        ))
@@ -0,0 +1,56 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.export import (APPLICATION_EXPORT_FORMATS, ParquetUnavailable, stream_application_csv,
+                         write_application_parquet)
+from jobs.models import Application
+
+
+class Command(BaseCommand):
+    help = 'Export applications joined with their job and applicant profile to CSV or Parquet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Output file, or - to write CSV to standard output')
+        parser.add_argument('--format', choices=APPLICATION_EXPORT_FORMATS, default='csv')
+        parser.add_argument('--employer', type=int, help='Only jobs owned by this employer id')
+        parser.add_argument('--company', help='Only jobs whose company contains this text')
+        parser.add_argument('--job', type=int, help='Only applications to this job id')
+        parser.add_argument('--status', choices=[value for value, _ in Application.STATUS_CHOICES])
+
+    def handle(self, *args, **options):
+        applications = Application.objects.all()
+        if options['employer']:
+            applications = applications.filter(job__employer_id=options['employer'])
+        if options['company']:
+            applications = applications.filter(job__company__icontains=options['company'])
+        if options['job']:
+            applications = applications.filter(job_id=options['job'])
+        if options['status']:
+            applications = applications.filter(status=options['status'])
+
+        output = options['output']
+        started = time.monotonic()
+        try:
+            if options['format'] == 'parquet':
+                if output == '-':
+                    raise CommandError('Parquet output needs a file path')
+                with open(output, 'wb') as f:
+                    write_application_parquet(applications, f)
+            elif output == '-':
+                for chunk in stream_application_csv(applications):
+                    sys.stdout.write(chunk)
+            else:
+                with open(output, 'w', newline='', encoding='utf-8') as f:
+                    for chunk in stream_application_csv(applications):
+                        f.write(chunk)
+        except ParquetUnavailable as exc:
+            raise CommandError(str(exc))
+        except OSError as exc:
+            raise CommandError(f'Cannot write {output}: {exc}')
+
+        if output != '-':
+            self.stdout.write(self.style.SUCCESS(
+                f'Exported applications to {output} in {time.monotonic() - started:.1f}s'
+            ))
@@ -0,0 +1,64 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.ingest import DEFAULT_BATCH_SIZE, JobImporter, read_rows
+
+FORMATS_BY_SUFFIX = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+
+class Command(BaseCommand):
+    help = 'Import or update jobs from a CSV or JSON lines feed, keyed on external_id'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Feed file, or - to read standard input')
+        parser.add_argument(
+            '--format', choices=('csv', 'jsonl'),
+            help='Feed format (default: from the file extension)',
+        )
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format']
+        if fmt is None:
+            suffix = '' if path == '-' else '.' + path.rsplit('.', 1)[-1].lower()
+            fmt = FORMATS_BY_SUFFIX.get(suffix)
+            if fmt is None:
+                raise CommandError('Cannot tell the feed format from the file name; pass --format')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        started = time.monotonic()
+
+        def report(stats):
+            if options['verbosity'] >= 2:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'{stats.rows} rows ({stats.rows / elapsed:.0f} rows/s)')
+
+        importer = JobImporter(batch_size=options['batch_size'], on_batch=report)
+        try:
+            if path == '-':
+                stats = importer.run(read_rows(sys.stdin, fmt))
+            else:
+                with open(path, newline='', encoding='utf-8') as f:
+                    stats = importer.run(read_rows(f, fmt))
+        except OSError as exc:
+            raise CommandError(f'Cannot read {path}: {exc}')
+
+        for error in stats.errors:
+            self.stderr.write(str(error))
+        if stats.invalid > len(stats.errors):
+            self.stderr.write(f'... and {stats.invalid - len(stats.errors)} more invalid rows')
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {stats.rows} rows in {elapsed:.1f}s ({stats.rows / elapsed:.0f} rows/s): '
+            f'{stats.created} created, {stats.updated} updated, '
+            f'{stats.unchanged} unchanged, {stats.invalid} invalid'
+        ))
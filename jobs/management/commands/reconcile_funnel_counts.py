@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from jobs.funnel import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Check the per-job funnel counts against the applications and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the differences')
+
+    def handle(self, *args, **options):
+        diff = reconcile(dry_run=options['dry_run'])
+        for (job_id, status), (stored, actual) in sorted(diff.items()):
+            self.stdout.write(f'Job {job_id} / {status}: counted {stored}, actually {actual}')
+        verb = 'differ' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f'{len(diff)} funnel counts {verb}'))
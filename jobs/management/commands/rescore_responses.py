@@ -0,0 +1,139 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from jobs.interview_state import refresh_states
+from jobs.models import InterviewResponse
+from jobs.scoring import fit_if_stale, init_worker, score_rows
+
+
+class Command(BaseCommand):
+    help = ('Re-score interview responses with the current scoring rules on a process pool, '
+            'then refresh the results of the sessions they belong to')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Responses read, scored and written per batch')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Scoring processes (1 scores in this process)')
+        parser.add_argument('--checkpoint', default=str(settings.BASE_DIR / 'rescore_responses.checkpoint'),
+                            help='File recording progress, to resume an interrupted run')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore an existing checkpoint and start from the first response')
+
+    def handle(self, *args, **options):
+        chunk_size, workers = options['chunk_size'], options['workers']
+        if chunk_size < 1 or workers < 1:
+            raise CommandError('--chunk-size and --workers must be positive')
+        self.checkpoint_path = options['checkpoint']
+
+        # Refitted (and saved for the web workers) if the bank changed since the last fit
+        scorer = fit_if_stale()
+
+        self.progress = {'last_id': 0, 'scanned': 0, 'changed': 0, 'sessions': 0, 'scorer': scorer.version}
+        if not options['restart'] and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+            # Responses before the checkpoint were scored by the scorer it names
+            if checkpoint.get('scorer') != scorer.version:
+                raise CommandError(
+                    f"The checkpoint in {self.checkpoint_path} was written with scorer version "
+                    f"{checkpoint.get('scorer')}, not the current {scorer.version}; "
+                    f"run with --restart to re-score every response"
+                )
+            self.progress.update(checkpoint)
+            self.stdout.write(f"Resuming after response {self.progress['last_id']}")
+
+        self.started = time.monotonic()
+        self.scanned_now = 0
+
+        pool = None
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(scorer,))
+        else:
+            init_worker(scorer)
+        # Chunks are scored in parallel but written in id order, so the
+        # checkpoint never moves past a chunk that is not written yet
+        in_flight = workers * 2 if pool is not None else 0
+        pending = deque()
+        try:
+            for rows in self.chunks(self.progress['last_id'], chunk_size):
+                payload = [(row_id, question_id, answer) for row_id, question_id, answer, *_ in rows]
+                if pool is not None:
+                    future = pool.submit(score_rows, payload)
+                else:
+                    future = Future()
+                    future.set_result(score_rows(payload))
+                pending.append((rows, future))
+                while len(pending) > in_flight:
+                    self.write(*pending.popleft())
+            while pending:
+                self.write(*pending.popleft())
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-scored {self.progress['scanned']} responses: {self.progress['changed']} changed, "
+            f"{self.progress['sessions']} session refreshes, {self.scanned_now / elapsed if elapsed else 0:.0f} "
+            f"responses/s over {elapsed:.1f}s"
+        ))
+
+    def chunks(self, last_id, chunk_size):
+        """Responses after last_id in id order, chunk_size at a time"""
+        while True:
+            rows = list(
+                InterviewResponse.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'question_id', 'candidate_answer', 'score', 'feedback',
+                             'interview_session_id')[:chunk_size]
+            )
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield rows
+
+    def write(self, rows, future):
+        """Store a scored chunk, refresh its sessions and move the checkpoint past it"""
+        current = {row[0]: row for row in rows}
+        updates = [
+            InterviewResponse(id=row_id, score=score, feedback=feedback)
+            for row_id, score, feedback in future.result()
+            if (current[row_id][3], current[row_id][4]) != (score, feedback)
+        ]
+        with transaction.atomic():
+            # A response answered again (or deleted) since the chunk was read
+            # keeps the score submit_answer gave the new answer
+            unchanged = set(
+                InterviewResponse.objects.select_for_update()
+                .filter(id__in=[update.id for update in updates])
+                .values_list('id', 'question_id', 'candidate_answer')
+            )
+            updates = [update for update in updates if current[update.id][:3] in unchanged]
+            InterviewResponse.objects.bulk_update(updates, ['score', 'feedback'], batch_size=500)
+            # Keeps calculate_final_score and get_skill_breakdown in line with the new scores
+            sessions = refresh_states({current[update.id][5] for update in updates})
+
+        self.progress['last_id'] = rows[-1][0]
+        self.progress['scanned'] += len(rows)
+        self.progress['changed'] += len(updates)
+        self.progress['sessions'] += sessions
+        temp_path = f'{self.checkpoint_path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.progress, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+        self.scanned_now += len(rows)
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(
+            f"{self.progress['scanned']} responses scored, {self.progress['changed']} changed "
+            f"({self.scanned_now / elapsed if elapsed else 0:.0f} responses/s)"
+        )
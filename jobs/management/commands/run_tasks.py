@@ -0,0 +1,69 @@
+import os
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+
+from jobs import queue
+
+
+class Command(BaseCommand):
+    help = 'Run background tasks from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2,
+                            help='Tasks run at the same time by this worker')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait when no task is due')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no task is due instead of polling')
+        parser.add_argument('--task', action='append', dest='names',
+                            help='Only run tasks with this name (repeatable)')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        if concurrency < 1:
+            raise CommandError('--concurrency must be positive')
+        queue.autodiscover()
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        stats = {'done': 0, 'failed': 0}
+        lock = threading.Lock()
+
+        def execute(task_row):
+            try:
+                ok = queue.run(task_row)
+            finally:
+                # Each pool thread holds its own connection
+                connections.close_all()
+            with lock:
+                stats['done' if ok else 'failed'] += 1
+
+        self.stdout.write(f'Worker {worker} running up to {concurrency} tasks at a time')
+        running = set()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            try:
+                while True:
+                    close_old_connections()
+                    free = concurrency - len(running)
+                    claimed = queue.claim(worker, free, options['names']) if free else []
+                    for task_row in claimed:
+                        running.add(pool.submit(execute, task_row))
+                    if running:
+                        finished, running = wait(
+                            running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED,
+                        )
+                        for future in finished:
+                            future.result()
+                    elif options['burst']:
+                        break
+                    else:
+                        time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping; waiting for running tasks to finish')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Worker {worker} finished: {stats['done']} done, {stats['failed']} failed"
+        ))
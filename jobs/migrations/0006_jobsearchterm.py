@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-18 19:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_search_index(apps, schema_editor):
+    from jobs.search import index_job
+
+    Job = apps.get_model('jobs', 'Job')
+    JobSearchTerm = apps.get_model('jobs', 'JobSearchTerm')
+    for job in Job.objects.iterator(chunk_size=1000):
+        index_job(job, term_model=JobSearchTerm)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_interviewquestion_interviewresponse_interviewsession_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='jobs.job')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'job'], name='jobs_term_job_idx')],
+                'unique_together': {('job', 'term')},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-18 19:40
+
+from django.db import migrations
+
+
+def create_fts(apps, schema_editor):
+    from jobs import fts
+
+    fts.install(schema_editor.connection)
+
+
+def drop_fts(apps, schema_editor):
+    from jobs import fts
+
+    fts.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0006_jobsearchterm'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
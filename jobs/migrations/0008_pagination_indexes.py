@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-18 19:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_job_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['applied_at', 'id'], name='jobs_app_applied_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['applicant', 'applied_at', 'id'], name='jobs_app_user_applied_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['salary', 'id'], name='jobs_job_salary_id_idx'),
+        ),
+    ]
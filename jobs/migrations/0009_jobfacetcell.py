@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 19:26
+
+from django.db import migrations, models
+
+
+def build_facet_cells(apps, schema_editor):
+    from jobs.facets import rebuild_cells
+
+    rebuild_cells(apps.get_model('jobs', 'Job'), apps.get_model('jobs', 'JobFacetCell'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0008_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobFacetCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(max_length=50)),
+                ('location', models.CharField(max_length=255)),
+                ('salary_bucket', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('job_type', 'location', 'salary_bucket')},
+            },
+        ),
+        migrations.RunPython(build_facet_cells, migrations.RunPython.noop),
+    ]
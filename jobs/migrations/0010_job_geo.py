@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+def locate_jobs(apps, schema_editor):
+    from jobs.facets import rebuild_cells
+    from jobs.geo import locate_job
+
+    Job = apps.get_model('jobs', 'Job')
+    batch = []
+    for job in Job.objects.iterator(chunk_size=1000):
+        locate_job(job)
+        batch.append(job)
+        if len(batch) >= 1000:
+            Job.objects.bulk_update(batch, ['location_key', 'latitude', 'longitude'])
+            batch = []
+    if batch:
+        Job.objects.bulk_update(batch, ['location_key', 'latitude', 'longitude'])
+
+    # Facet locations are now normalized against the gazetteer too
+    rebuild_cells(Job, apps.get_model('jobs', 'JobFacetCell'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0009_jobfacetcell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='location_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(locate_jobs, migrations.RunPython.noop),
+    ]
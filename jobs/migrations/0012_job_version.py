@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0011_similarjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0012_job_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
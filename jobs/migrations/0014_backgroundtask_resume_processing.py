@@ -0,0 +1,65 @@
+# Generated by Django 6.0 on 2026-10-18 19:44
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def queue_existing_resumes(apps, schema_editor):
+    Application = apps.get_model('jobs', 'Application')
+    BackgroundTask = apps.get_model('jobs', 'BackgroundTask')
+    now = timezone.now()
+    ids = Application.objects.exclude(resume='').values_list('id', flat=True)
+    BackgroundTask.objects.bulk_create([
+        BackgroundTask(
+            name='applications.extract_resume_text',
+            payload={'application_id': application_id},
+            run_after=now,
+        )
+        for application_id in ids.iterator(chunk_size=1000)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0013_job_external_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='extracted_skills',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='resume_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='resume_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.CreateModel(
+            name='BackgroundTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=3)),
+                ('run_after', models.DateTimeField()),
+                ('locked_by', models.CharField(blank=True, default='', max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='jobs_task_due_idx')],
+            },
+        ),
+        migrations.RunPython(queue_existing_resumes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-18 19:46
+
+import jobs.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0014_backgroundtask_resume_processing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.BigIntegerField(default=0)),
+                ('refcount', models.IntegerField(default=0)),
+                ('extracted_text', models.TextField(blank=True, null=True)),
+                ('extracted_skills', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='resume',
+            field=models.FileField(storage=jobs.storage.ContentAddressedStorage(), upload_to='resumes/'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 19:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_status_counts(apps, schema_editor):
+    from jobs.funnel import rebuild_status_counts
+
+    rebuild_status_counts(apps.get_model('jobs', 'Application'), apps.get_model('jobs', 'JobStatusCount'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0015_resume_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('applied', 'Applied'), ('screening', 'Screening'), ('assessment', 'Assessment'), ('interview', 'Interview'), ('offer', 'Offer'), ('rejected', 'Rejected'), ('hired', 'Hired')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_counts', to='jobs.job')),
+            ],
+            options={
+                'unique_together': {('job', 'status')},
+            },
+        ),
+        migrations.RunPython(build_status_counts, migrations.RunPython.noop),
+    ]
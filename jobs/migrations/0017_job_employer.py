@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-18 19:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_job_employers(apps, schema_editor):
+    from employer.ownership import backfill_job_employers
+
+    backfill_job_employers(
+        apps.get_model('jobs', 'Job'), apps.get_model('employer', 'Employer'), apps.get_model('accounts', 'Profile'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_resume_storage'),
+        ('employer', '0001_initial'),
+        ('jobs', '0016_jobstatuscount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='employer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='employer.employer'),
+        ),
+        migrations.RunPython(link_job_employers, migrations.RunPython.noop),
+    ]
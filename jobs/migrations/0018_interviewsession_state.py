@@ -0,0 +1,49 @@
+# Generated by Django 6.0 on 2026-10-18 20:02
+
+from django.db import migrations, models
+
+SESSION_CHUNK_SIZE = 1000
+
+
+def build_session_states(apps, schema_editor):
+    from jobs.interview_state import SessionState
+
+    InterviewSession = apps.get_model('jobs', 'InterviewSession')
+    InterviewResponse = apps.get_model('jobs', 'InterviewResponse')
+    session_ids = InterviewSession.objects.order_by('id').values_list('id', flat=True)
+    last_id = 0
+    while True:
+        # Keyset chunks, so only one chunk's responses are held at a time
+        chunk = list(session_ids.filter(id__gt=last_id)[:SESSION_CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1]
+        rows = {session_id: [] for session_id in chunk}
+        responses = InterviewResponse.objects.filter(interview_session_id__in=chunk).order_by(
+            'answered_at', 'id',
+        ).values_list('interview_session_id', 'question_id', 'question__skill', 'score')
+        for session_id, question_id, skill, score in responses:
+            rows[session_id].append((question_id, skill, score))
+        InterviewSession.objects.bulk_update(
+            [
+                InterviewSession(id=session_id, state=SessionState.from_responses(session_rows).to_json())
+                for session_id, session_rows in rows.items()
+            ],
+            ['state'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0017_job_employer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewsession',
+            name='state',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(build_session_states, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-18 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0018_interviewsession_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.PositiveIntegerField(unique=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['deleted_at', 'job_id'], name='jobs_deleted_job_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0 on 2026-10-18 20:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0019_deletedjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedblob',
+            name='stored_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
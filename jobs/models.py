@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .storage import resume_storage
+
 class Job(models.Model):
     JOB_TYPE_CHOICES = (
         ('full-time', 'Full Time'),
@@ -16,10 +18,100 @@ class Job(models.Model):
     location = models.CharField(max_length=255)
     job_type = models.CharField(max_length=50, choices=JOB_TYPE_CHOICES)
 
+    # Owner for dashboards and permission checks (see employer.ownership)
+    employer = models.ForeignKey(
+        'employer.Employer', on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs',
+    )
+
+    # Resolved from `location` against the offline gazetteer (see jobs.geo)
+    location_key = models.CharField(max_length=100, blank=True, default='', db_index=True)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+
+    # Stable key of a job imported from a partner feed (see import_jobs)
+    external_id = models.CharField(max_length=255, unique=True, blank=True, null=True)
+
+    # Validators for conditional GETs of job pages
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination when sorting by salary
+            models.Index(fields=['salary', 'id'], name='jobs_job_salary_id_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
 
+class JobSearchTerm(models.Model):
+    """Inverted index entry: one row per (term, job) with its weighted frequency"""
+    term = models.CharField(max_length=100)
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('job', 'term')
+        indexes = [
+            models.Index(fields=['term', 'job'], name='jobs_term_job_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.job_id}"
+
+
+class JobFacetCell(models.Model):
+    """Number of jobs sharing a job type, normalized location and salary bucket"""
+    job_type = models.CharField(max_length=50)
+    location = models.CharField(max_length=255)
+    salary_bucket = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('job_type', 'location', 'salary_bucket')
+
+    def __str__(self):
+        return f"{self.job_type} / {self.location} / {self.salary_bucket}: {self.count}"
+
+
+class SimilarJob(models.Model):
+    """Precomputed nearest neighbour of a job by TF-IDF cosine similarity"""
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='similar_jobs')
+    similar = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ('job', 'rank')
+
+    def __str__(self):
+        return f"{self.job_id} ~ {self.similar_id} ({self.score:.3f})"
+
+
+class DeletedJob(models.Model):
+    """Tombstone of a deleted job, reported by incremental exports (see jobs.export)"""
+    job_id = models.PositiveIntegerField(unique=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'job_id'], name='jobs_deleted_job_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.job_id} deleted at {self.deleted_at}"
+
+
+class SimilarityRefresh(models.Model):
+    """Job whose similar-jobs list must be recomputed by the next incremental build"""
+    job = models.OneToOneField(Job, on_delete=models.CASCADE, primary_key=True)
+    queued_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Refresh similar jobs for {self.job_id}"
+
+
 class Application(models.Model):
     STATUS_CHOICES = (
         ('applied', 'Applied'),
@@ -30,23 +122,104 @@ class Application(models.Model):
         ('rejected', 'Rejected'),
         ('hired', 'Hired'),
     )
+
+    RESUME_STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
     
     job = models.ForeignKey(Job, on_delete=models.CASCADE)
     applicant = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)  # Link to user
     
     name = models.CharField(max_length=100)
     email = models.EmailField()
-    resume = models.FileField(upload_to='resumes/')
+    resume = models.FileField(upload_to='resumes/', storage=resume_storage)
     cover_letter = models.TextField()
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='applied')
     applied_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Filled in by the background resume tasks (see jobs.tasks)
+    resume_status = models.CharField(max_length=20, choices=RESUME_STATUS_CHOICES, default='pending')
+    resume_text = models.TextField(blank=True, default='')
+    extracted_skills = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of dashboards, newest first
+            models.Index(fields=['applied_at', 'id'], name='jobs_app_applied_id_idx'),
+            models.Index(fields=['applicant', 'applied_at', 'id'], name='jobs_app_user_applied_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.job.title}"
 
 
+class JobStatusCount(models.Model):
+    """Number of applications to a job in one funnel status (see jobs.funnel)"""
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='status_counts')
+    status = models.CharField(max_length=20, choices=Application.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('job', 'status')
+
+    def __str__(self):
+        return f"{self.job_id} / {self.status}: {self.count}"
+
+
+class BackgroundTask(models.Model):
+    """Unit of work in the database-backed task queue (see jobs.queue)"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Workers poll for due tasks in run_after order
+            models.Index(fields=['status', 'run_after'], name='jobs_task_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class StoredBlob(models.Model):
+    """File kept by the content-addressed resume storage (see jobs.storage)"""
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+    # Parse results shared by every reference to this content
+    extracted_text = models.TextField(blank=True, null=True)
+    extracted_skills = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last upload of this content; unreferenced blobs are kept for
+    # STORED_BLOB_GRACE_PERIOD after it (see jobs.storage)
+    stored_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+
 class SavedJob(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     job = models.ForeignKey(Job, on_delete=models.CASCADE)
@@ -105,6 +278,9 @@ class InterviewSession(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(blank=True, null=True)
 
+    # Answered questions and running scores (see jobs.interview_state)
+    state = models.JSONField(default=dict, blank=True)
+
     def __str__(self):
         return f"Interview for {self.candidate.username} - {self.job_application.job.title}"
 
@@ -0,0 +1,170 @@
+import base64
+import datetime
+import decimal
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.next_url = None
+        self.previous_url = None
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a fixed ordering, e.g. ('-applied_at', '-id').
+
+    Each page is a range scan that starts right after (or before) the row
+    encoded in the cursor, so deep pages cost the same as the first one
+    when the ordering columns are indexed. The last ordering field must be
+    unique and none of them may be NULL.
+    """
+
+    def __init__(self, queryset, ordering, per_page=20):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+
+    def page(self, cursor=None):
+        position = self.decode_cursor(cursor) if cursor else None
+        backwards = position is not None and position[0] == 'p'
+
+        queryset = self.queryset
+        if position is not None:
+            queryset = queryset.filter(self._after(position[1], backwards))
+        if backwards:
+            queryset = queryset.order_by(*self._reversed_ordering())
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+
+        if backwards:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], 'n') if has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], 'p') if has_previous else None,
+        )
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+
+    def _after(self, values, backwards):
+        """
+        Row-value comparison (f1, f2, ...) > (v1, v2, ...) expanded into
+        OR-ed prefixes so it works on every backend
+        """
+        condition = Q()
+        for i, field in enumerate(self.fields):
+            ascending = not self.descending[i]
+            lookup = 'gt' if ascending != backwards else 'lt'
+            clause = Q(**{f'{field}__{lookup}': values[i]})
+            for prev_field, prev_value in zip(self.fields[:i], values[:i]):
+                clause &= Q(**{prev_field: prev_value})
+            condition |= clause
+        return condition
+
+    def encode_cursor(self, obj, direction):
+        values = [_json_value(getattr(obj, field)) for field in self.fields]
+        payload = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """
+        Return (direction, values) for a cursor, or None if it is malformed
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if direction not in ('n', 'p') or len(values) != len(self.fields):
+                return None
+            return direction, [
+                self._to_python(field, value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    def _to_python(self, name, value):
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations (e.g. search relevance) are stored as plain JSON
+            return value
+        return field.to_python(value)
+
+
+def _json_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def paginate(request, queryset, ordering, per_page=20, param='cursor'):
+    """
+    Keyset-paginate a queryset using the cursor found in request.GET[param].
+    The returned page carries next/previous URLs that keep the other
+    query-string parameters.
+    """
+    page = KeysetPaginator(queryset, ordering, per_page).page(request.GET.get(param))
+    return add_page_urls(request, page, param)
+
+
+def add_page_urls(request, page, param='cursor'):
+    """
+    Set next/previous URLs on a page from its cursors
+    """
+    def url_for(cursor):
+        params = request.GET.copy()
+        params[param] = cursor
+        return f'?{params.urlencode()}'
+
+    if page.has_next():
+        page.next_url = url_for(page.next_cursor)
+    if page.has_previous():
+        page.previous_url = url_for(page.previous_cursor)
+    return page
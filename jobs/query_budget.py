@@ -0,0 +1,145 @@
+"""
+Per-view query budgets and N+1 detection.
+
+QueryBudgetMiddleware counts the SQL statements each request runs (on every
+database alias, through connection.execute_wrapper) and fingerprints them:
+the SQL with literals and parameter lists collapsed, so that the same
+statement run for different rows shares one shape. After the view has
+returned it reports
+
+- requests running more queries than the view's budget, declared with the
+  @query_budget decorator or the QUERY_BUDGETS setting (keyed by URL name),
+  falling back to QUERY_BUDGET_DEFAULT, and
+- SELECT shapes repeated QUERY_BUDGET_REPEAT_THRESHOLD or more times, the
+  signature of an N+1 loop.
+
+Violations are logged, or raised as QueryBudgetExceeded when
+QUERY_BUDGET_RAISE is set (as test settings should). The middleware is
+active when QUERY_BUDGET_ENABLED is true, by default only with DEBUG, and
+then also sets an X-Query-Count header. Queries run while a streaming
+response is consumed happen after the view and are not counted.
+
+jobs.testing builds assertions for tests on the same counter.
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPEAT_THRESHOLD = 5
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries):
+    """
+    Declare the most queries a view may run. Apply it outermost, above
+    login_required or api_view, so the attribute is on the routed view.
+    """
+    def decorate(view):
+        view.query_budget = max_queries
+        return view
+    return decorate
+
+
+def fingerprint(sql):
+    """Shape of a statement: literals replaced by ? and IN lists collapsed"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryCounter:
+    """execute_wrapper counting statements by fingerprint"""
+
+    def __init__(self):
+        self.shapes = Counter()
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        self.shapes[fingerprint(sql)] += 1
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold=None):
+        """SELECT shapes run at least `threshold` times, most frequent first"""
+        if threshold is None:
+            threshold = getattr(settings, 'QUERY_BUDGET_REPEAT_THRESHOLD', DEFAULT_REPEAT_THRESHOLD)
+        return [
+            (shape, n) for shape, n in self.shapes.most_common()
+            if n >= threshold and shape.upper().startswith('SELECT')
+        ]
+
+
+class count_queries:
+    """Context manager counting the queries run on every connection"""
+
+    def __enter__(self):
+        self.counter = QueryCounter()
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self.counter))
+        return self.counter
+
+    def __exit__(self, *exc_info):
+        return self._stack.__exit__(*exc_info)
+
+
+def budget_for(view_func, view_name=None):
+    """The declared query budget of a view, or None when it has none"""
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None and view_name:
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+    if budget is None:
+        budget = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+    return budget
+
+
+def violations(counter, budget):
+    """Messages describing how a request broke its budget, if it did"""
+    problems = []
+    if budget is not None and counter.total > budget:
+        problems.append(f'{counter.total} queries, budget {budget}')
+    for shape, n in counter.repeated():
+        problems.append(f'{n} x {shape}')
+    return problems
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._query_budget = None
+        with count_queries() as counter:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        name = match.view_name if match is not None else request.path
+        problems = violations(counter, request._query_budget)
+        response['X-Query-Count'] = str(counter.total)
+        if problems:
+            message = f'Query budget exceeded by {name}: ' + '; '.join(problems)
+            if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = budget_for(view_func, request.resolver_match.view_name)
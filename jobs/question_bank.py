@@ -0,0 +1,87 @@
+"""
+In-memory index of the interview question bank.
+
+InterviewEngine picks questions by skill and difficulty. Instead of
+filtering InterviewQuestion with a few queries per pick, each process keeps
+every question in memory together with an array of question ids per
+(skill, difficulty), so a pick is a random draw from the matching arrays
+(see jobs.sampling) with no query and no sort.
+
+The index is built with one query on first use. It is versioned through the
+shared QUESTION_BANK counter (see jobs.versions): saving or deleting an
+InterviewQuestion bumps the counter (see the signal receivers), and a
+process whose index was built under an older version rebuilds it on its
+next use. The answer scorer is fitted on the same questions, but by a
+background task rather than here (see jobs.scoring).
+"""
+import copy
+import threading
+
+from . import versions
+from .sampling import draw
+
+
+class BankIndex:
+    """Immutable snapshot of the question bank"""
+
+    def __init__(self, questions):
+        self.questions = {question.id: question for question in questions}
+        self.all_ids = frozenset(self.questions)
+        pools = {}
+        for question in questions:
+            pools.setdefault((question.skill, question.difficulty), []).append(question.id)
+        # One id array per (skill, difficulty), for sampling without copies
+        self.pools = {key: tuple(sorted(ids)) for key, ids in pools.items()}
+        self.key_of = {
+            question.id: (question.skill, question.difficulty) for question in questions
+        }
+
+    def pool_keys(self, skills=None, difficulty=None):
+        """Keys of the pools on any of these skills and with this difficulty"""
+        return [
+            key for key in self.pools
+            if (skills is None or key[0] in skills) and (difficulty is None or key[1] == difficulty)
+        ]
+
+    def remaining(self, keys, exclude=frozenset()):
+        """Number of questions in these pools that are not excluded"""
+        keys = set(keys)
+        excluded = sum(1 for question_id in exclude if self.key_of.get(question_id) in keys)
+        return sum(len(self.pools[key]) for key in keys) - excluded
+
+    def sample(self, keys, rng=None, exclude=frozenset(), weights=None):
+        """
+        A random question from these pools that is not excluded, or None.
+        weights maps pool keys to weights (1 when missing).
+        """
+        pool_weights = None if weights is None else [weights.get(key, 1) for key in keys]
+        return self.get(draw([self.pools[key] for key in keys], rng, exclude, pool_weights))
+
+    def get(self, question_id):
+        """A copy of a question, safe to hand to a request"""
+        question = self.questions.get(question_id)
+        return copy.copy(question) if question is not None else None
+
+
+class QuestionBank:
+    def __init__(self):
+        self._index = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def index(self):
+        """The current snapshot, rebuilt if the bank changed since it was built"""
+        version = versions.current(versions.QUESTION_BANK)
+        with self._lock:
+            if self._index is None or self._version != version:
+                from .models import InterviewQuestion
+
+                self._index = BankIndex(list(InterviewQuestion.objects.all()))
+                self._version = version
+            return self._index
+
+    def invalidate(self):
+        versions.bump(versions.QUESTION_BANK)
+
+
+question_bank = QuestionBank()
@@ -0,0 +1,222 @@
+"""
+Database-backed background task queue.
+
+Tasks are rows in BackgroundTask naming a function registered with the
+@task decorator plus a JSON payload. The run_tasks management command
+claims due tasks and runs them on a bounded pool of threads. A claim is a
+conditional UPDATE on the row's current status and lock, so several
+workers can poll the same table without locking it and each task is run by
+exactly one of them. Failed tasks are retried with exponential backoff
+until max_attempts, and tasks left 'running' by a worker that died are
+reclaimed once their lock is older than TASK_LOCK_TIMEOUT seconds. A
+reclaim counts as an attempt, so a task that keeps killing its worker
+(e.g. by running out of memory) is marked failed once its attempts are
+used up instead of being retried forever.
+
+While a task runs, a heartbeat thread refreshes its lock every
+TASK_HEARTBEAT_INTERVAL seconds, so a task that simply runs longer than
+the timeout is not reclaimed and run a second time. The outcome is only
+recorded while the claim still holds the lock.
+"""
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+LOCK_EXPIRED_ERROR = 'Lock expired: the worker stopped while running the last attempt.\n\n'
+
+
+def task(name, max_attempts=3, on_give_up=None):
+    """
+    Register a function taking (payload, task) under a queue name.
+    on_give_up(payload, task), if given, is called when the task is marked
+    failed because its worker stopped during the last attempt (the function
+    itself sees its own exceptions).
+    """
+    def register(func):
+        func.task_name = name
+        func.max_attempts = max_attempts
+        func.on_give_up = on_give_up
+        _registry[name] = func
+        return func
+    return register
+
+
+def autodiscover():
+    # Register the tasks defined in every installed app's tasks module
+    autodiscover_modules('tasks')
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def _lock_timeout():
+    return timedelta(seconds=getattr(settings, 'TASK_LOCK_TIMEOUT', 600))
+
+
+def _heartbeat_interval():
+    interval = getattr(settings, 'TASK_HEARTBEAT_INTERVAL', None)
+    if interval is None:
+        return _lock_timeout().total_seconds() / 4
+    return interval
+
+
+def _retry_delay(attempts):
+    base = getattr(settings, 'TASK_RETRY_DELAY', 30)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def enqueue(func_or_name, payload=None, delay=0, max_attempts=None):
+    """Add a task to the queue and return its row"""
+    from .models import BackgroundTask
+
+    name = getattr(func_or_name, 'task_name', func_or_name)
+    if max_attempts is None:
+        max_attempts = getattr(get_task(name), 'max_attempts', 3)
+    return BackgroundTask.objects.create(
+        name=name,
+        payload=payload or {},
+        max_attempts=max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue_on_commit(func_or_name, payload=None, **kwargs):
+    # Workers must not pick up a task before the rows it refers to exist
+    transaction.on_commit(lambda: enqueue(func_or_name, payload, **kwargs))
+
+
+def claim(worker, limit=1, names=None):
+    """Claim up to `limit` due tasks for a worker"""
+    from .models import BackgroundTask
+
+    now = timezone.now()
+    stale = Q(status='running', locked_at__lt=now - _lock_timeout())
+    tasks = BackgroundTask.objects.filter(name__in=names) if names else BackgroundTask.objects.all()
+
+    for task_row in tasks.filter(stale, attempts__gte=F('max_attempts')):
+        _give_up(task_row, now)
+
+    due = tasks.filter(
+        Q(status='pending', run_after__lte=now) |
+        (stale & Q(attempts__lt=F('max_attempts')))
+    )
+    # Fetch a few extra candidates since other workers may take some first
+    candidates = due.order_by('run_after', 'id').values_list('id', 'status', 'locked_at')[:limit * 4]
+
+    claimed = []
+    for task_id, status, locked_at in candidates:
+        won = BackgroundTask.objects.filter(id=task_id, status=status, locked_at=locked_at).update(
+            status='running', locked_by=worker, locked_at=now,
+            attempts=F('attempts') + 1, updated_at=now,
+        )
+        if won:
+            claimed.append(task_id)
+            if len(claimed) >= limit:
+                break
+    return list(BackgroundTask.objects.filter(id__in=claimed).order_by('run_after', 'id'))
+
+
+def _give_up(task_row, now):
+    """Fail a task whose worker stopped during its last attempt"""
+    from .models import BackgroundTask
+
+    # Conditional on the lock, like a claim; the previous error is kept
+    failed = BackgroundTask.objects.filter(
+        id=task_row.id, status='running', locked_at=task_row.locked_at,
+    ).update(
+        status='failed', locked_at=None, updated_at=now,
+        last_error=Concat(Value(LOCK_EXPIRED_ERROR), F('last_error')),
+    )
+    if not failed:
+        return
+    logger.warning('Task %s failed: its worker stopped during attempt %s of %s',
+                   task_row, task_row.attempts, task_row.max_attempts)
+    on_give_up = getattr(get_task(task_row.name), 'on_give_up', None)
+    if on_give_up is not None:
+        on_give_up(task_row.payload, task_row)
+
+
+def _claimed(task_row):
+    """The task's row, for as long as this claim holds its lock"""
+    from .models import BackgroundTask
+
+    # attempts goes up with every claim, so it tells this claim from a reclaim
+    return BackgroundTask.objects.filter(
+        id=task_row.id, status='running', locked_by=task_row.locked_by, attempts=task_row.attempts,
+    )
+
+
+class Heartbeat:
+    """
+    Context manager refreshing a claimed task's locked_at from a background
+    thread until it exits, or until another worker has taken the task
+    """
+
+    def __init__(self, task_row, interval=None):
+        self.task_row = task_row
+        self.interval = _heartbeat_interval() if interval is None else interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f'task-heartbeat-{task_row.id}', daemon=True,
+        )
+
+    def beat(self):
+        """Refresh the lock; False once the claim no longer holds it"""
+        return bool(_claimed(self.task_row).update(locked_at=timezone.now()))
+
+    def _run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    if not self.beat():
+                        logger.warning('Task %s lost its lock while running', self.task_row)
+                        return
+                except DatabaseError:
+                    logger.warning('Could not refresh the lock of task %s', self.task_row, exc_info=True)
+        finally:
+            connections.close_all()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+
+def run(task_row):
+    """Run a claimed task and record its outcome"""
+    func = get_task(task_row.name)
+    done = _claimed(task_row)
+    try:
+        if func is None:
+            raise LookupError(f'No task registered as {task_row.name!r}')
+        with Heartbeat(task_row):
+            func(task_row.payload, task_row)
+    except Exception:
+        now = timezone.now()
+        error = traceback.format_exc()
+        logger.warning('Task %s failed (attempt %s of %s)',
+                       task_row, task_row.attempts, task_row.max_attempts, exc_info=True)
+        if task_row.attempts < task_row.max_attempts and func is not None:
+            done.update(status='pending', run_after=now + _retry_delay(task_row.attempts),
+                        locked_at=None, last_error=error, updated_at=now)
+        else:
+            done.update(status='failed', locked_at=None, last_error=error, updated_at=now)
+        return False
+    done.update(status='done', locked_at=None, last_error='', updated_at=timezone.now())
+    return True
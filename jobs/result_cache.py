@@ -0,0 +1,213 @@
+"""
+Process-local LRU cache of job_list result pages.
+
+Entries are keyed on the normalized filter tuple and hold the ordered job
+ids of one page (plus search annotations and cursors). Rows are re-read
+when a page is served, so edits to a listed job never stale it; only a
+change to which jobs match the filters, or to their order, does.
+
+Instead of expiring on a timer, each entry is stamped with the shared
+counters (jobs.versions) of the listings it could be affected by: one per
+(scope, aspect), where the scope is a job type or 'all' and the aspect is
+a group of fields the filters read (ROWS for jobs being added or removed).
+A job save bumps only the counters its old and new values fall under, so
+saving a remote job leaves cached full-time pages, and salary edits leave
+pages that neither filter nor sort on salary, in place. A process drops an
+entry once one of its counters has moved, whichever process made the
+change. Writers that cannot tell what changed bump versions.JOB_LIST,
+which every entry depends on.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .geo import parse_radius
+from .pagination import KeysetPage
+from .search import query_terms
+from . import versions
+
+# Annotations added by the search backends that the template displays
+CACHED_ANNOTATIONS = ('relevance', 'snippet')
+
+# Jobs entering or leaving a scope
+ROWS = 'rows'
+
+# Job fields read by the filters and sort orders, per aspect
+ASPECT_FIELDS = {
+    'text': ('title', 'company', 'description'),
+    'location': ('location',),
+    'salary': ('salary',),
+}
+
+LISTING_FIELDS = ('job_type',) + tuple(field for fields in ASPECT_FIELDS.values() for field in fields)
+
+
+def _parse_int(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+class JobListQuery:
+    """Normalized job_list filters, usable as a cache key"""
+
+    def __init__(self, params, sort_options=()):
+        self.backend = getattr(settings, 'JOB_SEARCH_BACKEND', 'index')
+        query = params.get('q') or ''
+        if self.backend == 'icontains':
+            self.query = query.lower()
+        else:
+            # The token backends only ever see the query terms
+            self.query = ' '.join(query_terms(query))
+        self.location = (params.get('location') or '').lower()
+        self.near = (params.get('near') or '').strip().lower()
+        self.radius = parse_radius(params.get('radius')) if self.near else None
+        self.job_type = params.get('job_type') or ''
+        self.min_salary = _parse_int(params.get('min_salary'))
+        self.max_salary = _parse_int(params.get('max_salary'))
+        sort = params.get('sort')
+        self.sort = sort if sort in sort_options else ''
+        self.cursor = params.get('cursor') or ''
+
+    @property
+    def key(self):
+        return (
+            self.backend, self.query, self.location, self.near, self.radius,
+            self.job_type, self.min_salary, self.max_salary, self.sort, self.cursor,
+        )
+
+    @property
+    def counters(self):
+        """Names of the version counters a page of this listing depends on"""
+        scope = f'type:{self.job_type}' if self.job_type else 'all'
+        aspects = [ROWS]
+        if self.query:
+            aspects.append('text')
+        if self.location or self.near:
+            aspects.append('location')
+        if self.min_salary is not None or self.max_salary is not None or 'salary' in self.sort:
+            aspects.append('salary')
+        return [versions.JOB_LIST] + [_counter(scope, aspect) for aspect in aspects]
+
+
+def _counter(scope, aspect):
+    return f'{versions.JOB_LIST}:{scope}:{aspect}'
+
+
+def _scopes(job_type):
+    return ('all', f'type:{job_type}')
+
+
+def listing_state(job):
+    """The values of a job that decide the listings it appears on"""
+    return {field: getattr(job, field) for field in LISTING_FIELDS}
+
+
+def changed_counters(old, new):
+    """
+    Counters of the listings a job change can affect, given the job's
+    listing_state before and after (None when it did not or no longer
+    exists)
+    """
+    if old is None or new is None:
+        state = old if new is None else new
+        return {_counter(scope, ROWS) for scope in _scopes(state['job_type'])}
+
+    names = set()
+    job_types = {old['job_type'], new['job_type']}
+    if len(job_types) > 1:
+        names |= {_counter(f'type:{job_type}', ROWS) for job_type in job_types}
+    for aspect, fields in ASPECT_FIELDS.items():
+        if any(old[field] != new[field] for field in fields):
+            for job_type in job_types:
+                names |= {_counter(scope, aspect) for scope in _scopes(job_type)}
+    return names
+
+
+def invalidate(names):
+    """Drop the pages depending on these counters, in every process"""
+    for name in sorted(names):
+        versions.bump(name)
+
+
+class CachedPage:
+    def __init__(self, listing, page):
+        self.listing = listing
+        self.ids = [job.pk for job in page.object_list]
+        self.annotations = [
+            {name: getattr(job, name) for name in CACHED_ANNOTATIONS if hasattr(job, name)}
+            for job in page.object_list
+        ]
+        self.next_cursor = page.next_cursor
+        self.previous_cursor = page.previous_cursor
+
+    def to_page(self, job_model):
+        jobs = job_model.objects.in_bulk(self.ids)
+        rows = []
+        for pk, annotations in zip(self.ids, self.annotations):
+            job = jobs.get(pk)
+            if job is None:
+                continue
+            for name, value in annotations.items():
+                setattr(job, name, value)
+            rows.append(job)
+        return KeysetPage(rows, self.next_cursor, self.previous_cursor)
+
+
+class JobListCache:
+    """Bounded LRU of CachedPage entries, each dropped once its stamp is stale"""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _limit(self):
+        if self.max_entries is not None:
+            return self.max_entries
+        return getattr(settings, 'JOB_LIST_CACHE_SIZE', 512)
+
+    def stamp(self, listing):
+        """Current values of the counters a page of this listing depends on"""
+        return versions.current_many(listing.counters)
+
+    def get(self, listing, stamp):
+        """The page cached for these filters under this stamp, or None"""
+        with self._lock:
+            cached = self._entries.get(listing.key)
+            if cached is None:
+                return None
+            entry_stamp, entry = cached
+            if entry_stamp != stamp:
+                del self._entries[listing.key]
+                return None
+            self._entries.move_to_end(listing.key)
+            return entry
+
+    def store(self, listing, page, stamp):
+        """
+        Cache a page built from the data of this stamp, which must be read
+        before querying: a page raced by a write then carries a stamp that
+        has already moved on, and is dropped on its next read
+        """
+        limit = self._limit()
+        if limit <= 0:
+            return
+        entry = CachedPage(listing, page)
+        with self._lock:
+            self._entries[listing.key] = (stamp, entry)
+            self._entries.move_to_end(listing.key)
+            while len(self._entries) > limit:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+job_list_cache = JobListCache()
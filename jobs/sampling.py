@@ -0,0 +1,48 @@
+"""
+Random draws from pools of ids without sorting or copying them.
+
+A pool is a sequence of distinct ids (the question bank keeps one tuple per
+(skill, difficulty)). draw() picks a pool with probability proportional to
+its size times its weight, then an index inside it, so an unweighted draw
+over disjoint pools is uniform over their union. Excluded ids (questions
+already asked) are handled by rejection: they are redrawn, which keeps the
+draw uniform over the remaining ids and costs O(log pools) per try. Only
+when most of the ids are excluded does it fall back to listing the rest.
+
+Pass a seeded random.Random as rng to make draws reproducible.
+"""
+import random
+from bisect import bisect_right
+from itertools import accumulate
+
+MAX_REJECTIONS = 32
+
+
+def draw(pools, rng=None, exclude=frozenset(), weights=None):
+    """
+    A random id from the pools that is not in exclude, or None if there is
+    none. weights, if given, has one non-negative weight per pool.
+    """
+    rng = rng or random
+    if weights is None:
+        weights = [1] * len(pools)
+    masses = [len(pool) * weight for pool, weight in zip(pools, weights)]
+    cumulative = list(accumulate(masses))
+    if not cumulative or cumulative[-1] <= 0:
+        return None
+
+    for _ in range(MAX_REJECTIONS):
+        pool = pools[bisect_right(cumulative, rng.random() * cumulative[-1])]
+        item = pool[rng.randrange(len(pool))]
+        if item not in exclude:
+            return item
+
+    # Mostly excluded: draw from what is left
+    remaining = [
+        (item, weight) for pool, weight in zip(pools, weights) if weight > 0
+        for item in pool if item not in exclude
+    ]
+    if not remaining:
+        return None
+    items, item_weights = zip(*remaining)
+    return rng.choices(items, weights=item_weights)[0]
@@ -0,0 +1,37 @@
+"""
+Per-user set of saved job ids, kept in the Django cache.
+
+Listing and detail pages check saved state with a set lookup per job
+instead of one SavedJob query each. The set is loaded with a single query
+on a miss and dropped whenever one of the user's SavedJob rows is created
+or deleted (including through a Job delete cascade), so the next read
+reloads it; entries also expire after SAVED_JOBS_CACHE_TIMEOUT seconds and
+are bounded by the cache's own MAX_ENTRIES.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _cache_key(user_id):
+    return f'jobs:saved:{user_id}'
+
+
+def saved_job_ids(user):
+    """Ids of the jobs a user has saved (empty for anonymous users)"""
+    if not user.is_authenticated:
+        return frozenset()
+    key = _cache_key(user.pk)
+    ids = cache.get(key)
+    if ids is None:
+        from .models import SavedJob
+        ids = frozenset(SavedJob.objects.filter(user_id=user.pk).values_list('job_id', flat=True))
+        cache.set(key, ids, getattr(settings, 'SAVED_JOBS_CACHE_TIMEOUT', 3600))
+    return ids
+
+
+def invalidate_saved_jobs(user_id):
+    key = _cache_key(user_id)
+    cache.delete(key)
+    # A request may have reloaded the set from before this transaction committed
+    transaction.on_commit(lambda: cache.delete(key))
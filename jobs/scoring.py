@@ -0,0 +1,272 @@
+"""
+Local scoring of interview answers against the expected answers.
+
+An answer is compared with its question's expected_answer in two ways:
+
+- character n-gram TF-IDF cosine similarity (3-5 grams within words), which
+  tolerates inflections, typos and reordering, and
+- keyword coverage: the share of the expected answer's content words that
+  the answer mentions (matching on a shared stem).
+
+The two are blended into a 1-5 score with short feedback naming the missed
+key terms. Scoring an answer is one small transform and a sparse dot
+product, around a millisecond; score_batch vectorizes many answers at once
+for bulk re-scoring. Nothing leaves the process.
+
+Fitting the vectorizer on a large bank takes minutes, so it never happens
+on a request. Changes to the questions queue the fit_answer_scorer task
+(see jobs.tasks), which fits a scorer on the whole bank and writes it to
+ANSWER_SCORER_PATH; `manage.py build_answer_scorer` does the same. Each
+process loads the file when it changes and keeps scoring with the scorer
+it has until then; questions added or edited since the fit are scored
+against their current expected answer with the old vocabulary. Before any
+scorer has been written, answers are scored on keyword coverage alone.
+"""
+import logging
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+
+import joblib
+import numpy as np
+from django.conf import settings
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
+
+logger = logging.getLogger(__name__)
+
+# Blend of similarity and keyword coverage, and the similarity that counts
+# as a full match (character n-gram cosines of good paraphrases rarely pass it)
+SIMILARITY_WEIGHT = 0.5
+FULL_SIMILARITY = 0.6
+STEM_LENGTH = 5
+MAX_MISSED_TERMS = 5
+NEUTRAL_SCORE = 3
+NO_REFERENCE_FEEDBACK = 'No reference answer for this question; scored as neutral.'
+
+_WORD_RE = re.compile(r'[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]')
+
+
+def words(text):
+    return _WORD_RE.findall((text or '').lower())
+
+
+def _stem(word):
+    # Crude but symmetric: plural s dropped, then a fixed-length prefix
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+    return word[:STEM_LENGTH]
+
+
+def keywords(text):
+    """Content words of an expected answer, in order of appearance"""
+    return list(dict.fromkeys(
+        word for word in words(text) if len(word) > 2 and word not in ENGLISH_STOP_WORDS
+    ))
+
+
+def scorer_path():
+    return Path(getattr(settings, 'ANSWER_SCORER_PATH', settings.BASE_DIR / 'answer_scorer.joblib'))
+
+
+class AnswerScorer:
+    def __init__(self, questions, version=None):
+        # Question bank version the scorer was fitted at (see jobs.versions)
+        self.version = version
+        self.vectorizer = TfidfVectorizer(
+            analyzer='char_wb', ngram_range=(3, 5), sublinear_tf=True, lowercase=True, dtype=np.float32,
+        )
+        expected = {question.id: question.expected_answer for question in questions if question.expected_answer}
+        self._expected = expected
+        self._keywords = {question_id: keywords(text) for question_id, text in expected.items()}
+        self._rows = {}
+        self.matrix = None
+        if expected:
+            # Question texts add vocabulary and document frequencies for the domain
+            corpus = list(expected.values()) + [question.question_text for question in questions]
+            self.vectorizer.fit(corpus)
+            self.matrix = self.vectorizer.transform(list(expected.values()))
+            self._rows = {question_id: row for row, question_id in enumerate(expected)}
+
+    @classmethod
+    def load(cls, path=None):
+        return joblib.load(path or scorer_path())
+
+    def save(self, path=None):
+        path = Path(path or scorer_path())
+        # Written aside and renamed, so a process never loads a partial file
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                joblib.dump(self, f)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _expected_vector(self, question):
+        row = self._rows.get(question.id)
+        if row is not None and self._expected[question.id] == question.expected_answer:
+            return self.matrix[row]
+        # Changed or added since this snapshot was built
+        return self.vectorizer.transform([question.expected_answer])
+
+    def similarity(self, question, answer):
+        vector = self.vectorizer.transform([answer])
+        return float(vector.multiply(self._expected_vector(question)).sum())
+
+    def score(self, question, answer):
+        """(score from 1 to 5, feedback) for an answer to a question"""
+        if not question.expected_answer or self.matrix is None:
+            return NEUTRAL_SCORE, NO_REFERENCE_FEEDBACK
+
+        similarity = self.similarity(question, answer)
+        expected_terms = self._keywords.get(question.id)
+        if expected_terms is None or self._expected.get(question.id) != question.expected_answer:
+            expected_terms = keywords(question.expected_answer)
+        return _grade(similarity, expected_terms, answer)
+
+    def score_batch(self, question_ids, answers):
+        """
+        [(score, feedback)] for parallel lists of question ids and answers,
+        vectorizing all answers at once. Uses the expected answers as of
+        this snapshot.
+        """
+        results = [(NEUTRAL_SCORE, NO_REFERENCE_FEEDBACK)] * len(answers)
+        positions = [i for i, question_id in enumerate(question_ids) if question_id in self._rows]
+        if not positions:
+            return results
+        vectors = self.vectorizer.transform([answers[i] for i in positions])
+        expected = self.matrix[[self._rows[question_ids[i]] for i in positions]]
+        similarities = np.asarray(vectors.multiply(expected).sum(axis=1)).ravel()
+        for i, similarity in zip(positions, similarities):
+            results[i] = _grade(float(similarity), self._keywords[question_ids[i]], answers[i])
+        return results
+
+
+def keyword_score(question, answer):
+    """(score, feedback) from keyword coverage alone, while no scorer is fitted"""
+    if not question.expected_answer:
+        return NEUTRAL_SCORE, NO_REFERENCE_FEEDBACK
+    expected_terms = keywords(question.expected_answer)
+    answer_stems = {_stem(word) for word in words(answer)}
+    missed = [term for term in expected_terms if _stem(term) not in answer_stems]
+    coverage = 1 - len(missed) / len(expected_terms) if expected_terms else 0
+    score = 1 + int(round(4 * coverage))
+    return score, _feedback(score, coverage, missed)
+
+
+def _grade(similarity, expected_terms, answer):
+    answer_stems = {_stem(word) for word in words(answer)}
+    missed = [term for term in expected_terms if _stem(term) not in answer_stems]
+    coverage = 1 - len(missed) / len(expected_terms) if expected_terms else similarity
+
+    blended = (
+        SIMILARITY_WEIGHT * min(similarity / FULL_SIMILARITY, 1) +
+        (1 - SIMILARITY_WEIGHT) * coverage
+    )
+    score = 1 + int(round(4 * blended))
+    return score, _feedback(score, coverage, missed)
+
+
+def _feedback(score, coverage, missed):
+    if score >= 5:
+        summary = 'Excellent answer that matches the expected answer closely.'
+    elif score == 4:
+        summary = 'Good answer covering most of the key points.'
+    elif score == 3:
+        summary = 'Partial answer; some key points are missing.'
+    else:
+        summary = 'The answer misses most of the expected points.'
+    parts = [summary, f'Key terms covered: {coverage:.0%}.']
+    if missed and score < 5:
+        parts.append('Consider mentioning: ' + ', '.join(missed[:MAX_MISSED_TERMS]) + '.')
+    return ' '.join(parts)
+
+
+def fit(questions=None):
+    """Fit a scorer on the question bank (or the given questions) and save it"""
+    from . import versions
+    from .models import InterviewQuestion
+
+    # Read before the questions: a save committed in between bumps the
+    # version again, so the next fit is not skipped as up to date
+    version = versions.current(versions.QUESTION_BANK)
+    if questions is None:
+        questions = list(InterviewQuestion.objects.only('id', 'question_text', 'expected_answer'))
+    scorer = AnswerScorer(questions, version)
+    scorer.save()
+    return scorer
+
+
+def fit_if_stale():
+    """The saved scorer, refitted first if the bank changed since it was fitted"""
+    from . import versions
+
+    scorer = answer_scorer.get()
+    if scorer is None or scorer.version != versions.current(versions.QUESTION_BANK):
+        scorer = fit()
+    return scorer
+
+
+class SavedScorer:
+    """The scorer in ANSWER_SCORER_PATH, reloaded when the file is replaced"""
+
+    def __init__(self):
+        self._scorer = None
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._warned = False
+
+    def get(self):
+        """The latest saved scorer, or None before one has been fitted"""
+        path = scorer_path()
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return self._scorer
+        if mtime == self._mtime:
+            return self._scorer
+        # One thread loads; the others keep scoring with the scorer they have
+        if not self._lock.acquire(blocking=self._scorer is None):
+            return self._scorer
+        try:
+            if mtime != self._mtime:
+                self._scorer = AnswerScorer.load(path)
+                self._mtime = mtime
+            return self._scorer
+        finally:
+            self._lock.release()
+
+    def score(self, question, answer):
+        """(score from 1 to 5, feedback) for an answer to a question"""
+        scorer = self.get()
+        if scorer is None:
+            if not self._warned:
+                logger.warning('No answer scorer at %s; scoring on keywords only until '
+                               'the fit_answer_scorer task or build_answer_scorer runs', scorer_path())
+                self._warned = True
+            return keyword_score(question, answer)
+        return scorer.score(question, answer)
+
+
+answer_scorer = SavedScorer()
+
+
+# Process pool workers for `manage.py rescore_responses`; they only score,
+# so they need neither Django set up nor a database connection
+_worker_scorer = None
+
+
+def init_worker(scorer):
+    global _worker_scorer
+    _worker_scorer = scorer
+
+
+def score_rows(rows):
+    """[(id, score, feedback)] for (id, question_id, answer) rows"""
+    ids, question_ids, answers = zip(*rows) if rows else ((), (), ())
+    scores = _worker_scorer.score_batch(question_ids, answers)
+    return [(row_id, score, feedback) for row_id, (score, feedback) in zip(ids, scores)]
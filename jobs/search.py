@@ -0,0 +1,118 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+
+from . import fts
+
+# Relative weight of a term depending on the field it was found in
+FIELD_WEIGHTS = {
+    'title': 3,
+    'company': 2,
+    'description': 1,
+}
+
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'is', 'of', 'on', 'or', 'the', 'to', 'with',
+}
+
+TOKEN_RE = re.compile(r'[a-z0-9]+(?:[+#]+|\.[a-z0-9]+)*')
+
+MAX_TERM_LENGTH = 100
+
+
+def tokenize(text):
+    """
+    Split text into lowercase search terms, dropping stop words
+    """
+    if not text:
+        return []
+    return [
+        token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall(text.lower())
+        if token not in STOP_WORDS
+    ]
+
+
+def query_terms(query):
+    """
+    Unique terms of a search query, in the order they were typed
+    """
+    return list(dict.fromkeys(tokenize(query)))
+
+
+def index_terms(job):
+    """
+    Build the {term: weight} mapping for a job, weighting each
+    occurrence by the field it appears in
+    """
+    weights = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(getattr(job, field)):
+            weights[token] += weight
+    return weights
+
+
+def index_job(job, term_model=None):
+    """
+    Replace the search terms stored for a single job
+    """
+    index_jobs([job], term_model)
+
+
+def index_jobs(jobs, term_model=None):
+    """
+    Replace the search terms stored for a batch of jobs
+    """
+    if term_model is None:
+        from .models import JobSearchTerm
+        term_model = JobSearchTerm
+
+    with transaction.atomic():
+        term_model.objects.filter(job_id__in=[job.pk for job in jobs]).delete()
+        term_model.objects.bulk_create([
+            term_model(job_id=job.pk, term=term, weight=weight)
+            for job in jobs
+            for term, weight in index_terms(job).items()
+        ], batch_size=1000)
+
+
+def search_jobs(jobs, query, backend=None):
+    """
+    Filter a Job queryset by a search query using the configured backend
+    ('index', 'fts5' or 'icontains', see JOB_SEARCH_BACKEND)
+    """
+    backend = backend or getattr(settings, 'JOB_SEARCH_BACKEND', 'index')
+
+    if backend == 'icontains':
+        return jobs.filter(
+            Q(title__icontains=query) |
+            Q(company__icontains=query) |
+            Q(description__icontains=query)
+        )
+
+    terms = query_terms(query)
+    if not terms:
+        return jobs
+
+    if backend == 'fts5' and fts.is_supported(connection):
+        return fts.search(jobs, terms)
+
+    return search_index(jobs, terms)
+
+
+def search_index(jobs, terms):
+    """
+    Restrict a Job queryset to jobs containing every term, annotated with
+    a relevance score and ordered by it
+    """
+    return jobs.filter(
+        search_terms__term__in=terms
+    ).annotate(
+        matched_terms=Count('search_terms__term', distinct=True),
+        relevance=Sum('search_terms__weight'),
+    ).filter(
+        matched_terms=len(terms)
+    ).order_by('-relevance', '-id')
@@ -0,0 +1,221 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from employer.ownership import owner_for_company
+from .autocomplete import autocomplete_values, job_autocomplete
+from .geo import locate_job
+from .facets import adjust_cell, cell_key, job_cell_key
+from .funnel import adjust_status_count
+from .models import (Application, DeletedJob, InterviewQuestion, Job, SavedJob, SimilarJob,
+                     SimilarityRefresh)
+from .question_bank import question_bank
+from .result_cache import changed_counters, invalidate, listing_state
+from .saved import invalidate_saved_jobs
+from .search import index_job
+from .storage import release_file, remember_file, update_file_references
+from .tasks import schedule_answer_scorer_fit
+from . import versions
+
+# Fields whose previous values are needed to update derived job data
+TRACKED_JOB_FIELDS = ('title', 'company', 'description', 'location', 'salary', 'job_type', 'version')
+
+# Fields the similar-jobs TF-IDF vectors are built from
+SIMILARITY_FIELDS = ('title', 'description')
+
+
+@receiver(pre_save, sender=Job)
+def remember_job_state(sender, instance, raw=False, **kwargs):
+    # Stash the stored values so post_save can tell what changed
+    instance._pre_save_state = None
+    if raw or instance.pk is None:
+        return
+    instance._pre_save_state = (
+        Job.objects.filter(pk=instance.pk).values(*TRACKED_JOB_FIELDS).first()
+    )
+
+
+@receiver(pre_save, sender=Job)
+def bump_job_version(sender, instance, raw=False, **kwargs):
+    # Part of the ETag of every page showing this job
+    old = getattr(instance, '_pre_save_state', None)
+    if not raw and old is not None:
+        instance.version = old['version'] + 1
+
+
+@receiver(pre_save, sender=Job)
+def assign_job_employer(sender, instance, raw=False, **kwargs):
+    # Jobs posted or imported without an owner go to the employer of that name
+    if raw or instance.employer_id is not None:
+        return
+    instance.employer_id = owner_for_company(instance.company)
+
+
+@receiver(pre_save, sender=Job)
+def resolve_job_location(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    locate_job(instance)
+
+
+@receiver(post_save, sender=Job)
+def update_job_search_index(sender, instance, raw=False, **kwargs):
+    # Search terms are removed with the job through the FK cascade
+    if raw:
+        return
+    index_job(instance)
+
+
+@receiver(post_save, sender=Job)
+def update_job_facets(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    new_key = job_cell_key(instance)
+    old = getattr(instance, '_pre_save_state', None)
+    if old is None:
+        # New job (or a row that did not exist before this save)
+        adjust_cell(new_key, 1)
+        return
+    old_key = cell_key(old['job_type'], old['location'], old['salary'])
+    if old_key != new_key:
+        adjust_cell(old_key, -1)
+        adjust_cell(new_key, 1)
+
+
+@receiver(post_delete, sender=Job)
+def remove_job_facets(sender, instance, **kwargs):
+    adjust_cell(job_cell_key(instance), -1)
+
+
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+def bump_jobs_version(sender, **kwargs):
+    # Changes the job list's ETag
+    versions.bump(versions.JOBS)
+
+
+@receiver(post_save, sender=Job)
+def invalidate_job_list_pages(sender, instance, raw=False, **kwargs):
+    # Cached pages of the listings the job matched before or after the save
+    if raw:
+        versions.bump(versions.JOB_LIST)
+        return
+    old = getattr(instance, '_pre_save_state', None)
+    invalidate(changed_counters(old, listing_state(instance)))
+
+
+@receiver(post_delete, sender=Job)
+def remove_job_list_pages(sender, instance, **kwargs):
+    invalidate(changed_counters(listing_state(instance), None))
+
+
+@receiver(post_delete, sender=Job)
+def record_deleted_job(sender, instance, **kwargs):
+    # Lets incremental exports tell partners the job is gone
+    DeletedJob.objects.update_or_create(job_id=instance.pk)
+
+
+@receiver(post_save, sender=Job)
+def update_job_autocomplete(sender, instance, raw=False, **kwargs):
+    # Applied once the save commits, so a rolled back save leaves no trace
+    if raw:
+        return
+    old = getattr(instance, '_pre_save_state', None)
+    new = autocomplete_values(instance)
+    transaction.on_commit(lambda: job_autocomplete.job_changed(old, new))
+
+
+@receiver(post_delete, sender=Job)
+def remove_job_autocomplete(sender, instance, **kwargs):
+    values = autocomplete_values(instance)
+    transaction.on_commit(lambda: job_autocomplete.job_removed(values))
+
+
+@receiver(post_save, sender=Job)
+def queue_similarity_refresh(sender, instance, raw=False, **kwargs):
+    # Picked up by `manage.py build_similar_jobs --incremental`
+    if raw:
+        return
+    old = getattr(instance, '_pre_save_state', None)
+    if old is not None and all(old[field] == getattr(instance, field) for field in SIMILARITY_FIELDS):
+        return
+    SimilarityRefresh.objects.update_or_create(job_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Job)
+def queue_similar_to_deleted_job(sender, instance, **kwargs):
+    # Jobs listing this one lose a neighbour when the rows cascade
+    job_ids = SimilarJob.objects.filter(similar=instance).values_list('job_id', flat=True)
+    for job_id in job_ids:
+        if job_id != instance.pk:
+            SimilarityRefresh.objects.update_or_create(job_id=job_id)
+
+
+@receiver(post_save, sender=SavedJob)
+@receiver(post_delete, sender=SavedJob)
+def invalidate_saved_job_ids(sender, instance, **kwargs):
+    invalidate_saved_jobs(instance.user_id)
+
+
+@receiver(post_save, sender=InterviewQuestion)
+@receiver(post_delete, sender=InterviewQuestion)
+def invalidate_question_bank(sender, instance, **kwargs):
+    question_bank.invalidate()
+    schedule_answer_scorer_fit()
+
+
+@receiver(pre_save, sender=Application)
+def remember_application_resume(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'resume' not in update_fields):
+        instance._stored_file_name = None
+        return
+    remember_file(instance, 'resume')
+
+
+@receiver(post_save, sender=Application)
+def track_application_resume(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'resume' not in update_fields):
+        return
+    update_file_references(instance, 'resume')
+
+
+@receiver(post_delete, sender=Application)
+def release_application_resume(sender, instance, **kwargs):
+    release_file(instance, 'resume')
+
+
+@receiver(pre_save, sender=Application)
+def remember_application_status(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._stored_status = None
+    if raw or instance.pk is None or (update_fields is not None and not {'status', 'job'} & set(update_fields)):
+        return
+    instance._stored_status = (
+        Application.objects.filter(pk=instance.pk).values_list('job_id', 'status').first()
+    )
+
+
+@receiver(post_save, sender=Application)
+def update_status_counts(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not {'status', 'job'} & set(update_fields)):
+        return
+    new = (instance.job_id, instance.status)
+    old = getattr(instance, '_stored_status', None)
+    if old == new:
+        return
+    if old is not None:
+        adjust_status_count(*old, -1)
+    adjust_status_count(*new, 1)
+
+
+@receiver(pre_delete, sender=Application)
+def remember_deleted_application_status(sender, instance, **kwargs):
+    # The instance being deleted may hold a status changed since it was loaded
+    instance._stored_status = (
+        Application.objects.filter(pk=instance.pk).values_list('job_id', 'status').first()
+    )
+
+
+@receiver(post_delete, sender=Application)
+def remove_status_count(sender, instance, **kwargs):
+    stored = getattr(instance, '_stored_status', None)
+    if stored is not None:
+        adjust_status_count(*stored, -1)
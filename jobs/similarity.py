@@ -0,0 +1,214 @@
+"""
+TF-IDF index behind the "similar jobs" panel.
+
+The build_similar_jobs management command fits a TF-IDF model over every
+job's title and description, computes each job's top-k cosine neighbours
+with chunked sparse matrix products, and stores them as SimilarJob rows,
+so job_detail only reads precomputed rows. The fitted vectorizer and
+matrix are persisted to SIMILAR_JOBS_INDEX_PATH so later incremental runs
+only re-vectorize the jobs queued in SimilarityRefresh (vocabulary and IDF
+weights stay as fitted until the next full build).
+"""
+from pathlib import Path
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+DEFAULT_TOP_K = 5
+CHUNK_SIZE = 1000
+
+
+def job_text(title, description):
+    return f'{title}\n{description}'
+
+
+def index_path():
+    return Path(getattr(settings, 'SIMILAR_JOBS_INDEX_PATH', settings.BASE_DIR / 'similar_jobs.joblib'))
+
+
+class SimilarityIndex:
+    def __init__(self, vectorizer, matrix, job_ids, top_k=DEFAULT_TOP_K):
+        self.vectorizer = vectorizer
+        self.matrix = matrix.tocsr()
+        self.job_ids = np.asarray(job_ids, dtype=np.int64)
+        self.top_k = top_k
+        self._positions = None
+
+    @classmethod
+    def build(cls, rows, top_k=DEFAULT_TOP_K):
+        """Fit over an iterable of (id, title, description) rows"""
+        job_ids = []
+
+        def texts():
+            for job_id, title, description in rows:
+                job_ids.append(job_id)
+                yield job_text(title, description)
+
+        vectorizer = TfidfVectorizer(
+            stop_words='english', sublinear_tf=True, dtype=np.float32,
+        )
+        try:
+            matrix = vectorizer.fit_transform(texts())
+        except ValueError:
+            # Empty corpus or nothing but stop words
+            vectorizer = None
+            matrix = sparse.csr_matrix((len(job_ids), 0), dtype=np.float32)
+        return cls(vectorizer, matrix, job_ids, top_k)
+
+    @classmethod
+    def load(cls, path=None):
+        data = joblib.load(path or index_path())
+        return cls(data['vectorizer'], data['matrix'], data['job_ids'], data['top_k'])
+
+    def save(self, path=None):
+        joblib.dump({
+            'vectorizer': self.vectorizer,
+            'matrix': self.matrix,
+            'job_ids': self.job_ids,
+            'top_k': self.top_k,
+        }, path or index_path())
+
+    @property
+    def positions(self):
+        if self._positions is None:
+            self._positions = {job_id: i for i, job_id in enumerate(self.job_ids.tolist())}
+        return self._positions
+
+    def remove(self, job_ids):
+        keep = ~np.isin(self.job_ids, list(job_ids))
+        self.matrix = self.matrix[keep]
+        self.job_ids = self.job_ids[keep]
+        self._positions = None
+
+    def upsert(self, rows):
+        """Re-vectorize (id, title, description) rows, replacing or appending them"""
+        rows = list(rows)
+        if not rows or self.vectorizer is None:
+            return
+        self.remove(job_id for job_id, _, _ in rows)
+        vectors = self.vectorizer.transform([job_text(title, description) for _, title, description in rows])
+        self.matrix = sparse.vstack([self.matrix, vectors.astype(np.float32)]).tocsr()
+        self.job_ids = np.concatenate([self.job_ids, np.array([row[0] for row in rows], dtype=np.int64)])
+        self._positions = None
+
+    def similarities(self, job_ids):
+        """Sparse (len(job_ids) x N) cosine similarities against every job"""
+        rows = [self.positions[job_id] for job_id in job_ids]
+        return (self.matrix[rows] @ self.matrix.T).tocsr()
+
+    def neighbours(self, job_ids, k=None):
+        """{job_id: [(similar_id, score), ...]} best first, excluding the job itself"""
+        k = k or self.top_k
+        result = {}
+        scores = self.similarities(job_ids)
+        for row, job_id in enumerate(job_ids):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            data = scores.data[start:end]
+            columns = scores.indices[start:end]
+            own = self.positions[job_id]
+            mask = (columns != own) & (data > 0)
+            data, columns = data[mask], columns[mask]
+            if len(data) > k:
+                best = np.argpartition(-data, k)[:k]
+                data, columns = data[best], columns[best]
+            order = np.lexsort((self.job_ids[columns], -data))
+            result[job_id] = [
+                (int(self.job_ids[columns[i]]), float(data[i])) for i in order
+            ]
+        return result
+
+
+def store_neighbours(neighbours):
+    """Replace the SimilarJob rows of the given jobs"""
+    from .models import SimilarJob
+
+    with transaction.atomic():
+        SimilarJob.objects.filter(job_id__in=list(neighbours)).delete()
+        SimilarJob.objects.bulk_create([
+            SimilarJob(job_id=job_id, similar_id=similar_id, score=score, rank=rank)
+            for job_id, similar in neighbours.items()
+            for rank, (similar_id, score) in enumerate(similar)
+        ], batch_size=1000)
+
+
+def _job_rows(queryset):
+    return queryset.order_by('id').values_list('id', 'title', 'description').iterator(chunk_size=2000)
+
+
+def build_full(top_k=DEFAULT_TOP_K, chunk_size=CHUNK_SIZE):
+    """
+    Fit a fresh index over every job and rewrite all neighbour lists.
+    Returns the index and the number of jobs processed.
+    """
+    from .models import Job, SimilarJob, SimilarityRefresh
+
+    started = timezone.now()
+    index = SimilarityIndex.build(_job_rows(Job.objects.all()), top_k)
+    job_ids = index.job_ids.tolist()
+    for start in range(0, len(job_ids), chunk_size):
+        store_neighbours(index.neighbours(job_ids[start:start + chunk_size]))
+
+    SimilarJob.objects.exclude(job_id__in=Job.objects.values('id')).delete()
+    SimilarityRefresh.objects.filter(queued_at__lte=started).delete()
+    index.save()
+    return index, len(job_ids)
+
+
+def refresh_incremental(chunk_size=CHUNK_SIZE):
+    """
+    Apply queued job changes to the persisted index and recompute the
+    neighbour lists they can affect: the changed jobs themselves, jobs
+    that listed one of them, and jobs for which a changed job now beats
+    their current k-th neighbour. Returns the number of lists rewritten.
+    """
+    from .models import Job, SimilarJob, SimilarityRefresh
+
+    started = timezone.now()
+    index = SimilarityIndex.load()
+    if index.vectorizer is None:
+        # Fitted on an empty corpus; there is no vocabulary to extend
+        return build_full(index.top_k, chunk_size)[1]
+    queued = SimilarityRefresh.objects.filter(queued_at__lte=started)
+
+    live_ids = set(Job.objects.values_list('id', flat=True))
+    deleted = set(index.job_ids.tolist()) - live_ids
+    if deleted:
+        index.remove(deleted)
+
+    changed = []
+    rows = _job_rows(Job.objects.filter(id__in=queued.values('job_id')))
+    batch = []
+    for row in rows:
+        batch.append(row)
+        changed.append(row[0])
+        if len(batch) >= chunk_size:
+            index.upsert(batch)
+            batch = []
+    index.upsert(batch)
+
+    affected = set(changed)
+    affected.update(
+        SimilarJob.objects.filter(similar_id__in=changed).values_list('job_id', flat=True)
+    )
+    kth_scores = dict(
+        SimilarJob.objects.filter(rank=index.top_k - 1).values_list('job_id', 'score')
+    )
+    for start in range(0, len(changed), chunk_size):
+        scores = index.similarities(changed[start:start + chunk_size]).tocoo()
+        for column, score in zip(scores.col, scores.data):
+            job_id = int(index.job_ids[column])
+            if score > kth_scores.get(job_id, 0):
+                affected.add(job_id)
+
+    affected = [job_id for job_id in affected if job_id in index.positions]
+    for start in range(0, len(affected), chunk_size):
+        store_neighbours(index.neighbours(affected[start:start + chunk_size]))
+
+    queued.delete()
+    index.save()
+    return len(affected)
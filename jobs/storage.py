@@ -0,0 +1,203 @@
+"""
+Content-addressed storage for uploaded resumes.
+
+Uploads are hashed with SHA-256 while they are copied to a temporary file,
+then stored under their digest (resumes/<sha256>.pdf), so identical files
+share one copy on disk. A StoredBlob row per stored file keeps its digest,
+the number of model rows referencing it, and the text and skills parsed
+from it so background tasks can reuse them for every copy of the same
+resume.
+
+References are counted by the models using the storage (see the signal
+receivers calling update_file_references and release_file): saving a row
+that points at a new name retains it, and replacing or deleting the file
+releases the old name. A file is removed once nothing refers to it.
+
+An upload stores its file before the row pointing at it is saved, so for a
+moment a file can be on disk with no reference counted yet. Storing and
+removing a file are each done holding the blob row's lock, and a release
+only removes a file that no upload stored within STORED_BLOB_GRACE_PERIOD
+seconds. Blobs left unreferenced past that (a release inside the grace
+period, or an upload whose row was never saved) are removed by
+collect_unreferenced, run from the dedupe_resumes command. Files stored
+before this scheme have no StoredBlob and are never removed by it;
+dedupe_resumes moves them under their hash.
+"""
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by the SHA-256 of their content"""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save; identical
+        # content must map to the same name, not get a random suffix
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        # Same directory as the destination, so the final rename is atomic
+        fd, temp_path = tempfile.mkstemp(dir=full_directory, suffix='.upload')
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(HASH_CHUNK_SIZE):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    temp.write(chunk)
+            stored_name = os.path.join(directory, digest.hexdigest() + extension).replace('\\', '/')
+            with track(stored_name, digest.hexdigest(), size):
+                if self.exists(stored_name):
+                    os.remove(temp_path)
+                else:
+                    os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                    os.replace(temp_path, self.path(stored_name))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return stored_name
+
+
+resume_storage = ContentAddressedStorage()
+
+
+def _grace_period():
+    return timedelta(seconds=getattr(settings, 'STORED_BLOB_GRACE_PERIOD', 600))
+
+
+@contextmanager
+def track(name, sha256, size):
+    """
+    Record a stored file and hold its row locked while the block puts the
+    file in place; it is referenced once a saved row points at it.
+    """
+    from .models import StoredBlob
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.get_or_create(name=name, defaults={'sha256': sha256, 'size': size})
+        except IntegrityError:
+            # Recorded concurrently
+            pass
+        # An UPDATE takes the row lock (the database lock on SQLite), so a
+        # release cannot remove the file between the block's exists() check
+        # and this upload's row being saved
+        StoredBlob.objects.filter(name=name).update(stored_at=timezone.now())
+        yield
+
+
+def retain(name):
+    """Count one more reference to a stored file"""
+    from .models import StoredBlob
+
+    StoredBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+
+def release(name, storage=resume_storage):
+    """Drop one reference to a stored file, deleting it when none remain"""
+    from .models import StoredBlob
+
+    with transaction.atomic():
+        blobs = StoredBlob.objects.filter(name=name)
+        # The UPDATE locks the row until commit, like track()
+        if not blobs.update(refcount=F('refcount') - 1):
+            return
+        _delete_unreferenced(blobs, storage, timezone.now() - _grace_period())
+
+
+def collect_unreferenced(storage=resume_storage):
+    """Delete stored files left without references past the grace period"""
+    from .models import StoredBlob
+
+    stored_before = timezone.now() - _grace_period()
+    names = StoredBlob.objects.filter(refcount__lte=0, stored_at__lt=stored_before).values_list('name', flat=True)
+    freed = 0
+    for name in list(names):
+        with transaction.atomic():
+            freed += _delete_unreferenced(
+                StoredBlob.objects.filter(name=name), storage, stored_before,
+            )
+    return freed
+
+
+def _delete_unreferenced(blobs, storage, stored_before):
+    """
+    Delete the blob row and file if still unreferenced and not stored since
+    stored_before; returns the bytes freed. Must run in the transaction
+    holding the row lock, so an upload cannot reuse the file meanwhile.
+    """
+    blob = blobs.select_for_update().filter(refcount__lte=0, stored_at__lt=stored_before).first()
+    if blob is None:
+        return 0
+    blob.delete()
+    # Removed before commit: an upload waiting on the lock then finds the
+    # file missing and stores its own copy
+    storage.delete(blob.name)
+    return blob.size
+
+
+def blob_for(name):
+    from .models import StoredBlob
+
+    return StoredBlob.objects.filter(name=name).first()
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def remember_file(instance, field_name):
+    """pre_save: note the file name stored before this save"""
+    old_name = None
+    if instance.pk is not None:
+        old_name = (
+            type(instance)._base_manager.filter(pk=instance.pk)
+            .values_list(field_name, flat=True).first()
+        )
+    instance._stored_file_name = old_name or None
+
+
+def update_file_references(instance, field_name):
+    """post_save: retain a newly referenced file and release the replaced one"""
+    old_name = getattr(instance, '_stored_file_name', None)
+    new_name = getattr(instance, field_name).name or None
+    if new_name == old_name:
+        return
+    if new_name:
+        retain(new_name)
+    if old_name:
+        transaction.on_commit(lambda: release(old_name))
+
+
+def release_file(instance, field_name):
+    """post_delete: release the file of a deleted row"""
+    name = getattr(instance, field_name).name
+    if name:
+        transaction.on_commit(lambda: release(name))
@@ -0,0 +1,99 @@
+"""
+Background tasks for applications and interviews, run by `manage.py run_tasks`.
+
+apply_job enqueues extract_resume_text once the application is committed;
+it stores the resume's text and queues extract_resume_skills, which stores
+the skills found in it. Application.resume_status tracks the pipeline.
+Both results are also kept on the resume's StoredBlob, so a resume
+already parsed for another application or profile is not parsed again.
+
+Saving or deleting an interview question queues fit_answer_scorer, which
+refits the answer scorer on the question bank (see jobs.scoring).
+"""
+from django.db import transaction
+
+from skillmap.utils.resume_parser import extract_text_from_resume
+from skillmap.utils.skill_extractor import extract_skills
+
+from .models import Application, BackgroundTask, StoredBlob
+from .queue import enqueue, task
+from .storage import blob_for
+
+# Seconds a queued scorer fit waits, so a burst of question saves shares one fit
+SCORER_FIT_DELAY = 60
+
+
+def _fail_on_last_attempt(application_id, task_row):
+    if task_row.attempts >= task_row.max_attempts:
+        Application.objects.filter(id=application_id).update(resume_status='failed')
+
+
+def _mark_failed(payload, task_row):
+    # The worker died on the last attempt (e.g. a resume that exhausts memory)
+    Application.objects.filter(id=payload['application_id']).update(resume_status='failed')
+
+
+@task('applications.extract_resume_text', on_give_up=_mark_failed)
+def extract_resume_text(payload, task_row):
+    application_id = payload['application_id']
+    application = Application.objects.filter(id=application_id).first()
+    if application is None:
+        # Withdrawn before the worker got to it
+        return
+    Application.objects.filter(id=application_id).update(resume_status='processing')
+    blob = blob_for(application.resume.name)
+    if blob is not None and blob.extracted_text is not None:
+        text = blob.extracted_text
+    else:
+        try:
+            with application.resume.open('rb') as resume:
+                text = extract_text_from_resume(resume)
+        except Exception:
+            _fail_on_last_attempt(application_id, task_row)
+            raise
+        if blob is not None:
+            StoredBlob.objects.filter(id=blob.id).update(extracted_text=text)
+    Application.objects.filter(id=application_id).update(resume_text=text)
+    enqueue(extract_resume_skills, {'application_id': application_id})
+
+
+@task('applications.extract_resume_skills', on_give_up=_mark_failed)
+def extract_resume_skills(payload, task_row):
+    application_id = payload['application_id']
+    row = Application.objects.filter(id=application_id).values_list('resume', 'resume_text').first()
+    if row is None:
+        return
+    name, text = row
+    blob = blob_for(name)
+    if blob is not None and blob.extracted_skills is not None:
+        skills = blob.extracted_skills
+    else:
+        try:
+            skills = extract_skills(text)
+        except Exception:
+            _fail_on_last_attempt(application_id, task_row)
+            raise
+        if blob is not None:
+            StoredBlob.objects.filter(id=blob.id).update(extracted_skills=skills)
+    Application.objects.filter(id=application_id).update(
+        extracted_skills=skills, resume_status='done',
+    )
+
+
+@task('interviews.fit_answer_scorer')
+def fit_answer_scorer(payload, task_row):
+    # sklearn is only imported by the workers that fit
+    from .scoring import fit_if_stale
+
+    fit_if_stale()
+
+
+def schedule_answer_scorer_fit():
+    """Queue a scorer fit after the current transaction, unless one is already waiting"""
+    def enqueue_fit():
+        # Checked at commit, so the saves of one transaction queue one fit
+        waiting = BackgroundTask.objects.filter(name=fit_answer_scorer.task_name, status='pending')
+        if not waiting.exists():
+            enqueue(fit_answer_scorer, delay=SCORER_FIT_DELAY)
+
+    transaction.on_commit(enqueue_fit)
@@ -0,0 +1,16 @@
+from django import template
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from ..fts import HIGHLIGHT_CLOSE, HIGHLIGHT_OPEN
+
+register = template.Library()
+
+
+@register.filter
+def highlight(snippet):
+    """Escape an FTS snippet and turn its match markers into <mark> tags"""
+    if not snippet:
+        return ''
+    html = escape(snippet)
+    return mark_safe(html.replace(HIGHLIGHT_OPEN, '<mark>').replace(HIGHLIGHT_CLOSE, '</mark>'))
@@ -0,0 +1,71 @@
+"""
+Test helpers for query budgets (see jobs.query_budget).
+
+    from jobs.testing import assert_query_budget, assert_queries_constant
+
+    def test_dashboard_queries(self):
+        self.client.force_login(employer)
+        assert_queries_constant(
+            self.client, reverse('dashboard'),
+            grow=lambda n: make_applications(job, n), sizes=(1, 10, 50),
+        )
+
+Both fail with AssertionError, so they work in any TestCase.
+"""
+from django.urls import resolve
+
+from .query_budget import budget_for, count_queries, violations
+
+
+def _request(client, url, method, data, extra):
+    with count_queries() as counter:
+        response = getattr(client, method)(url, data, **extra)
+    return response, counter
+
+
+def _view_budget(url):
+    match = resolve(url.split('?', 1)[0])
+    return budget_for(match.func, match.view_name)
+
+
+def assert_query_budget(client, url, budget=None, method='get', data=None, **extra):
+    """
+    Request url and fail if it ran more queries than `budget` (by default
+    the view's declared budget) or repeated a SELECT shape. Returns the
+    response.
+    """
+    if budget is None:
+        budget = _view_budget(url)
+    response, counter = _request(client, url, method, data, extra)
+    problems = violations(counter, budget)
+    if problems:
+        raise AssertionError(f'{method.upper()} {url}: ' + '; '.join(problems))
+    return response
+
+
+def assert_queries_constant(client, url, grow, sizes=(1, 10, 50), budget=None, method='get', data=None, **extra):
+    """
+    For each fixture size, call grow(added) to bring the fixture up to
+    that size, then request url. Fail if the query count grows with the
+    size (an N+1 pattern) or breaks the view's budget. Returns the counts.
+    """
+    if budget is None:
+        budget = _view_budget(url)
+    # Unmeasured first request, so cache warm-up is not mistaken for growth
+    getattr(client, method)(url, data, **extra)
+    counts = []
+    current = 0
+    for size in sizes:
+        grow(size - current)
+        current = size
+        response, counter = _request(client, url, method, data, extra)
+        problems = violations(counter, budget)
+        if problems:
+            raise AssertionError(f'{method.upper()} {url} with {size} rows: ' + '; '.join(problems))
+        counts.append(counter.total)
+    if max(counts) > counts[0]:
+        raise AssertionError(
+            f'{method.upper()} {url}: query count grows with the fixture ' +
+            ', '.join(f'{size} rows: {n}' for size, n in zip(sizes, counts))
+        )
+    return counts
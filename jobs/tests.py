@@ -1,3 +1,1300 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import fts, queue, scoring, versions
+from .autocomplete import PrefixIndex, job_autocomplete
+from .facets import facet_counts, rebuild_cells
+from .funnel import funnel_counts, set_status, status_totals
+from .geo import get_gazetteer, haversine_km, parse_radius, resolve_location
+from .ingest import JobImporter, read_rows
+from .interview_state import SessionState, load_state
+from .models import Application, BackgroundTask, InterviewQuestion, InterviewResponse, InterviewSession, Job, JobFacetCell, JobSearchTerm, SavedJob, SimilarJob, SimilarityRefresh, StoredBlob
+from .pagination import KeysetPage, KeysetPaginator
+from .question_bank import BankIndex, question_bank
+from .result_cache import JobListQuery, job_list_cache
+from .sampling import draw
+from .saved import saved_job_ids
+from .search import search_jobs, tokenize
+from .storage import collect_unreferenced, resume_storage
+from .templatetags.job_extras import highlight
+from .testing import assert_queries_constant, assert_query_budget
+from .utils import create_sample_questions
+
+
+def make_job(**fields):
+    values = {
+        'title': 'Python Developer',
+        'company': 'Acme',
+        'description': 'Build Django apps',
+        'salary': 500000,
+        'location': 'Pune, Maharashtra',
+        'job_type': 'full-time',
+    }
+    values.update(fields)
+    return Job.objects.create(**values)
+
+
+def make_employer(username='employer', company='Acme'):
+    user = User.objects.create_user(username, password='pass')
+    user.profile.role = 'employer'
+    user.profile.company_name = company
+    user.profile.save()
+    return user
+
+
+def make_application(job, applicant=None, **fields):
+    values = {
+        'name': 'Candidate',
+        'email': 'candidate@example.com',
+        'resume': 'resumes/legacy.pdf',
+        'cover_letter': '',
+    }
+    values.update(fields)
+    return Application.objects.create(job=job, applicant=applicant, **values)
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True)
+class QueryBudgetTests(TestCase):
+    def test_job_list_queries_do_not_grow_with_jobs(self):
+        def grow(added):
+            for i in range(added):
+                make_job(title=f'Python Developer {i}', salary=1000 * i)
+
+        assert_queries_constant(self.client, reverse('job_list'), grow)
+        assert_queries_constant(self.client, reverse('job_list') + '?q=python&sort=salary', grow)
+
+    def test_job_detail_within_budget(self):
+        job = make_job()
+        assert_query_budget(self.client, reverse('job_detail', args=[job.id]))
+
+    def test_employer_dashboard_queries_do_not_grow_with_applications(self):
+        employer = make_employer()
+        job = make_job()
+        self.client.force_login(employer)
+
+        def grow(added):
+            for _ in range(added):
+                make_application(job)
+
+        assert_queries_constant(self.client, reverse('dashboard'), grow)
+
+    def test_candidate_dashboard_queries_do_not_grow_with_applications(self):
+        candidate = User.objects.create_user('candidate', password='pass')
+        self.client.force_login(candidate)
+
+        def grow(added):
+            for _ in range(added):
+                make_application(make_job(), applicant=candidate)
+
+        assert_queries_constant(self.client, reverse('dashboard'), grow)
+
+    def test_start_interview_creates_sample_questions_in_one_pass(self):
+        candidate = User.objects.create_user('candidate', password='pass')
+        application = make_application(make_job(), applicant=candidate)
+        self.client.force_login(candidate)
+
+        response = assert_query_budget(self.client, reverse('start_interview', args=[application.id]))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(InterviewQuestion.objects.count(), 7)
+        self.assertEqual(InterviewSession.objects.filter(candidate=candidate).count(), 1)
+
+    def test_sample_questions_are_created_once(self):
+        create_sample_questions()
+        create_sample_questions()
+        self.assertEqual(InterviewQuestion.objects.count(), 7)
+
+
+class InvertedIndexSearchTests(TestCase):
+    def test_tokenize_drops_stop_words_and_keeps_symbols(self):
+        self.assertEqual(tokenize('The C++ and Node.js developer'), ['c++', 'node.js', 'developer'])
+
+    def test_terms_weighted_by_field(self):
+        job = make_job(title='Python Developer', company='Python Labs', description='python scripting')
+        weights = dict(JobSearchTerm.objects.filter(job=job).values_list('term', 'weight'))
+        self.assertEqual(weights['python'], 3 + 2 + 1)
+        self.assertEqual(weights['scripting'], 1)
+
+    def test_every_term_must_match_and_title_matches_rank_first(self):
+        in_title = make_job(title='Django Developer', description='Backend work')
+        in_description = make_job(title='Backend Engineer', description='Django and Python')
+        make_job(title='Django Designer', description='Figma')
+
+        results = list(search_jobs(Job.objects.all(), 'django developer'))
+        self.assertEqual(results, [in_title])
+        results = list(search_jobs(Job.objects.all(), 'django python'))
+        self.assertEqual(results, [in_description])
+        results = list(search_jobs(Job.objects.exclude(title='Django Designer'), 'django'))
+        self.assertEqual(results, [in_title, in_description])
+
+    def test_index_follows_edits_and_deletes(self):
+        job = make_job(title='Java Developer')
+        job.title = 'Rust Developer'
+        job.save()
+        self.assertFalse(search_jobs(Job.objects.all(), 'java').exists())
+        self.assertEqual(list(search_jobs(Job.objects.all(), 'rust')), [job])
+        job.delete()
+        self.assertFalse(JobSearchTerm.objects.exists())
+
+    def test_job_list_searches_the_index(self):
+        job = make_job(title='Kotlin Developer')
+        make_job(title='Swift Developer')
+        response = self.client.get(reverse('job_list'), {'q': 'kotlin'})
+        self.assertEqual(list(response.context['jobs']), [job])
+
+
+@skipUnless(fts.is_supported(connection), 'FTS5 needs SQLite')
+class FullTextSearchTests(TestCase):
+    def fts_ids(self, query):
+        return list(search_jobs(Job.objects.all(), query, backend='fts5').values_list('id', flat=True))
+
+    def test_triggers_follow_inserts_updates_and_deletes(self):
+        job = make_job(title='Golang Developer')
+        self.assertEqual(self.fts_ids('golang'), [job.id])
+
+        job.title = 'Elixir Developer'
+        job.save()
+        self.assertEqual(self.fts_ids('golang'), [])
+        self.assertEqual(self.fts_ids('elixir'), [job.id])
+
+        Job.objects.filter(id=job.id).update(description='Phoenix framework')
+        self.assertEqual(self.fts_ids('phoenix'), [job.id])
+
+        job.delete()
+        self.assertEqual(self.fts_ids('elixir'), [])
+
+    def test_install_restores_dropped_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {fts.FTS_TABLE}_ai')
+        job = make_job(title='Haskell Developer')
+        self.assertEqual(self.fts_ids('haskell'), [])
+
+        fts.install()
+        self.assertEqual(self.fts_ids('haskell'), [job.id])
+        self.assertEqual(self.fts_ids('scala'), [])
+        make_job(title='Scala Developer')
+        self.assertEqual(len(self.fts_ids('scala')), 1)
+
+    def test_title_matches_rank_first_and_snippets_are_highlighted(self):
+        in_description = make_job(title='Backend Engineer', description='Work on <b>Erlang</b> services')
+        in_title = make_job(title='Erlang Developer', description='Backend services')
+
+        results = list(search_jobs(Job.objects.all(), 'erlang', backend='fts5'))
+        self.assertEqual(results, [in_title, in_description])
+        self.assertEqual(
+            highlight(results[1].snippet),
+            'Work on &lt;b&gt;<mark>Erlang</mark>&lt;/b&gt; services',
+        )
+
+    def test_quotes_in_queries_are_literal(self):
+        make_job(title='Python Developer')
+        self.assertEqual(self.fts_ids('python" OR "java'), [])
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(45):
+            make_job(title=f'Python Developer {i}', salary=1000 * (i % 7))
+
+    def walk(self, params):
+        seen, pages = [], []
+        response = self.client.get(reverse('job_list'), params)
+        while True:
+            page = response.context['page']
+            pages.append([job.id for job in page])
+            seen += pages[-1]
+            if not page.has_next():
+                return seen, pages, response
+            response = self.client.get(reverse('job_list') + page.next_url)
+
+    def test_pages_cover_every_job_once_in_order(self):
+        for params, ordering in (({}, ('-id',)), ({'sort': 'salary'}, ('salary', 'id')),
+                                 ({'sort': '-salary'}, ('-salary', '-id'))):
+            with self.subTest(**params):
+                seen, pages, response = self.walk(params)
+                self.assertEqual(seen, list(Job.objects.order_by(*ordering).values_list('id', flat=True)))
+                self.assertEqual(len(pages), 3)
+
+                previous = response.context['page'].previous_url
+                response = self.client.get(reverse('job_list') + previous)
+                self.assertEqual([job.id for job in response.context['page']], pages[-2])
+
+    def test_rows_added_while_paging_do_not_shift_pages(self):
+        paginator = KeysetPaginator(Job.objects.all(), ('-id',), per_page=20)
+        first = paginator.page()
+        make_job(title='Newest')
+        second = paginator.page(first.next_cursor)
+        self.assertEqual(
+            [job.id for job in first] + [job.id for job in second],
+            list(Job.objects.order_by('-id').values_list('id', flat=True)[1:41]),
+        )
+
+    def test_invalid_cursor_shows_the_first_page(self):
+        response = self.client.get(reverse('job_list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+
+
+class FacetTests(TestCase):
+    def cells(self):
+        return set(JobFacetCell.objects.values_list('job_type', 'location', 'salary_bucket', 'count'))
+
+    def test_cells_follow_saves_and_deletes(self):
+        job = make_job(location='Bangalore, KA', salary=450000)
+        make_job(location='Bengaluru', salary=420000)
+        self.assertEqual(self.cells(), {('full-time', 'bengaluru', 400000, 2)})
+
+        job.job_type = 'remote'
+        job.save()
+        self.assertEqual(self.cells(), {
+            ('full-time', 'bengaluru', 400000, 1),
+            ('remote', 'bengaluru', 400000, 1),
+        })
+
+        job.delete()
+        self.assertEqual(self.cells(), {('full-time', 'bengaluru', 400000, 1)})
+
+    def test_rebuild_matches_incremental_counts(self):
+        make_job(location='Pune', salary=150000)
+        make_job(location='Delhi', salary=250000, job_type='internship')
+        Job.objects.filter(location='Delhi').update(job_type='remote')
+        rebuild_cells()
+        self.assertEqual(self.cells(), {
+            ('full-time', 'pune', 100000, 1),
+            ('remote', 'delhi', 200000, 1),
+        })
+
+    def test_each_facet_ignores_its_own_filter(self):
+        make_job(location='Pune', salary=150000)
+        make_job(location='Pune', salary=350000, job_type='remote')
+        make_job(location='Delhi', salary=350000)
+
+        facets = facet_counts(job_type='full-time', min_salary=300000)
+        types = {option['value']: option['count'] for option in facets['job_type']}
+        self.assertEqual((types['full-time'], types['remote']), (1, 1))
+        locations = {option['value']: option['count'] for option in facets['location']}
+        self.assertEqual(locations, {'delhi': 1})
+        salaries = [(option['value'], option['count']) for option in facets['salary']]
+        self.assertEqual(salaries, [(100000, 2), (300000, 1)])
+
+    def test_state_location_counts_match_the_list(self):
+        make_job(location='Pune, Maharashtra')
+        make_job(location='Mumbai, Maharashtra', job_type='remote')
+        make_job(location='Delhi')
+        response = self.client.get(reverse('job_list'), {'location': 'Maharashtra'})
+        self.assertEqual(len(response.context['jobs']), 2)
+        counts = {option['value']: option['count'] for option in response.context['facets']['job_type']}
+        self.assertEqual((counts.get('full-time'), counts.get('remote')), (1, 1))
+
+
+class SalaryFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.low = make_job(salary=150000)
+        cls.mid = make_job(salary=250000, job_type='remote')
+        cls.high = make_job(salary=380000)
+
+    def listed(self, **params):
+        response = self.client.get(reverse('job_list'), params)
+        return {job.id for job in response.context['jobs']}
+
+    def test_list_honours_both_bounds(self):
+        self.assertEqual(self.listed(min_salary=200000), {self.mid.id, self.high.id})
+        self.assertEqual(self.listed(max_salary=299999), {self.low.id, self.mid.id})
+        self.assertEqual(self.listed(min_salary=200000, max_salary=260000), {self.mid.id})
+        self.assertEqual(self.listed(min_salary='lots'), {self.low.id, self.mid.id, self.high.id})
+
+    def test_unaligned_bounds_count_jobs_exactly(self):
+        facets = facet_counts(min_salary=240000, max_salary=260000)
+        types = {option['value']: option['count'] for option in facets['job_type']}
+        self.assertEqual((types['full-time'], types['remote']), (0, 1))
+
+    def test_histogram_counts_per_bucket_ignoring_salary_bounds(self):
+        response = self.client.get(reverse('salary_histogram_api'), {'min_salary': 300000})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['buckets'], [
+            {'min': 100000, 'max': 199999, 'count': 1},
+            {'min': 200000, 'max': 299999, 'count': 1},
+            {'min': 300000, 'max': 399999, 'count': 1},
+        ])
+        self.assertEqual(response.json()['selected'], {'min_salary': '300000', 'max_salary': None})
+
+        response = self.client.get(reverse('salary_histogram_api'), {'job_type': 'remote'})
+        self.assertEqual(response.json()['buckets'], [{'min': 200000, 'max': 299999, 'count': 1}])
+
+
+class JobListCacheTests(TestCase):
+    def setUp(self):
+        job_list_cache.clear()
+
+    def cached(self, params):
+        listing = JobListQuery(params)
+        return job_list_cache.get(listing, job_list_cache.stamp(listing))
+
+    def listed(self, params):
+        response = self.client.get(reverse('job_list'), params)
+        return [job.id for job in response.context['jobs']]
+
+    def test_saves_drop_only_pages_they_could_appear_on(self):
+        job = make_job(job_type='full-time', salary=300000)
+        remote = make_job(job_type='remote')
+        listings = ({}, {'job_type': 'full-time'}, {'job_type': 'remote'},
+                    {'min_salary': 200000}, {'q': 'python'})
+        for params in listings:
+            self.listed(params)
+
+        # Salary edits only reach pages filtered or sorted on salary
+        job.salary = 100000
+        job.save()
+        self.assertIsNone(self.cached({'min_salary': 200000}))
+        for params in ({}, {'job_type': 'full-time'}, {'job_type': 'remote'}, {'q': 'python'}):
+            self.assertIsNotNone(self.cached(params), params)
+
+        # A new remote job leaves the full-time pages in place
+        newer = make_job(job_type='remote')
+        self.assertIsNone(self.cached({}))
+        self.assertIsNone(self.cached({'job_type': 'remote'}))
+        self.assertIsNotNone(self.cached({'job_type': 'full-time'}))
+
+        # Moving a job between types drops both types' pages
+        self.listed({'job_type': 'remote'})
+        remote.job_type = 'full-time'
+        remote.save()
+        self.assertIsNone(self.cached({'job_type': 'remote'}))
+        self.assertEqual(self.listed({'job_type': 'full-time'}), [remote.id, job.id])
+
+        # Title edits reach searches; the row itself is re-read anyway
+        self.listed({})
+        job.title = 'Java Developer'
+        job.save()
+        self.assertIsNone(self.cached({'q': 'python'}))
+        self.assertIsNotNone(self.cached({}))
+        self.assertEqual(self.listed({'q': 'python'}), [newer.id, remote.id])
+
+    def test_delete_drops_pages_in_its_scope(self):
+        alpha = make_job(title='Alpha')
+        gamma = make_job(title='Gamma', job_type='remote')
+        self.assertEqual(self.listed({}), [gamma.id, alpha.id])
+        self.listed({'job_type': 'full-time'})
+        gamma.delete()
+        self.assertIsNotNone(self.cached({'job_type': 'full-time'}))
+        self.assertEqual(self.listed({}), [alpha.id])
+
+    def test_writers_without_signals_bump_job_list(self):
+        job = make_job()
+        params = {'job_type': 'full-time'}
+        self.listed(params)
+        Job.objects.filter(id=job.id).update(job_type='remote')
+        self.assertEqual(self.listed(params), [job.id])
+
+        versions.bump(versions.JOB_LIST)
+        self.assertEqual(self.listed(params), [])
+
+    def test_page_stored_under_an_older_stamp_is_dropped(self):
+        listing = JobListQuery({'q': 'python'})
+        stamp = job_list_cache.stamp(listing)
+        make_job()
+        job_list_cache.store(listing, KeysetPage([]), stamp)
+        self.assertIsNone(self.cached({'q': 'python'}))
+        self.assertEqual(len(job_list_cache), 0)
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        # Rebuilt from this test's jobs on the next lookup
+        versions.bump(versions.AUTOCOMPLETE)
+
+    def titles(self, prefix):
+        return [s['value'] for s in job_autocomplete.suggest(prefix, ('title',))]
+
+    def test_prefix_index_matches_word_starts_by_count(self):
+        index = PrefixIndex.build([('Python Developer', 1), ('Java Developer', 3), ('Data Scientist', 2)])
+        self.assertEqual(index.complete('dev'), [('Java Developer', 3), ('Python Developer', 1)])
+        self.assertEqual(index.complete('py'), [('Python Developer', 1)])
+        self.assertEqual(index.complete('veloper'), [])
+
+        index.add('python developer', 5)
+        index.remove('Java Developer')
+        self.assertEqual(index.complete('dev', limit=1), [('Python Developer', 6)])
+
+    def test_suggestions_follow_committed_saves_and_deletes(self):
+        job = make_job(title='Golang Developer')
+        self.assertEqual(self.titles('go'), ['Golang Developer'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            job.title = 'Rust Developer'
+            job.save()
+            self.assertEqual(self.titles('go'), ['Golang Developer'])
+        self.assertEqual(self.titles('go'), [])
+        self.assertEqual(self.titles('rust'), ['Rust Developer'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            job.delete()
+        self.assertEqual(self.titles('rust'), [])
+
+    def test_api_ranks_values_across_fields(self):
+        make_job(title='Python Developer', company='Pyramid Labs', location='Pune')
+        make_job(title='Python Developer', company='Acme', location='Pune')
+        response = self.client.get(reverse('autocomplete_api'), {'q': 'py', 'limit': 5})
+        self.assertEqual(response.json()['suggestions'], [
+            {'field': 'title', 'value': 'Python Developer', 'count': 2},
+            {'field': 'company', 'value': 'Pyramid Labs', 'count': 1},
+        ])
+
+
+class RadiusSearchTests(TestCase):
+    def test_locations_resolve_through_aliases_and_parts(self):
+        self.assertEqual(resolve_location('Hinjewadi Phase 1, Poona, MH').key, 'pune')
+        self.assertEqual(resolve_location('Remote (Navi Mumbai)').key, 'navi mumbai')
+        self.assertIsNone(resolve_location('Atlantis'))
+
+    def test_grid_lookup_matches_a_full_scan(self):
+        gazetteer = get_gazetteer()
+        origin = gazetteer.places['pune']
+        for radius in (0, 25, 150, 600):
+            expected = sorted(
+                place.key for place in gazetteer.places.values()
+                if haversine_km(origin.latitude, origin.longitude, place.latitude, place.longitude) <= radius
+            )
+            found = gazetteer.within(origin.latitude, origin.longitude, radius)
+            self.assertEqual(sorted(place.key for place, _ in found), expected)
+            self.assertEqual([km for _, km in found], sorted(km for _, km in found))
+
+    def test_job_list_filters_by_distance(self):
+        mumbai = make_job(location='Mumbai')
+        thane = make_job(location='Thane West, Thane')
+        pune = make_job(location='Pune')
+        make_job(location='Somewhere else')
+        self.assertEqual(thane.location_key, 'thane')
+
+        def listed(**params):
+            response = self.client.get(reverse('job_list'), params)
+            return {job.id for job in response.context['jobs']}, response
+
+        self.assertEqual(listed(near='Bombay')[0], {mumbai.id, thane.id})
+        self.assertEqual(listed(near='Bombay', radius=200)[0], {mumbai.id, thane.id, pune.id})
+        # An unknown place is ignored, and the page says so
+        ids, response = listed(near='Atlantis')
+        self.assertEqual(len(ids), 4)
+        self.assertTrue(response.context['near_unknown'])
+
+    def test_radius_is_clamped(self):
+        self.assertEqual(parse_radius('-5'), 0)
+        self.assertEqual(parse_radius('5000'), 1000)
+        self.assertEqual(parse_radius('far'), 25)
+
+
+class SimilarJobsTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(SIMILAR_JOBS_INDEX_PATH=os.path.join(directory, 'similar.joblib'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.django = make_job(title='Django Developer', description='Django REST APIs with PostgreSQL')
+        self.flask = make_job(title='Flask Developer', description='REST APIs in Python with PostgreSQL')
+        self.designer = make_job(title='Graphic Designer', description='Figma mockups and branding')
+        self.brand = make_job(title='Brand Designer', description='Branding, logos and Figma')
+
+    def similar(self, job):
+        return list(SimilarJob.objects.filter(job=job).order_by('rank').values_list('similar_id', flat=True))
+
+    def stored(self):
+        return {
+            job_id: self.similar(job_id)
+            for job_id in Job.objects.values_list('id', flat=True)
+        }
+
+    def test_full_build_lists_nearest_jobs_first(self):
+        call_command('build_similar_jobs', top_k=2, stdout=io.StringIO())
+        self.assertEqual(self.similar(self.django), [self.flask.id])
+        self.assertEqual(self.similar(self.designer), [self.brand.id])
+        self.assertFalse(SimilarityRefresh.objects.exists())
+
+        response = self.client.get(reverse('job_detail', args=[self.django.id]))
+        self.assertEqual([entry.similar for entry in response.context['similar_jobs']], [self.flask])
+
+    def test_incremental_refresh_matches_a_full_build(self):
+        call_command('build_similar_jobs', top_k=2, stdout=io.StringIO())
+        self.flask.title = 'Figma Designer'
+        self.flask.description = 'Branding and Figma mockups'
+        self.flask.save()
+        self.designer.delete()
+        make_job(title='Django Engineer', description='Django and PostgreSQL services')
+        self.assertEqual(SimilarityRefresh.objects.count(), 3)
+
+        call_command('build_similar_jobs', incremental=True, stdout=io.StringIO())
+        incremental = self.stored()
+        self.assertFalse(SimilarityRefresh.objects.exists())
+        self.assertIn(self.flask.id, incremental[self.brand.id])
+
+        call_command('build_similar_jobs', top_k=2, stdout=io.StringIO())
+        self.assertEqual(incremental, self.stored())
+
+
+def exported(response):
+    return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+
+@override_settings(JOB_EXPORT_CURSOR_LAG=0)
+class JobExportTests(TestCase):
+    def test_cursor_reports_changes_and_deletes(self):
+        kept, removed = make_job(), make_job(title='Java Developer')
+        response = self.client.get(reverse('export_jobs_api'))
+        self.assertEqual([row['id'] for row in exported(response)], [kept.id, removed.id])
+        cursor = response['X-Export-Cursor']
+
+        kept.title = 'Senior Python Developer'
+        kept.save()
+        removed_id = removed.id
+        removed.delete()
+        response = self.client.get(reverse('export_jobs_api'), {'since': cursor})
+        self.assertEqual(
+            [(row['id'], row['deleted']) for row in exported(response)],
+            [(kept.id, False), (removed_id, True)],
+        )
+
+    @override_settings(JOB_EXPORT_CURSOR_LAG=600)
+    def test_changes_within_the_lag_wait_for_the_next_sync(self):
+        settled, recent = make_job(), make_job(title='Java Developer')
+        Job.objects.filter(id=settled.id).update(updated_at=timezone.now() - timedelta(minutes=15))
+        response = self.client.get(reverse('export_jobs_api'))
+        self.assertEqual([row['id'] for row in exported(response)], [settled.id])
+        cursor = response['X-Export-Cursor']
+
+        Job.objects.filter(id=recent.id).update(updated_at=timezone.now() - timedelta(minutes=11))
+        response = self.client.get(reverse('export_jobs_api'), {'since': cursor})
+        self.assertEqual([row['id'] for row in exported(response)], [recent.id])
+
+    def test_csv_export_applies_the_filters(self):
+        make_job(job_type='remote')
+        make_job(title='Java Developer')
+        response = self.client.get(reverse('export_jobs_api'), {'format': 'csv', 'q': 'java'})
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['title'] for row in rows], ['Java Developer'])
+
+    def test_malformed_cursor_is_rejected(self):
+        response = self.client.get(reverse('export_jobs_api'), {'since': '12'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_near_is_rejected_by_the_apis(self):
+        for name in ('export_jobs_api', 'salary_histogram_api'):
+            response = self.client.get(reverse(name), {'near': 'Atlantis'})
+            self.assertEqual(response.status_code, 400)
+
+
+class SavedJobCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('candidate', password='pass')
+
+    def test_ids_are_loaded_once_and_reloaded_after_changes(self):
+        job, other = make_job(), make_job(title='Java Developer')
+        SavedJob.objects.create(user=self.user, job=job)
+        self.assertEqual(saved_job_ids(self.user), {job.id})
+        with self.assertNumQueries(0):
+            self.assertEqual(saved_job_ids(self.user), {job.id})
+
+        SavedJob.objects.create(user=self.user, job=other)
+        self.assertEqual(saved_job_ids(self.user), {job.id, other.id})
+        # Deleting the job cascades to the saved row
+        other.delete()
+        self.assertEqual(saved_job_ids(self.user), {job.id})
+
+    def test_reload_racing_a_save_is_dropped_on_commit(self):
+        job = make_job()
+        with self.captureOnCommitCallbacks(execute=True):
+            SavedJob.objects.create(user=self.user, job=job)
+            # Another request caching the set before the commit
+            cache.set(f'jobs:saved:{self.user.pk}', frozenset())
+        self.assertEqual(saved_job_ids(self.user), {job.id})
+
+    def test_save_toggle_updates_the_list(self):
+        job = make_job()
+        self.client.force_login(self.user)
+        self.client.get(reverse('job_list'))
+        self.client.post(reverse('save_job', args=[job.id]))
+        self.assertEqual(self.client.get(reverse('job_list')).context['saved_ids'], {job.id})
+        self.client.post(reverse('save_job', args=[job.id]))
+        self.assertEqual(self.client.get(reverse('job_list')).context['saved_ids'], frozenset())
+
+    def test_anonymous_users_have_no_saved_jobs(self):
+        response = self.client.get(reverse('job_list'))
+        self.assertEqual(response.context['saved_ids'], frozenset())
+
+
+class ConditionalJobListTests(TestCase):
+    def test_etag_follows_the_jobs_version(self):
+        make_job()
+        etag = self.client.get(reverse('job_list'))['ETag']
+        response = self.client.get(reverse('job_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        make_job(title='Java Developer')
+        response = self.client.get(reverse('job_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified_runs_no_job_query(self):
+        make_job()
+        etag = self.client.get(reverse('job_list'))['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('job_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_covers_the_user_and_saved_jobs(self):
+        job = make_job()
+        user = User.objects.create_user('candidate', password='pass')
+        anonymous = self.client.get(reverse('job_list'))['ETag']
+        self.client.force_login(user)
+        response = self.client.get(reverse('job_list'), HTTP_IF_NONE_MATCH=anonymous)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+        etag = response['ETag']
+        self.client.post(reverse('save_job', args=[job.id]))
+        # The flash message from saving is shown rather than a 304
+        self.assertEqual(self.client.get(reverse('job_list'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        response = self.client.get(reverse('job_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ConditionalJobDetailTests(TestCase):
+    def test_detail_validates_against_the_job_version(self):
+        job = make_job()
+        response = self.client.get(reverse('job_detail', args=[job.id]))
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        response = self.client.get(reverse('job_detail', args=[job.id]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(reverse('job_detail', args=[job.id]), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        job.salary += 1000
+        job.save()
+        response = self.client.get(reverse('job_detail', args=[job.id]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ImportJobsTests(TestCase):
+    FIELDS = 'external_id,title,company,description,salary,location,job_type\n'
+
+    def run_import(self, text, fmt='csv', batch_size=10):
+        return JobImporter(batch_size=batch_size).run(read_rows(io.StringIO(text), fmt))
+
+    def test_rows_are_upserted_on_external_id(self):
+        stats = self.run_import(self.FIELDS + (
+            'a1,Python Developer,Acme,Django,500000,Pune,full-time\n'
+            'a2,Java Developer,Acme,Spring,600000,Mumbai,full-time\n'
+            'a3,Go Developer,Acme,Services,700000,Delhi,remote\n'
+        ))
+        self.assertEqual((stats.created, stats.updated), (3, 0))
+
+        stats = self.run_import(self.FIELDS + (
+            'a1,Python Developer,Acme,Django,500000,Pune,full-time\n'
+            'a2,Kotlin Developer,Acme,Spring,650000,Mumbai,full-time\n'
+            'a2,Scala Developer,Acme,Spring,650000,Mumbai,full-time\n'
+        ))
+        self.assertEqual((stats.created, stats.updated, stats.unchanged), (0, 1, 1))
+
+        job = Job.objects.get(external_id='a2')
+        self.assertEqual((job.title, job.salary, job.version, job.location_key), ('Scala Developer', 650000, 2, 'mumbai'))
+        self.assertEqual(list(search_jobs(Job.objects.all(), 'scala')), [job])
+        self.assertFalse(search_jobs(Job.objects.all(), 'java').exists())
+        self.assertEqual(
+            set(JobFacetCell.objects.values_list('salary_bucket', 'count')),
+            {(500000, 1), (600000, 1), (700000, 1)},
+        )
+
+    def test_invalid_rows_are_counted_and_skipped(self):
+        stats = self.run_import(
+            '{"external_id": "j1", "title": "Designer", "company": "Acme", "description": "UI",'
+            ' "salary": 400000, "location": "Pune", "job_type": "full-time"}\n'
+            '{"external_id": "j2", "title": "Designer", "salary": "lots"}\n'
+            'not json\n'
+            '\n'
+            '{"title": "No key"}\n',
+            fmt='jsonl',
+        )
+        self.assertEqual((stats.rows, stats.created, stats.invalid), (4, 1, 3))
+        self.assertEqual([error.line for error in stats.errors], [2, 3, 5])
+
+    def test_imports_assign_owners_and_drop_cached_pages(self):
+        employer = make_employer(company='Acme')
+        self.client.get(reverse('job_list'), {'job_type': 'remote'})
+        self.run_import(self.FIELDS + 'r1,Go Developer,ACME,Services,700000,Delhi,remote\n')
+        self.assertEqual(Job.objects.get(external_id='r1').employer.user, employer)
+        response = self.client.get(reverse('job_list'), {'job_type': 'remote'})
+        self.assertEqual([job.external_id for job in response.context['jobs']], ['r1'])
+
+    def test_command_reports_the_counts(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'feed.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.FIELDS + 'c1,Python Developer,Acme,Django,500000,Pune,full-time\nc2,,,,,,\n')
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_jobs', path, stdout=out, stderr=err)
+        self.assertIn('line 3', err.getvalue())
+        self.assertTrue(Job.objects.filter(external_id='c1').exists())
+
+
+class ApplicationExportTests(TestCase):
+    def setUp(self):
+        self.employer = make_employer()
+        self.client.force_login(self.employer)
+
+    def test_csv_neutralizes_formulas(self):
+        make_application(make_job(), name='=HYPERLINK("http://example.com")', cover_letter='@SUM(1)')
+        response = self.client.get(reverse('export_applications'))
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0]['name'], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(rows[0]['cover_letter'], "'@SUM(1)")
+
+    def test_parquet_is_streamed_a_row_group_at_a_time(self):
+        import pyarrow.parquet as pq
+
+        job = make_job()
+        for i in range(5):
+            make_application(job, name=f'=1+{i}')
+        make_application(make_job(company='Other'))
+        with mock.patch('jobs.export.EXPORT_CHUNK_SIZE', 2):
+            response = self.client.get(reverse('export_applications'), {'format': 'parquet'})
+            self.assertTrue(response.streaming)
+            chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 4)
+
+        parquet = pq.ParquetFile(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        self.assertEqual(parquet.read().column('name').to_pylist(), [f'=1+{i}' for i in range(5)])
+
+    def test_candidates_and_unknown_formats_are_refused(self):
+        response = self.client.get(reverse('export_applications'), {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+        self.client.force_login(User.objects.create_user('candidate', password='pass'))
+        response = self.client.get(reverse('export_applications'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_command_writes_parquet_files(self):
+        import pyarrow.parquet as pq
+
+        make_application(make_job(), status='interview')
+        make_application(make_job())
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'applications.parquet')
+        call_command('export_applications', path, format='parquet', status='interview', stdout=io.StringIO())
+        self.assertEqual(pq.read_table(path).column('status').to_pylist(), ['interview'])
+
+
+class TaskQueueTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.calls = []
+        cls.given_up = []
+
+        @queue.task('tests.record')
+        def record(payload, task_row):
+            cls.calls.append(payload)
+
+        @queue.task('tests.fail', max_attempts=2, on_give_up=lambda payload, task_row: cls.given_up.append(payload))
+        def fail(payload, task_row):
+            raise RuntimeError('boom')
+
+    def setUp(self):
+        self.calls.clear()
+        self.given_up.clear()
+
+    def test_claimed_task_runs_once(self):
+        queue.enqueue('tests.record', {'n': 1})
+        claimed = queue.claim('worker-1')
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(queue.claim('worker-2'), [])
+        self.assertTrue(queue.run(claimed[0]))
+        self.assertEqual(self.calls, [{'n': 1}])
+        self.assertEqual(BackgroundTask.objects.get().status, 'done')
+
+    def test_failed_task_is_retried_then_failed(self):
+        task_row = queue.enqueue('tests.fail')
+        self.assertFalse(queue.run(queue.claim('worker')[0]))
+        task_row.refresh_from_db()
+        self.assertEqual((task_row.status, task_row.attempts), ('pending', 1))
+        self.assertGreater(task_row.run_after, timezone.now())
+
+        BackgroundTask.objects.update(run_after=timezone.now())
+        queue.run(queue.claim('worker')[0])
+        task_row.refresh_from_db()
+        self.assertEqual(task_row.status, 'failed')
+        self.assertIn('RuntimeError: boom', task_row.last_error)
+
+    @override_settings(TASK_LOCK_TIMEOUT=60)
+    def test_stale_task_is_reclaimed_while_attempts_remain(self):
+        task_row = queue.enqueue('tests.record')
+        BackgroundTask.objects.update(
+            status='running', attempts=1, locked_by='dead', locked_at=timezone.now() - timedelta(minutes=5),
+        )
+        claimed = queue.claim('worker')
+        self.assertEqual([row.id for row in claimed], [task_row.id])
+        self.assertEqual((claimed[0].attempts, claimed[0].locked_by), (2, 'worker'))
+
+    @override_settings(TASK_LOCK_TIMEOUT=60)
+    def test_stale_task_fails_once_attempts_are_used_up(self):
+        task_row = queue.enqueue('tests.fail', {'n': 2})
+        BackgroundTask.objects.update(
+            status='running', attempts=2, locked_by='dead', locked_at=timezone.now() - timedelta(minutes=5),
+            last_error='MemoryError',
+        )
+        self.assertEqual(queue.claim('worker'), [])
+        task_row.refresh_from_db()
+        self.assertEqual(task_row.status, 'failed')
+        self.assertTrue(task_row.last_error.startswith(queue.LOCK_EXPIRED_ERROR))
+        self.assertTrue(task_row.last_error.endswith('MemoryError'))
+        self.assertEqual(self.given_up, [{'n': 2}])
+
+
+    @override_settings(TASK_LOCK_TIMEOUT=60)
+    def test_heartbeat_keeps_a_long_task_from_being_reclaimed(self):
+        queue.enqueue('tests.record')
+        task_row = queue.claim('worker-1')[0]
+        BackgroundTask.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.assertTrue(queue.Heartbeat(task_row).beat())
+        self.assertEqual(queue.claim('worker-2'), [])
+
+        # A reclaimed task belongs to the new claim, even for the same worker name
+        BackgroundTask.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        reclaimed = queue.claim('worker-1')[0]
+        self.assertFalse(queue.Heartbeat(task_row).beat())
+        self.assertTrue(queue.run(task_row))
+        self.assertEqual(BackgroundTask.objects.get().status, 'running')
+        self.assertTrue(queue.run(reclaimed))
+        self.assertEqual(BackgroundTask.objects.get().status, 'done')
+
+    def test_heartbeat_thread_refreshes_the_lock_while_the_task_runs(self):
+        queue.enqueue('tests.record')
+        task_row = queue.claim('worker')[0]
+        beats = []
+        with mock.patch.object(queue.Heartbeat, 'beat', lambda heartbeat: beats.append(1) or len(beats) < 3):
+            with queue.Heartbeat(task_row, interval=0.001) as heartbeat:
+                heartbeat._thread.join(timeout=5)
+        self.assertEqual(len(beats), 3)
+
+
+class StoredResumeTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, STORED_BLOB_GRACE_PERIOD=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.job = make_job()
+
+    def apply(self, content, name='cv.txt'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_application(self.job, resume=ContentFile(content, name=name))
+
+    def test_identical_resumes_share_one_file(self):
+        first = self.apply(b'Python and SQL')
+        second = self.apply(b'Python and SQL', name='other.TXT')
+        self.assertEqual(first.resume.name, second.resume.name)
+        self.assertEqual(StoredBlob.objects.get().refcount, 2)
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'resumes'))), 1)
+
+    def test_file_deleted_with_its_last_reference(self):
+        first = self.apply(b'Python and SQL')
+        second = self.apply(b'Python and SQL')
+        path = resume_storage.path(first.resume.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_recent_upload_kept_through_grace_period(self):
+        application = self.apply(b'Python and SQL')
+        path = resume_storage.path(application.resume.name)
+        with self.settings(STORED_BLOB_GRACE_PERIOD=600):
+            with self.captureOnCommitCallbacks(execute=True):
+                application.delete()
+            self.assertEqual(collect_unreferenced(), 0)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(StoredBlob.objects.get().refcount, 0)
+
+        # Swept once the grace period is over
+        self.assertEqual(collect_unreferenced(), len(b'Python and SQL'))
+        self.assertFalse(os.path.exists(path))
+
+    def test_upload_whose_row_was_never_saved_is_swept(self):
+        name = resume_storage.save('resumes/cv.txt', ContentFile(b'orphan'))
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 0)
+        collect_unreferenced()
+        self.assertFalse(resume_storage.exists(name))
+
+
+    def test_dedupe_moves_legacy_files_under_their_hash(self):
+        os.makedirs(os.path.join(self.media_root, 'resumes'))
+        for name in ('resumes/a.pdf', 'resumes/b.PDF'):
+            with open(os.path.join(self.media_root, name), 'wb') as f:
+                f.write(b'%PDF same resume')
+        first = make_application(self.job, resume='resumes/a.pdf')
+        second = make_application(self.job, resume='resumes/b.PDF')
+
+        call_command('dedupe_resumes', stdout=io.StringIO(), stderr=io.StringIO())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.resume.name, second.resume.name)
+        self.assertTrue(first.resume.name.endswith('.pdf'))
+        self.assertEqual(StoredBlob.objects.get().refcount, 2)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'resumes')), [os.path.basename(first.resume.name)])
+
+
+class BulkStatusTests(TestCase):
+    def setUp(self):
+        self.employer = make_employer()
+        self.job = make_job()
+        self.other_job = make_job(company='Globex')
+        self.client.force_login(self.employer)
+
+    def post(self, status, ids):
+        return self.client.post(reverse('bulk_update_application_status'), {
+            'status': status, 'application_ids': [str(i) for i in ids],
+        })
+
+    def test_only_owned_applications_are_updated(self):
+        mine = [make_application(self.job) for _ in range(2)]
+        mine.append(make_application(self.job, status='screening'))
+        theirs = make_application(self.other_job)
+        make_application(self.job, status='screening')
+
+        response = self.post('screening', [a.id for a in mine] + [theirs.id, 10 ** 6])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['updated'], data['unchanged'], data['forbidden']), (2, 1, 2))
+        self.assertEqual(data['status_counts']['screening'], 4)
+        self.assertEqual(data['status_counts']['applied'], 0)
+        theirs.refresh_from_db()
+        self.assertEqual(theirs.status, 'applied')
+
+    def test_invalid_requests_are_rejected(self):
+        application = make_application(self.job)
+        self.assertEqual(self.post('promoted', [application.id]).status_code, 400)
+        self.assertEqual(self.post('screening', ['x']).status_code, 400)
+        self.assertEqual(self.post('screening', []).status_code, 400)
+        response = self.client.get(reverse('bulk_update_application_status'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_candidates_and_employers_without_a_company_are_refused(self):
+        application = make_application(self.job)
+        for user in (User.objects.create_user('candidate', password='pass'), make_employer('nameless', company='')):
+            self.client.force_login(user)
+            self.assertEqual(self.post('screening', [application.id]).status_code, 403)
+        application.refresh_from_db()
+        self.assertEqual(application.status, 'applied')
+
+
+class FunnelCountTests(TestCase):
+    def setUp(self):
+        self.employer = make_employer()
+        self.job = make_job()
+
+    def funnel(self):
+        return funnel_counts([self.job.id]).get(self.job.id, {})
+
+    def test_counts_follow_saves_bulk_moves_and_deletes(self):
+        first, second, third = (make_application(self.job) for _ in range(3))
+        self.assertEqual(self.funnel(), {'applied': 3})
+
+        first.status = 'interview'
+        first.save()
+        self.assertEqual(set_status(Application.objects.filter(id__in=[first.id, second.id]), 'interview'), 1)
+        self.assertEqual(self.funnel(), {'applied': 1, 'interview': 2})
+
+        third.delete()
+        self.assertEqual(self.funnel(), {'interview': 2})
+        self.assertEqual(status_totals(Job.objects.filter(employer__user=self.employer)), {'interview': 2})
+
+    def test_reconcile_repairs_drift(self):
+        application = make_application(self.job)
+        make_application(self.job)
+        # Queryset updates bypass the counters
+        Application.objects.filter(id=application.id).update(status='hired')
+
+        out = io.StringIO()
+        call_command('reconcile_funnel_counts', dry_run=True, stdout=out)
+        self.assertIn('2 funnel counts differ', out.getvalue())
+        self.assertEqual(self.funnel(), {'applied': 2})
+
+        call_command('reconcile_funnel_counts', stdout=io.StringIO())
+        self.assertEqual(self.funnel(), {'applied': 1, 'hired': 1})
+
+    def test_dashboard_pages_jobs_with_their_funnels(self):
+        make_application(self.job, status='offer')
+        for i in range(25):
+            make_job(title=f'Job {i}')
+        self.client.force_login(self.employer)
+
+        response = self.client.get(reverse('dashboard'))
+        jobs = response.context['jobs']
+        self.assertEqual(len(jobs), 20)
+        self.assertIn('jobs_cursor=', jobs.next_url)
+        response = self.client.get(reverse('dashboard') + jobs.next_url)
+        last = list(response.context['jobs'])
+        self.assertEqual(last[-1], self.job)
+        self.assertEqual((last[-1].applicant_count, last[-1].funnel), (1, [('Offer', 1)]))
+
+
+class QuestionBankTests(TestCase):
+    def setUp(self):
+        create_sample_questions()
+
+    def test_index_is_reused_until_a_question_changes(self):
+        index = question_bank.index()
+        with self.assertNumQueries(0):
+            self.assertIs(question_bank.index(), index)
+
+        question = InterviewQuestion.objects.get(skill='python', difficulty='medium')
+        question.question_text = 'What is a generator?'
+        question.save()
+        with self.assertNumQueries(1):
+            rebuilt = question_bank.index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(rebuilt.get(question.id).question_text, 'What is a generator?')
+
+        question.delete()
+        self.assertIsNone(question_bank.index().get(question.id))
+
+    def test_pools_by_skill_and_difficulty(self):
+        index = question_bank.index()
+        python = index.pool_keys(skills={'python'})
+        self.assertEqual(sorted(python), [('python', 'easy'), ('python', 'medium')])
+        self.assertEqual(index.pool_keys(skills={'python'}, difficulty='easy'), [('python', 'easy')])
+
+        asked = set(index.pools[('python', 'easy')])
+        self.assertEqual(index.remaining(python), 2)
+        self.assertEqual(index.remaining(python, asked), 1)
+        self.assertEqual(index.sample(python, exclude=asked).id, index.pools[('python', 'medium')][0])
+        self.assertIsNone(index.sample(python, exclude=index.all_ids))
+
+    def test_get_returns_a_copy(self):
+        index = BankIndex(list(InterviewQuestion.objects.all()))
+        question_id = min(index.all_ids)
+        index.get(question_id).question_text = 'changed'
+        self.assertNotEqual(index.get(question_id).question_text, 'changed')
+
+
+class SamplingTests(TestCase):
+    def test_seeded_draws_are_reproducible(self):
+        pools = [tuple(range(10)), tuple(range(100, 105))]
+        first = [draw(pools, random.Random(7)) for _ in range(5)]
+        self.assertEqual([draw(pools, random.Random(7)) for _ in range(5)], first)
+        # draw leaves its arguments alone
+        self.assertEqual(pools, [tuple(range(10)), tuple(range(100, 105))])
+
+    def test_unweighted_draws_are_uniform_over_the_union(self):
+        rng = random.Random(1)
+        pools = [(1, 2, 3), (4,)]
+        counts = {}
+        for _ in range(4000):
+            item = draw(pools, rng)
+            counts[item] = counts.get(item, 0) + 1
+        self.assertEqual(sorted(counts), [1, 2, 3, 4])
+        for count in counts.values():
+            self.assertAlmostEqual(count / 4000, 0.25, delta=0.04)
+
+    def test_weights_and_exclusions(self):
+        rng = random.Random(3)
+        pools = [(1, 2), (3, 4)]
+        self.assertEqual({draw(pools, rng, weights=[0, 1]) for _ in range(50)}, {3, 4})
+        self.assertEqual({draw(pools, rng, exclude={1, 2, 3}) for _ in range(50)}, {4})
+        self.assertIsNone(draw(pools, rng, exclude={1, 2, 3, 4}))
+        self.assertIsNone(draw([], rng))
+        self.assertIsNone(draw(pools, rng, weights=[0, 0]))
+
+    def test_mostly_excluded_pool_falls_back_to_the_remaining_ids(self):
+        pool = tuple(range(1000))
+        self.assertEqual(draw([pool], random.Random(5), exclude=frozenset(range(999))), 999)
+
+
+class SessionStateTests(TestCase):
+    def test_record_keeps_running_totals(self):
+        state = SessionState(current=1)
+        self.assertEqual((state.band, state.difficulties, state.average), ('start', ('medium',), None))
+
+        state.record(1, 'python', 5)
+        state.record(2, 'python', 4)
+        state.record(3, 'sql', 2)
+        self.assertEqual(state.asked, [1, 2, 3])
+        self.assertIsNone(state.current)
+        self.assertEqual(state.answered, 3)
+        self.assertEqual(state.score_sum, 11)
+        self.assertEqual(state.skill_averages(), {'python': 4.5, 'sql': 2})
+        self.assertEqual(state.band, 'mid')
+
+    def test_rescoring_a_question_replaces_its_score(self):
+        state = SessionState()
+        state.record(1, 'python', 1)
+        state.record(2, 'python', 2)
+        self.assertEqual((state.band, state.difficulties), ('low', ('easy', 'medium')))
+
+        state.record(1, 'python', 5)
+        self.assertEqual(state.asked, [1, 2])
+        self.assertEqual(state.skills, {'python': [7, 2]})
+        state.record(2, 'python', 4)
+        self.assertEqual((state.band, state.difficulties), ('high', ('hard', 'medium')))
+
+    def test_json_round_trip(self):
+        state = SessionState.from_responses([(1, 'python', 2), (2, 'git', 4)])
+        state.current = 3
+        data = json.loads(json.dumps(state.to_json()))
+        restored = SessionState.from_json(data)
+        self.assertEqual(restored.to_json(), state.to_json())
+
+        # A restored state still replaces scores rather than adding them
+        restored.record(1, 'python', 4)
+        self.assertEqual((restored.answered, restored.score_sum), (2, 8))
+
+
+class AnswerScoringTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(ANSWER_SCORER_PATH=os.path.join(directory, 'scorer.joblib'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        create_sample_questions()
+        self.question = InterviewQuestion.objects.get(skill='python', difficulty='medium')
+
+    def test_scores_follow_the_expected_answer(self):
+        scorer = scoring.AnswerScorer(list(InterviewQuestion.objects.all()))
+        scores = [
+            scorer.score(self.question, answer)[0]
+            for answer in (
+                self.question.expected_answer,
+                'A list can be modified but a tuple cannot.',
+                'I like turtles.',
+            )
+        ]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual((scores[0], scores[-1]), (5, 1))
+
+    def test_keyword_scoring_until_a_scorer_is_fitted(self):
+        saved = scoring.SavedScorer()
+        self.assertIsNone(saved.get())
+        self.assertEqual(
+            saved.score(self.question, 'I like turtles.'),
+            scoring.keyword_score(self.question, 'I like turtles.'),
+        )
+
+    def test_saved_scorer_is_reloaded_when_refitted(self):
+        saved = scoring.SavedScorer()
+        first = scoring.fit()
+        loaded = saved.get()
+        self.assertEqual(loaded.version, first.version)
+        self.assertIs(saved.get(), loaded)
+        self.assertEqual(scoring.fit_if_stale().version, first.version)
+
+        self.question.expected_answer = 'Tuples are immutable.'
+        self.question.save()
+        # The previous scorer keeps scoring the changed question meanwhile
+        self.assertEqual(saved.score(self.question, 'Tuples are immutable.')[0], 5)
+        refitted = scoring.fit_if_stale()
+        self.assertNotEqual(refitted.version, first.version)
+        os.utime(scoring.scorer_path(), ns=(0, os.stat(scoring.scorer_path()).st_mtime_ns + 10 ** 9))
+        self.assertEqual(saved.get().version, refitted.version)
+
+    def test_question_saves_queue_one_fit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for question in InterviewQuestion.objects.all()[:3]:
+                question.save()
+        self.assertEqual(BackgroundTask.objects.filter(name='interviews.fit_answer_scorer').count(), 1)
+
+
+class RescoreResponsesTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(ANSWER_SCORER_PATH=os.path.join(directory, 'scorer.joblib'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.checkpoint = os.path.join(directory, 'rescore.checkpoint')
+
+        create_sample_questions()
+        candidate = User.objects.create_user('candidate', password='pass')
+        self.session = InterviewSession.objects.create(
+            candidate=candidate, job_application=make_application(make_job(), applicant=candidate),
+        )
+        questions = InterviewQuestion.objects.filter(skill='python').order_by('id')
+        self.responses = [
+            InterviewResponse.objects.create(
+                interview_session=self.session, question=question,
+                candidate_answer=question.expected_answer, score=1, feedback='',
+            )
+            for question in questions
+        ]
+
+    def rescore(self, *args):
+        call_command('rescore_responses', '--workers=1', '--chunk-size=1',
+                     f'--checkpoint={self.checkpoint}', *args, stdout=io.StringIO())
+
+    def test_rescores_responses_and_refreshes_sessions(self):
+        self.rescore()
+        self.assertEqual(
+            list(InterviewResponse.objects.order_by('id').values_list('score', flat=True)), [5, 5],
+        )
+        self.session.refresh_from_db()
+        self.assertEqual(load_state(self.session).skill_averages(), {'python': 5})
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_answers_changed_during_the_run_keep_their_score(self):
+        changed = self.responses[0]
+
+        def answer_again(rows):
+            # submit_answer stores a new answer while the chunk is scored
+            if rows[0][0] == changed.id:
+                InterviewResponse.objects.filter(id=changed.id).update(candidate_answer='I like turtles.', score=2)
+            return scoring.score_rows(rows)
+
+        with mock.patch('jobs.management.commands.rescore_responses.score_rows', side_effect=answer_again):
+            self.rescore()
+        changed.refresh_from_db()
+        self.assertEqual(changed.score, 2)
+        self.responses[1].refresh_from_db()
+        self.assertEqual(self.responses[1].score, 5)
+
+    def test_resumes_only_under_the_same_scorer(self):
+        scorer = scoring.fit()
+        checkpoint = {'last_id': self.responses[0].id, 'scanned': 1, 'changed': 0, 'sessions': 0}
+        with open(self.checkpoint, 'w') as f:
+            json.dump(dict(checkpoint, scorer=scorer.version), f)
+        self.rescore()
+        # The response before the checkpoint was skipped
+        self.assertEqual(
+            list(InterviewResponse.objects.order_by('id').values_list('score', flat=True)), [1, 5],
+        )
+
+        with open(self.checkpoint, 'w') as f:
+            json.dump(dict(checkpoint, scorer=f'{scorer.version}-old'), f)
+        with self.assertRaises(CommandError):
+            self.rescore()
+        self.rescore('--restart')
+        self.assertEqual(
+            list(InterviewResponse.objects.order_by('id').values_list('score', flat=True)), [5, 5],
+        )
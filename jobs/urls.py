@@ -1,7 +1,8 @@
 from django.urls import path
 from .views import (job_list, job_detail, create_job, apply_job, save_job, dashboard,
                    start_interview, interview_session, submit_answer, interview_results,
-                   update_application_status)
+                   update_application_status, salary_histogram_api, autocomplete_api,
+                   export_jobs_api, export_applications, bulk_update_application_status)
 
 urlpatterns = [
     path("", job_list, name="job_list"),
@@ -9,6 +10,9 @@ urlpatterns = [
     path("job/<int:job_id>/apply/", apply_job, name="apply_job"),
     path("job/<int:job_id>/save/", save_job, name="save_job"),
     path("create/", create_job, name="create_job"),
+    path("api/jobs/salary-histogram/", salary_histogram_api, name="salary_histogram_api"),
+    path("api/jobs/autocomplete/", autocomplete_api, name="autocomplete_api"),
+    path("api/jobs/export/", export_jobs_api, name="export_jobs_api"),
     path('dashboard/', dashboard, name='dashboard'),
     # Interview URLs
     path('interview/start/<int:application_id>/', start_interview, name='start_interview'),
@@ -17,4 +21,7 @@ urlpatterns = [
     path('interview/results/<int:session_id>/', interview_results, name='interview_results'),
     # Application management
     path('application/<int:application_id>/update-status/', update_application_status, name='update_application_status'),
+    path('applications/update-status/', bulk_update_application_status,
+         name='bulk_update_application_status'),
+    path('applications/export/', export_applications, name='export_applications'),
 ]
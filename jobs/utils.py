@@ -1,7 +1,9 @@
 import random
-from django.db import models
-from django.db.models import Count
-from .models import InterviewQuestion, InterviewSession, InterviewResponse
+from django.conf import settings
+from .models import InterviewQuestion
+from .interview_state import load_state
+from .question_bank import question_bank
+from .tasks import schedule_answer_scorer_fit
 
 class InterviewEngine:
     """
@@ -11,8 +13,11 @@ class InterviewEngine:
     3. Previous responses
     """
 
-    def __init__(self, session):
+    def __init__(self, session, seed=None, state=None):
         self.session = session
+        self.state = state if state is not None else load_state(session)
+        # Fixed seed for replaying question picks (e.g. in tests)
+        self.seed = seed if seed is not None else getattr(settings, 'INTERVIEW_RANDOM_SEED', None)
         self.candidate = session.candidate
         self.job = session.job_application.job
 
@@ -28,34 +33,40 @@ class InterviewEngine:
         # Extract skills from job description
         job_skills = self._extract_job_skills()
 
-        # Get questions already asked
-        asked_questions = self.session.questions_asked.all()
-        asked_skills = asked_questions.values_list('skill', flat=True)
+        # Questions already asked, from the session state
+        asked_ids = self.state.asked_ids
+
+        # The rest is sampling from the in-memory question bank
+        bank = question_bank.index()
+        rng = self._rng(self.state.answered)
 
         # Priority 1: Skills mentioned in job description that candidate has
         priority_skills = set(job_skills) & set(candidate_skills)
         if priority_skills:
-            available_questions = InterviewQuestion.objects.filter(
-                skill__in=priority_skills
-            ).exclude(id__in=asked_questions.values_list('id', flat=True))
+            pools = bank.pool_keys(skills=priority_skills)
         else:
             # Priority 2: Job skills (even if candidate doesn't have them)
-            available_questions = InterviewQuestion.objects.filter(
-                skill__in=job_skills
-            ).exclude(id__in=asked_questions.values_list('id', flat=True))
+            pools = bank.pool_keys(skills=set(job_skills))
 
-        if not available_questions.exists():
+        if not bank.remaining(pools, asked_ids):
             # Priority 3: General questions not asked yet
-            available_questions = InterviewQuestion.objects.exclude(
-                id__in=asked_questions.values_list('id', flat=True)
-            )
+            pools = bank.pool_keys()
 
-        if available_questions.exists():
+        if bank.remaining(pools, asked_ids):
             # Select question with appropriate difficulty
-            return self._select_by_difficulty(available_questions)
+            return self._select_by_difficulty(bank, pools, asked_ids, rng)
         else:
             # If all questions asked, return random question (allow repeats in advanced mode)
-            return InterviewQuestion.objects.order_by('?').first()
+            return bank.sample(bank.pool_keys(), rng)
+
+    def _rng(self, answered_count):
+        """
+        Random source for the next pick: seeded by question number when a
+        seed is set, so the same answers replay the same session
+        """
+        if self.seed is None:
+            return random
+        return random.Random(f'{self.seed}:{answered_count}')
 
     def _extract_job_skills(self):
         """
@@ -78,65 +89,31 @@ class InterviewEngine:
 
         return found_skills or ['problem_solving', 'communication']  # Default skills
 
-    def _select_by_difficulty(self, questions):
+    def _select_by_difficulty(self, bank, pools, asked_ids, rng):
         """
-        Select question based on candidate's performance so far
+        Select question based on candidate's performance so far: medium
+        to start, harder while scoring well, easier while struggling
         """
-        responses = InterviewResponse.objects.filter(interview_session=self.session)
-
-        if not responses.exists():
-            # First question - start with medium difficulty
-            return questions.filter(difficulty='medium').order_by('?').first() or questions.order_by('?').first()
-
-        avg_score = responses.aggregate(avg=models.Avg('score')).get('avg') or 3
-
-        if avg_score >= 4:
-            # Doing well - increase difficulty
-            return (questions.filter(difficulty='hard').order_by('?').first() or
-                   questions.filter(difficulty='medium').order_by('?').first() or
-                   questions.order_by('?').first())
-        elif avg_score <= 2:
-            # Struggling - decrease difficulty
-            return (questions.filter(difficulty='easy').order_by('?').first() or
-                   questions.filter(difficulty='medium').order_by('?').first() or
-                   questions.order_by('?').first())
-        else:
-            # Medium performance - keep medium difficulty
-            return questions.filter(difficulty='medium').order_by('?').first() or questions.order_by('?').first()
+        for difficulty in self.state.difficulties:
+            matching = [key for key in pools if key[1] == difficulty]
+            if bank.remaining(matching, asked_ids):
+                return bank.sample(matching, rng, asked_ids)
+        return bank.sample(pools, rng, asked_ids)
 
     def calculate_final_score(self):
         """
         Calculate overall interview score
         """
-        responses = InterviewResponse.objects.filter(interview_session=self.session)
-        if not responses.exists():
+        if not self.state.answered:
             return 0
-
-        total_score = sum(response.score for response in responses)
-        max_possible = len(responses) * 5  # Assuming 5-point scale
-        return (total_score / max_possible) * 100 if max_possible > 0 else 0
+        max_possible = self.state.answered * 5  # Assuming 5-point scale
+        return (self.state.score_sum / max_possible) * 100
 
     def get_skill_breakdown(self):
         """
         Get performance breakdown by skill
         """
-        responses = InterviewResponse.objects.filter(
-            interview_session=self.session
-        ).select_related('question')
-
-        skill_scores = {}
-        for response in responses:
-            skill = response.question.skill
-            if skill not in skill_scores:
-                skill_scores[skill] = []
-            skill_scores[skill].append(response.score)
-
-        # Calculate average for each skill
-        breakdown = {}
-        for skill, scores in skill_scores.items():
-            breakdown[skill] = sum(scores) / len(scores) if scores else 0
-
-        return breakdown
+        return self.state.skill_averages()
 
 
 def create_sample_questions():
@@ -188,8 +165,14 @@ def create_sample_questions():
         },
     ]
 
-    for q_data in questions_data:
-        InterviewQuestion.objects.get_or_create(
-            question_text=q_data['question_text'],
-            defaults=q_data
-        )
\ No newline at end of file
+    # One query for the questions already there instead of a get_or_create each
+    existing = set(InterviewQuestion.objects.filter(
+        question_text__in=[q_data['question_text'] for q_data in questions_data]
+    ).values_list('question_text', flat=True))
+    missing = [q_data for q_data in questions_data if q_data['question_text'] not in existing]
+    if not missing:
+        return
+    InterviewQuestion.objects.bulk_create([InterviewQuestion(**q_data) for q_data in missing])
+    # bulk_create sends no post_save, so do what the signal receivers would
+    question_bank.invalidate()
+    schedule_answer_scorer_fit()
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+Version counters for data that each process keeps derived copies of.
+
+Web workers keep job_list result pages (jobs.result_cache), the
+autocomplete index (jobs.autocomplete) and the interview question bank
+(jobs.question_bank) in memory. A save handled by one
+worker, or a bulk write that sends no signals, has to reach the copies in
+every other worker.
+So each kind of data has a counter in the 'versions' cache, which all
+processes share (see CACHES). Writers bump the counter, and a process drops
+or rebuilds a copy it made under an older version on its next read.
+
+A counter starts from the clock rather than 0, so a counter lost with the
+cache never repeats a value handed out before.
+"""
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+
+CACHE_ALIAS = 'versions'
+
+# Job rows as listed by job_list (facet counts, ETags)
+JOBS = 'jobs'
+# Cached job_list result pages. Saves bump the per-facet counters below
+# this prefix (see jobs.result_cache); this one drops every page
+JOB_LIST = 'job_list'
+# Job values behind the autocomplete index; saves update the index of the
+# saving process directly, so only bulk writes bump this
+AUTOCOMPLETE = 'autocomplete'
+# Interview questions (the question bank and the fitted answer scorer)
+QUESTION_BANK = 'question_bank'
+
+
+def _key(name):
+    return f'jobs:{name}:version'
+
+
+def current(name):
+    return caches[CACHE_ALIAS].get_or_set(_key(name), time.time_ns, None)
+
+
+def current_many(names):
+    """Current values of several counters, in order, in one cache call"""
+    cache = caches[CACHE_ALIAS]
+    found = cache.get_many([_key(name) for name in names])
+    return tuple(
+        found[_key(name)] if _key(name) in found else current(name)
+        for name in names
+    )
+
+
+def _incr(name):
+    cache = caches[CACHE_ALIAS]
+    try:
+        cache.incr(_key(name))
+    except ValueError:
+        cache.set(_key(name), time.time_ns(), None)
+
+
+def bump(name):
+    """Move a counter on now, and again when the current transaction commits"""
+    _incr(name)
+    # A process may have rebuilt its copy from before this transaction committed
+    transaction.on_commit(lambda: _incr(name))
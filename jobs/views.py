@@ -1,30 +1,60 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from employer.ownership import employer_for
 from .forms import JobForm, ApplicationForm
-from .models import Job, Application, SavedJob, InterviewSession, InterviewQuestion, InterviewResponse
-
-# List all jobs with search filters
-def job_list(request):
+from .models import Job, Application, SavedJob, SimilarJob, InterviewSession, InterviewQuestion, InterviewResponse
+from .autocomplete import AUTOCOMPLETE_FIELDS, job_autocomplete
+from .geo import location_q, nearby_keys, parse_radius
+from .conditional import conditional_response, make_etag, set_validators, user_state
+from .interview_state import SessionState, load_state, update_state
+from .export import (APPLICATION_EXPORT_FORMATS, EXPORT_CONTENT_TYPES, ParquetUnavailable,
+                     encode_cursor, export_cursor, export_rows, parse_since,
+                     stream_application_csv, stream_application_parquet, stream_export)
+from .funnel import attach_funnels, set_status, status_totals
+from .facets import SALARY_BUCKET_SIZE, add_facet_urls, facet_counts, salary_histogram
+from .pagination import add_page_urls, paginate
+from .query_budget import query_budget
+from .result_cache import JobListQuery, job_list_cache
+from .saved import saved_job_ids
+from .queue import enqueue_on_commit
+from .question_bank import question_bank
+from .scoring import answer_scorer
+from .search import search_jobs
+from .tasks import extract_resume_text
+from . import versions
+
+JOBS_PER_PAGE = 20
+RADIUS_CHOICES_KM = (10, 25, 50, 100, 250)
+APPLICATIONS_PER_PAGE = 25
+BULK_STATUS_MAX_APPLICATIONS = 1000
+
+# Keyset orderings offered on the job list; the trailing id keeps them unique
+JOB_SORT_ORDERINGS = {
+    'newest': ('-id',),
+    'salary': ('salary', 'id'),
+    '-salary': ('-salary', '-id'),
+}
+
+def _filter_jobs(query, location, near_keys, job_type, min_salary, max_salary, sort):
+    """Return the filtered Job queryset and its keyset ordering"""
     jobs = Job.objects.all()
-    
-    # Search filters
-    query = request.GET.get('q')
-    location = request.GET.get('location')
-    job_type = request.GET.get('job_type')
-    min_salary = request.GET.get('min_salary')
-    
+
     if query:
-        jobs = jobs.filter(
-            Q(title__icontains=query) | 
-            Q(company__icontains=query) | 
-            Q(description__icontains=query)
-        )
+        # Answered by the configured search backend, ranked by relevance
+        jobs = search_jobs(jobs, query)
     
     if location:
-        jobs = jobs.filter(location__icontains=location)
+        jobs = jobs.filter(location_q(location))
+
+    if near_keys is not None:
+        # Gazetteer places within the radius, matched through the indexed key
+        jobs = jobs.filter(location_key__in=near_keys)
     
     if job_type:
         jobs = jobs.filter(job_type=job_type)
@@ -34,28 +64,182 @@ def job_list(request):
             jobs = jobs.filter(salary__gte=int(min_salary))
         except ValueError:
             pass
+
+    if max_salary:
+        try:
+            jobs = jobs.filter(salary__lte=int(max_salary))
+        except ValueError:
+            pass
+
+    if sort in JOB_SORT_ORDERINGS:
+        ordering = JOB_SORT_ORDERINGS[sort]
+    elif query and 'relevance' in jobs.query.annotations:
+        ordering = ('-relevance', '-id')
+    else:
+        ordering = JOB_SORT_ORDERINGS['newest']
+    return jobs, ordering
+
+# List all jobs with search filters
+@query_budget(12)
+def job_list(request):
+    # Every page carries facet counts over the whole table, so the page is
+    # validated against the shared jobs version, which any Job save or delete
+    # moves on (no Last-Modified: deletes leave no timestamp behind)
+    version = versions.current(versions.JOBS)
+    etag = make_etag(
+        'job_list', getattr(settings, 'JOB_SEARCH_BACKEND', 'index'), version,
+        sorted(request.GET.lists()), user_state(request),
+    )
+    response = conditional_response(request, etag=etag)
+    if response is not None:
+        return response
+
+    # Search filters
+    query = request.GET.get('q')
+    location = request.GET.get('location')
+    job_type = request.GET.get('job_type')
+    min_salary = request.GET.get('min_salary')
+    max_salary = request.GET.get('max_salary')
+    sort = request.GET.get('sort')
+    near = request.GET.get('near')
+    radius = parse_radius(request.GET.get('radius'))
+    near_keys = nearby_keys(near, radius) if near else None
+
+    # Repeated filter combinations are served from the result cache; the
+    # stamp is read before any job query
+    listing = JobListQuery(request.GET, JOB_SORT_ORDERINGS)
+    stamp = job_list_cache.stamp(listing)
+    cached = job_list_cache.get(listing, stamp)
+    if cached is not None:
+        page = add_page_urls(request, cached.to_page(Job))
+    else:
+        page = paginate(
+            request,
+            *_filter_jobs(query, location, near_keys, job_type, min_salary, max_salary, sort),
+            per_page=JOBS_PER_PAGE,
+        )
+        job_list_cache.store(listing, page, stamp)
+
+    # Sidebar counts come from the precomputed facet cells
+    facets = add_facet_urls(
+        facet_counts(query, location, job_type, min_salary, max_salary, near_keys),
+        request.GET,
+        {'job_type': job_type, 'location': location, 'salary': min_salary},
+    )
     
     context = {
-        'jobs': jobs,
+        'jobs': page,
+        'page': page,
+        'facets': facets,
         'query': query,
         'location': location,
         'job_type': job_type,
         'min_salary': min_salary,
+        'max_salary': max_salary,
+        'sort': sort,
+        'near': near,
+        'radius': radius,
+        'radius_choices': RADIUS_CHOICES_KM,
+        'near_unknown': bool(near) and near_keys is None,
+        'saved_ids': saved_job_ids(request.user),
     }
-    return render(request, 'jobs/job_list.html', context)
+    return set_validators(render(request, 'jobs/job_list.html', context), etag)
+
+# Salary histogram for the current (non-salary) filters
+@api_view(['GET'])
+def salary_histogram_api(request):
+    query = request.GET.get('q')
+    location = request.GET.get('location')
+    job_type = request.GET.get('job_type')
+    near = request.GET.get('near')
+    near_keys = nearby_keys(near, parse_radius(request.GET.get('radius'))) if near else None
+    if near and near_keys is None:
+        return Response({'error': f'Unknown location: {near}'}, status=400)
+
+    return Response({
+        'bucket_size': SALARY_BUCKET_SIZE,
+        'buckets': salary_histogram(query, location, job_type, near_keys),
+        'selected': {
+            'min_salary': request.GET.get('min_salary') or None,
+            'max_salary': request.GET.get('max_salary') or None,
+        },
+    })
+
+# Typeahead suggestions from the in-memory prefix index. A plain
+# JsonResponse keeps this per-keystroke endpoint free of DRF overhead.
+def autocomplete_api(request):
+    prefix = request.GET.get('q', '')
+    field = request.GET.get('field')
+    fields = (field,) if field in AUTOCOMPLETE_FIELDS else AUTOCOMPLETE_FIELDS
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+    except ValueError:
+        limit = 8
+
+    return JsonResponse({
+        'query': prefix,
+        'suggestions': job_autocomplete.suggest(prefix, fields, limit),
+    })
+
+# Bulk export of jobs for partner syncs, streamed as NDJSON (default) or
+# CSV. Accepts the job_list filters plus a `since` cursor from the
+# X-Export-Cursor header of a previous export.
+def export_jobs_api(request):
+    fmt = request.GET.get('format', 'ndjson')
+    if fmt not in EXPORT_CONTENT_TYPES:
+        return JsonResponse({'error': f'Unsupported format: {fmt}'}, status=400)
+    try:
+        since = parse_since(request.GET.get('since'))
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    near = request.GET.get('near', '')
+    near_keys = nearby_keys(near, parse_radius(request.GET.get('radius'))) if near else None
+    if near and near_keys is None:
+        return JsonResponse({'error': f'Unknown location: {near}'}, status=400)
+    jobs, _ = _filter_jobs(
+        None, request.GET.get('location', ''), near_keys, request.GET.get('job_type', ''),
+        request.GET.get('min_salary', ''), request.GET.get('max_salary', ''), None,
+    )
+    query = request.GET.get('q', '')
+    if query:
+        jobs = jobs.filter(id__in=search_jobs(Job.objects.all(), query).order_by().values('id'))
+
+    cursor = export_cursor()
+    response = StreamingHttpResponse(
+        stream_export(export_rows(jobs, since, cursor), fmt),
+        content_type=EXPORT_CONTENT_TYPES[fmt],
+    )
+    response['X-Export-Cursor'] = encode_cursor(cursor)
+    if fmt == 'csv':
+        response['Content-Disposition'] = 'attachment; filename="jobs.csv"'
+    return response
 
 # Job detail page
+@query_budget(8)
 def job_detail(request, job_id):
     job = get_object_or_404(Job, id=job_id)
-    is_saved = False
-    if request.user.is_authenticated:
-        is_saved = SavedJob.objects.filter(user=request.user, job=job).exists()
-    
+    # Precomputed by `manage.py build_similar_jobs`
+    similar_jobs = list(
+        SimilarJob.objects.filter(job=job).select_related('similar').order_by('rank')
+    )
+
+    etag = make_etag(
+        'job_detail', job.pk, job.version,
+        [(entry.similar_id, entry.similar.version) for entry in similar_jobs],
+        user_state(request),
+    )
+    last_modified = max([job.updated_at] + [entry.similar.updated_at for entry in similar_jobs])
+    response = conditional_response(request, etag, last_modified)
+    if response is not None:
+        return response
+
     context = {
         'job': job,
-        'is_saved': is_saved,
+        'is_saved': job.id in saved_job_ids(request.user),
+        'similar_jobs': similar_jobs,
     }
-    return render(request, 'jobs/job_detail.html', context)
+    return set_validators(render(request, 'jobs/job_detail.html', context), etag, last_modified)
 
 # Create a new job
 @login_required
@@ -63,7 +247,9 @@ def create_job(request):
     if request.method == 'POST':
         form = JobForm(request.POST)
         if form.is_valid():
-            job = form.save()
+            job = form.save(commit=False)
+            job.employer = employer_for(request.user)
+            job.save()
             messages.success(request, 'Job created successfully!')
             return redirect('job_detail', job_id=job.id)
         else:
@@ -85,6 +271,8 @@ def apply_job(request, job_id):
             application.job = job
             application.applicant = request.user
             application.save()
+            # Resume parsing runs in the background (`manage.py run_tasks`)
+            enqueue_on_commit(extract_resume_text, {'application_id': application.id})
             messages.success(request, "Your application has been submitted!")
             return redirect("job_detail", job_id=job_id)
     else:
@@ -107,29 +295,34 @@ def save_job(request, job_id):
     return redirect('job_detail', job_id=job_id)
 
 # Dashboard
+@query_budget(10)
 @login_required
 def dashboard(request):
     if hasattr(request.user, 'profile') and request.user.profile.role == 'employer':
-        # Employer dashboard - show all jobs if no company specified, or filter by company
-        employer_company = request.user.profile.company_name or ""
-        if employer_company.strip():
-            jobs = Job.objects.filter(company__icontains=employer_company)
-        else:
-            # If no company specified, show all jobs (for testing) or jobs posted by this user
-            jobs = Job.objects.all()[:10]  # Limit for testing
-
-        applications = Application.objects.filter(job__in=jobs).order_by('-applied_at')
+        # Employer dashboard - the jobs this employer owns
+        employer = employer_for(request.user)
+        jobs = Job.objects.filter(employer=employer) if employer is not None else Job.objects.none()
+
+        applications = Application.objects.filter(job__in=jobs).select_related('job').defer('resume_text')
+        page = paginate(request, applications, ('-applied_at', '-id'), per_page=APPLICATIONS_PER_PAGE)
+        # Jobs are paged separately, with their own cursor parameter
+        jobs_page = paginate(request, jobs, ('-id',), per_page=JOBS_PER_PAGE, param='jobs_cursor')
+        jobs_page.object_list = attach_funnels(jobs_page)
         context = {
-            'jobs': jobs,
-            'applications': applications,
+            'jobs': jobs_page,
+            'applications': page,
+            'page': page,
+            'status_choices': Application.STATUS_CHOICES,
         }
         return render(request, 'jobs/employer_dashboard.html', context)
     else:
         # Candidate dashboard
-        applications = Application.objects.filter(applicant=request.user).order_by('-applied_at')
+        applications = Application.objects.filter(applicant=request.user).select_related('job')
+        page = paginate(request, applications, ('-applied_at', '-id'), per_page=APPLICATIONS_PER_PAGE)
         saved_jobs = SavedJob.objects.filter(user=request.user).select_related('job')
         context = {
-            'applications': applications,
+            'applications': page,
+            'page': page,
             'saved_jobs': saved_jobs,
         }
         return render(request, 'jobs/dashboard.html', context)
@@ -160,7 +353,8 @@ def start_interview(request, application_id):
     session = InterviewSession.objects.create(
         candidate=request.user,
         job_application=application,
-        total_questions=5  # Configurable
+        total_questions=5,  # Configurable
+        state=SessionState().to_json(),
     )
 
     return redirect('interview_session', session_id=session.id)
@@ -188,38 +382,32 @@ def interview_session(request, session_id):
         }
         return render(request, 'jobs/interview_results.html', context)
 
-    # Get next question
-    engine = InterviewEngine(session)
-    question = engine.get_next_question()
-
-    if not question:
-        # No more questions - complete interview
-        session.status = 'completed'
-        session.completed_at = timezone.now()
-        session.save()
-        return redirect('interview_session', session_id=session.id)
-
-    # Check if question already answered
-    existing_response = InterviewResponse.objects.filter(
-        interview_session=session,
-        question=question
-    ).first()
+    # The question on screen stays the same until it is answered
+    state = load_state(session)
+    question = question_bank.index().get(state.current) if state.current is not None else None
+    if question is None or question.id in state.asked_ids:
+        def pick_question(locked, state):
+            state.current = None
+            question = InterviewEngine(locked, state=state).get_next_question()
+            if question is None or question.id in state.asked_ids:
+                # No more questions - complete interview
+                locked.status = 'completed'
+                locked.completed_at = timezone.now()
+            else:
+                state.current = question.id
 
-    if existing_response:
-        # Question already answered, get next one
-        question = engine.get_next_question()
-        if not question:
-            session.status = 'completed'
-            session.completed_at = timezone.now()
-            session.save()
+        session = update_state(session.id, pick_question)
+        state = load_state(session)
+        if session.status == 'completed':
             return redirect('interview_session', session_id=session.id)
+        question = question_bank.index().get(state.current)
 
     context = {
         'session': session,
         'question': question,
-        'question_number': session.questions_asked.count() + 1,
+        'question_number': state.answered + 1,
         'total_questions': session.total_questions,
-        'progress': (session.questions_asked.count() / session.total_questions) * 100,
+        'progress': (state.answered / session.total_questions) * 100,
     }
     return render(request, 'jobs/interview_session.html', context)
 
@@ -242,27 +430,37 @@ def submit_answer(request, session_id):
         return redirect('interview_session', session_id=session_id)
 
     question = get_object_or_404(InterviewQuestion, id=question_id)
+    # Scored against the expected answer before taking the session lock
+    score, feedback = answer_scorer.score(question, answer)
+
+    def record_answer(locked, state):
+        # Create response
+        response, created = InterviewResponse.objects.get_or_create(
+            interview_session=locked,
+            question=question,
+            defaults={
+                'candidate_answer': answer,
+                'score': score,
+                'feedback': feedback,
+            }
+        )
 
-    # Create response
-    response, created = InterviewResponse.objects.get_or_create(
-        interview_session=session,
-        question=question,
-        defaults={
-            'candidate_answer': answer,
-            'score': 3,  # Default score, can be improved with AI evaluation
-        }
-    )
-
-    if not created:
-        # Update existing answer
-        response.candidate_answer = answer
-        response.save()
-
-    # Check if interview is complete
-    if session.questions_asked.count() >= session.total_questions:
-        session.status = 'completed'
-        session.completed_at = timezone.now()
-        session.save()
+        if not created:
+            # Update existing answer
+            response.candidate_answer = answer
+            response.score = score
+            response.feedback = feedback
+            response.save()
+
+        state.record(question.id, question.skill, response.score)
+        # Check if interview is complete
+        if state.answered >= locked.total_questions:
+            locked.status = 'completed'
+            locked.completed_at = timezone.now()
+
+    # The response and the session state change together under the session's row lock
+    session = update_state(session.id, record_answer)
+    if session.status == 'completed':
         messages.success(request, 'Interview completed! Check your results.')
     else:
         messages.success(request, 'Answer submitted successfully.')
@@ -270,28 +468,58 @@ def submit_answer(request, session_id):
     return redirect('interview_session', session_id=session_id)
 
 
+# Employer's applications as a CSV download (streamed) or Parquet file
+@login_required
+def export_applications(request):
+    employer = employer_for(request.user)
+    if employer is None:
+        return JsonResponse({'error': 'Only employers with a company name can export applications'}, status=403)
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in APPLICATION_EXPORT_FORMATS:
+        return JsonResponse({'error': f'Unsupported format: {fmt}'}, status=400)
+
+    applications = Application.objects.filter(job__employer=employer)
+    job_id = request.GET.get('job')
+    if job_id:
+        applications = applications.filter(job_id=job_id) if job_id.isdigit() else applications.none()
+    status = request.GET.get('status')
+    if status in dict(Application.STATUS_CHOICES):
+        applications = applications.filter(status=status)
+
+    if fmt == 'csv':
+        response = StreamingHttpResponse(
+            stream_application_csv(applications), content_type='text/csv; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'attachment; filename="applications.csv"'
+        return response
+
+    try:
+        chunks = stream_application_parquet(applications)
+    except ParquetUnavailable as exc:
+        return JsonResponse({'error': str(exc)}, status=501)
+    response = StreamingHttpResponse(chunks, content_type='application/vnd.apache.parquet')
+    response['Content-Disposition'] = 'attachment; filename="applications.parquet"'
+    return response
+
+
 @login_required
 def update_application_status(request, application_id):
     """Update application status in hiring funnel"""
     if request.method != 'POST':
         return redirect('dashboard')
 
-    application = get_object_or_404(Application, id=application_id)
+    application = get_object_or_404(Application.objects.select_related('job'), id=application_id)
     new_status = request.POST.get('status')
 
     # Check if user is an employer and has permission to update this application
     if hasattr(request.user, 'profile') and request.user.profile.role == 'employer':
-        # Check if the employer owns this job (more flexible matching)
-        employer_company = request.user.profile.company_name or ""
-        job_company = application.job.company or ""
-
-        # Allow update if company names match (case-insensitive) or if employer company is empty
-        if (employer_company.lower() in job_company.lower() or
-            job_company.lower() in employer_company.lower() or
-            not employer_company.strip()):
+        # Only the employer owning the job may move its applications
+        employer = employer_for(request.user)
+        if employer is not None and application.job.employer_id == employer.id:
             if new_status in dict(Application.STATUS_CHOICES):
                 application.status = new_status
-                application.save()
+                # Leave the resume fields to the background tasks
+                application.save(update_fields=['status', 'updated_at'])
                 messages.success(request, f'Application status updated to {application.get_status_display()}')
             else:
                 messages.error(request, 'Invalid status')
@@ -303,6 +531,44 @@ def update_application_status(request, application_id):
     return redirect('dashboard')
 
 
+# Move several applications to one funnel status with a single UPDATE.
+# Used by the multi-select on the employer dashboard; answers with JSON.
+@login_required
+def bulk_update_application_status(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    employer = employer_for(request.user)
+    if employer is None:
+        return JsonResponse({'error': 'Only employers with a company name can update application status'},
+                            status=403)
+
+    new_status = request.POST.get('status')
+    if new_status not in dict(Application.STATUS_CHOICES):
+        return JsonResponse({'error': 'Invalid status'}, status=400)
+    ids = request.POST.getlist('application_ids')
+    if not ids or not all(i.isdigit() for i in ids):
+        return JsonResponse({'error': 'application_ids must be a list of ids'}, status=400)
+    ids = set(map(int, ids))
+    if len(ids) > BULK_STATUS_MAX_APPLICATIONS:
+        return JsonResponse(
+            {'error': f'At most {BULK_STATUS_MAX_APPLICATIONS} applications can be updated at once'},
+            status=400,
+        )
+
+    selected = Application.objects.filter(job__employer=employer, id__in=ids)
+    updated = set_status(selected, new_status)
+    allowed = selected.count()
+    # From the funnel counters rather than a GROUP BY over every application
+    status_counts = status_totals(Job.objects.filter(employer=employer))
+    return JsonResponse({
+        'status': new_status,
+        'updated': updated,
+        'unchanged': allowed - updated,
+        'forbidden': len(ids) - allowed,
+        'status_counts': {status: status_counts.get(status, 0) for status, _ in Application.STATUS_CHOICES},
+    })
+
+
 @login_required
 def interview_results(request, session_id):
     """View detailed interview results"""